@@ -0,0 +1,114 @@
+"""ILP 求解后端的注册表。
+
+各后端的实现（以及 pulp 等较重的依赖）只在第一次被选用时才导入：GUI 进程与只使用贪心、
+局部搜索的求解都不会导入 pulp，启动更快；打包时也只需包含真正会用到的 CBC 可执行文件（见 hook-pulp.py）。
+
+每个后端是一个求解函数 solve(model, initial, time_limit=None, gap=None, progress=None, lower_bound=0, cutoff=None)，
+返回 (选中的列或 None, 下界, 是否求解到最优)，各项含义同 ilp_model.solve_lp_with_cbc；
+lower_bound 为已知的下界（不含 model.fixed），cutoff 为返回外部已知最好解规模的函数
+（见 branch_bound.solve_branch_and_bound），目前只有分支定界使用这两项。
+"""
+import importlib.util
+import os
+import platform
+import shutil
+import sys
+
+def _cbc_platform_dir():
+    """pulp 自带的 CBC 在 solverdir/cbc 下的子目录（与 pulp.apis.core 的平台判断一致）。"""
+    if sys.platform.startswith('win'):
+        system = 'win'
+    elif sys.platform == 'darwin':
+        return os.path.join('osx', 'i64')
+    else:
+        system = 'linux'
+    if sys.maxsize <= 2 ** 32:
+        return os.path.join(system, 'i32')
+    if system == 'linux' and platform.machine().lower() in ('aarch64', 'arm64'):
+        return os.path.join(system, 'arm64')
+    return os.path.join(system, 'i64')
+
+def cbc_executable():
+    """返回 CBC 可执行文件路径；找不到时返回 None。不会导入 pulp。
+
+    依次查找：打包程序中随附的 CBC、PATH 中的 cbc、已安装的 pulp 自带的 CBC。
+    """
+    name = 'cbc.exe' if sys.platform.startswith('win') else 'cbc'
+    candidates = []
+    # 在打包环境中处理CBC求解器路径：单文件程序解压到 sys._MEIPASS，目录形式的程序在可执行文件旁
+    if getattr(sys, 'frozen', False):
+        for base_path in (getattr(sys, '_MEIPASS', None), os.path.dirname(sys.executable)):
+            if base_path:
+                candidates.append(os.path.join(base_path, 'pulp', 'solverdir', 'cbc', _cbc_platform_dir(), name))
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    path = shutil.which('cbc')
+    if path is not None:
+        return path
+    spec = importlib.util.find_spec('pulp')
+    if spec is not None and spec.submodule_search_locations:
+        for package_dir in spec.submodule_search_locations:
+            path = os.path.join(package_dir, 'solverdir', 'cbc', _cbc_platform_dir(), name)
+            if os.path.exists(path):
+                return path
+    return None
+
+def _load_bnb():
+    from branch_bound import solve_branch_and_bound
+
+    def solve(model, initial, time_limit=None, gap=None, progress=None, lower_bound=0, cutoff=None):
+        return solve_branch_and_bound(model, initial, time_limit, progress, lower_bound, cutoff)
+    return solve
+
+def _load_pulp():
+    from pulp_backend import solve_with_pulp
+
+    def solve(model, initial, time_limit=None, gap=None, progress=None, lower_bound=0, cutoff=None):
+        return solve_with_pulp(model, initial, time_limit, gap, progress)
+    return solve
+
+def _load_lp():
+    from ilp_model import solve_lp_with_cbc
+
+    def solve(model, initial, time_limit=None, gap=None, progress=None, lower_bound=0, cutoff=None):
+        cbc_path = cbc_executable()
+        if cbc_path is None:
+            raise RuntimeError("找不到 CBC 可执行文件，无法使用 LP 文件后端。")
+        return solve_lp_with_cbc(model, initial, cbc_path, time_limit, gap, progress)
+    return solve
+
+def _pulp_installed():
+    return importlib.util.find_spec('pulp') is not None
+
+# 名称 -> (说明, 是否可用（不导入实现）, 加载函数)
+_REGISTRY = {
+    'bnb': ("进程内分支定界", lambda: True, _load_bnb),
+    'pulp': ("pulp 建模 + CBC", _pulp_installed, _load_pulp),
+    'lp': ("LP 文件 + CBC 可执行文件", lambda: cbc_executable() is not None, _load_lp),
+}
+_loaded = {}
+
+BACKENDS = tuple(_REGISTRY)
+
+def backend_description(name):
+    return _REGISTRY[name][0]
+
+def is_available(name):
+    """后端能否使用；只检查依赖是否存在，不导入后端的实现。"""
+    if name not in _REGISTRY:
+        raise ValueError(f"未知的 ILP 后端: {name}")
+    return _REGISTRY[name][1]()
+
+def get_backend(name):
+    """返回后端的求解函数；第一次调用时才导入其实现。"""
+    if name not in _REGISTRY:
+        raise ValueError(f"未知的 ILP 后端: {name}")
+    solve = _loaded.get(name)
+    if solve is None:
+        try:
+            solve = _loaded[name] = _REGISTRY[name][2]()
+        except ImportError as e:
+            raise ImportError(f"无法加载 ILP 后端 {name}（{backend_description(name)}）: {e}。"
+                              f"未安装 pulp 时可使用 pip install pulp 安装。") from e
+    return solve
@@ -0,0 +1,195 @@
+"""无界面的批量求解。
+
+用法:
+    python batch.py grid --n-min 7 --n-max 25 [--k 6] [--coverage 1] [--algorithm greedy] --output jobs.json
+    python batch.py run jobs.json [--workers 4] [--journal jobs.json.done]
+
+作业文件是一个 JSON 列表，每项为一组参数，例如
+    {"n": 12, "k": 6, "j": 5, "s": 4, "coverage": 1, "algorithm": "ilp", "time_limit": 600}
+可选字段及默认值：m=45, coverage=1, coverage_mode="groups"（或 "subsets"，见 coverage.resolve_coverage），
+algorithm="greedy"（或 "local_search"、"ilp"、"race"），time_limit=None（local_search 未指定时使用 10 秒，
+race 使用 60 秒；race 作业自身占用全部处理器核心，宜配合 --workers 1），
+streaming=None（贪心与局部搜索是否使用流式覆盖索引，None 表示按索引大小自动选择；不影响结果，不计入作业标识），
+index_workers=1（构建覆盖索引时使用的进程数，与 --workers 的作业并行数相乘；不影响结果，不计入作业标识），
+samples=None（默认使用前 n 个大写字母，与 GUI 的手动输入默认值一致）。
+
+作业按估计的工作量（覆盖索引的非零元个数）从大到小提交到进程池，避免耗时最长的作业最后才开始。
+每个完成的作业通过 save_results 写入结果数据库（连同分阶段统计），并在日志文件中追加一行；
+中断后重新运行同一命令会跳过日志中已完成的作业。
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from benchmark import valid_parameter_sets
+from coverage import COVERAGE_MODES, _covering_count, resolve_coverage
+from optimal_selection import greedy_optimal_selection, ilp_optimal_selection, local_search_selection, save_results
+from race import race_selection
+from solver_worker import LOCAL_SEARCH_TIME_LIMIT, RACE_TIME_LIMIT
+
+ALGORITHMS = ('greedy', 'local_search', 'ilp', 'race')
+JOB_DEFAULTS = {'m': 45, 'coverage': 1, 'coverage_mode': 'groups', 'algorithm': 'greedy', 'time_limit': None,
+                'samples': None, 'streaming': None, 'index_workers': 1}
+
+def normalize_job(job):
+    """补全默认值并检查参数。"""
+    job = dict(JOB_DEFAULTS, **job)
+    n, k, j, s = job['n'], job['k'], job['j'], job['s']
+    if not (s <= j <= k <= n):
+        raise ValueError(f"参数必须满足 s <= j <= k <= n: {job}")
+    resolve_coverage(k, j, s, job['coverage'], job['coverage_mode'])
+    if job['algorithm'] not in ALGORITHMS:
+        raise ValueError(f"未知的算法: {job['algorithm']}")
+    if job['index_workers'] < 1:
+        raise ValueError(f"index_workers 必须至少为 1: {job}")
+    if job['samples'] is None:
+        job['samples'] = [chr(ord('A') + i) for i in range(n)]
+    elif len(job['samples']) != n:
+        raise ValueError(f"samples 的长度必须等于 n: {job}")
+    return job
+
+def job_key(job):
+    """作业的唯一标识，用于断点续跑。默认的 coverage_mode 不计入，旧日志中的标识保持有效。"""
+    key = [job['m'], job['n'], job['k'], job['j'], job['s'], job['coverage'],
+           job['algorithm'], job['time_limit'], job['samples']]
+    if job['coverage_mode'] != JOB_DEFAULTS['coverage_mode']:
+        key.append(job['coverage_mode'])
+    return json.dumps(key)
+
+def estimate_cost(job):
+    """作业工作量的估计：覆盖索引的非零元个数。"""
+    s, _ = resolve_coverage(job['k'], job['j'], job['s'], job['coverage'], job['coverage_mode'])
+    return math.comb(job['n'], job['j']) * _covering_count(job['n'], job['k'], job['j'], s)
+
+def run_job(job):
+    """在子进程中求解单个作业，返回 (k 组列表, 信息字典, 耗时秒数)。"""
+    start = time.perf_counter()
+    args = (job['samples'], job['k'], job['j'], job['s'], job['coverage'])
+    mode = job['coverage_mode']
+    workers = job['index_workers']
+    if job['algorithm'] == 'ilp':
+        groups, info = ilp_optimal_selection(*args, time_limit=job['time_limit'], return_info=True, coverage_mode=mode,
+                                             workers=workers)
+    elif job['algorithm'] == 'race':
+        groups, info = race_selection(*args, time_limit=job['time_limit'] or RACE_TIME_LIMIT, return_info=True,
+                                      coverage_mode=mode, streaming=job['streaming'], workers=workers)
+    elif job['algorithm'] == 'local_search':
+        groups, info = local_search_selection(*args, time_limit=job['time_limit'] or LOCAL_SEARCH_TIME_LIMIT,
+                                              return_info=True, coverage_mode=mode, streaming=job['streaming'],
+                                              workers=workers)
+    else:
+        groups, info = greedy_optimal_selection(*args, return_info=True, coverage_mode=mode,
+                                                streaming=job['streaming'], workers=workers)
+    return groups, info, time.perf_counter() - start
+
+def load_journal(path):
+    """读取已完成作业的标识集合。"""
+    done = set()
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    done.add(json.loads(line)['key'])
+    except FileNotFoundError:
+        pass
+    return done
+
+def run_batch(jobs, workers=1, journal_path=None):
+    """运行全部作业，返回 (完成数, 跳过数, 失败数)。"""
+    jobs = [normalize_job(job) for job in jobs]
+    done = load_journal(journal_path) if journal_path else set()
+    pending = {}
+    for job in jobs:
+        key = job_key(job)
+        if key not in done:
+            pending.setdefault(key, job)
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        print(f"跳过 {skipped} 个已完成的作业")
+    order = sorted(pending.items(), key=lambda item: estimate_cost(item[1]), reverse=True)
+
+    completed = failed = 0
+    journal = open(journal_path, 'a') if journal_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # 进程池按提交顺序取作业，因此工作量大的作业先开始
+            futures = {pool.submit(run_job, job): (key, job) for key, job in order}
+            for future in as_completed(futures):
+                key, job = futures[future]
+                label = f"{job['n']}-{job['k']}-{job['j']}-{job['s']}-{job['coverage']} ({job['algorithm']})"
+                try:
+                    groups, info, seconds = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"失败 {label}: {e}", flush=True)
+                    continue
+                # 返回的是缓存中的已知解时，按求得它的算法保存
+                algorithm = info['algorithm'] if info.get('cached') else job['algorithm']
+                name = save_results(job['m'], job['n'], job['k'], job['j'], job['s'], groups,
+                                    coverage=job['coverage'], algorithm=algorithm, samples=job['samples'],
+                                    lower_bound=info['lower_bound'], coverage_mode=job['coverage_mode'],
+                                    stats=info.get('stats'))
+                if journal is not None:
+                    journal.write(json.dumps({'key': key, 'name': name}) + "\n")
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                completed += 1
+                status = ", 已达下界（最优）" if info['optimal'] else f", 下界 {info['lower_bound']}"
+                memory = f", 峰值内存 {info['peak_rss_kb'] / 1024:.0f}MB" if info.get('peak_rss_kb') else ""
+                if info.get('engine'):
+                    status += f", 由 {info['engine']} 求得"
+                if info.get('cached'):
+                    status += f", 来自缓存的已知解（{info['algorithm']}）"
+                if info.get('uncovered'):
+                    status += f", 校验失败：{info['uncovered']} 个 j 组未满足"
+                print(f"[{completed + failed}/{len(order)}] {label}: {len(groups)} 组{status}, {seconds:.2f}s{memory}",
+                      flush=True)
+    finally:
+        if journal is not None:
+            journal.close()
+    return completed, skipped, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimal Samples Selection 批量求解")
+    sub = parser.add_subparsers(dest='command', required=True)
+    grid = sub.add_parser('grid', help="生成覆盖 project.txt 取值范围的作业文件")
+    grid.add_argument('--n-min', type=int, default=7)
+    grid.add_argument('--n-max', type=int, default=25)
+    grid.add_argument('--k', type=int, action='append', help="只生成指定的 k（可重复）")
+    grid.add_argument('--coverage', type=int, default=1)
+    grid.add_argument('--coverage-mode', choices=COVERAGE_MODES, default='groups', help="coverage 的语义")
+    grid.add_argument('--algorithm', choices=ALGORITHMS, default='greedy')
+    grid.add_argument('--time-limit', type=float, default=None, help="每个 ILP / 局部搜索 / 竞速作业的时间限制（秒）")
+    grid.add_argument('--m', type=int, default=JOB_DEFAULTS['m'])
+    grid.add_argument('--index-workers', type=int, default=JOB_DEFAULTS['index_workers'],
+                      help="每个作业构建覆盖索引时使用的进程数")
+    grid.add_argument('--output', required=True)
+    run = sub.add_parser('run', help="运行作业文件")
+    run.add_argument('jobs')
+    run.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="并行进程数")
+    run.add_argument('--journal', help="已完成作业的日志文件（默认为 <作业文件>.done）")
+    args = parser.parse_args(argv)
+
+    if args.command == 'grid':
+        jobs = [{'m': args.m, 'n': p['n'], 'k': p['k'], 'j': p['j'], 's': p['s'], 'coverage': p['coverage'],
+                 'coverage_mode': args.coverage_mode, 'algorithm': args.algorithm, 'time_limit': args.time_limit,
+                 'index_workers': args.index_workers}
+                for p in valid_parameter_sets(args.n_min, args.n_max, args.k, args.coverage)]
+        with open(args.output, 'w') as f:
+            json.dump(jobs, f, indent=2)
+        print(f"已写入 {len(jobs)} 个作业: {args.output}")
+        return 0
+
+    with open(args.jobs, 'r') as f:
+        jobs = json.load(f)
+    completed, skipped, failed = run_batch(jobs, args.workers, args.journal or f"{args.jobs}.done")
+    print(f"完成 {completed} 个，跳过 {skipped} 个，失败 {failed} 个")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,393 @@
+"""性能与正确性基准。
+
+用法:
+    python benchmark.py examples [--ilp | --bnb | --streaming] [--case-timeout 600] [--output bench.json]
+    python benchmark.py sweep --n-min 7 --n-max 12 [--k 6] [--ilp | --bnb | --streaming] [--output bench.json]
+    python benchmark.py compare old.json new.json
+    python benchmark.py crosscheck [--n-max 7] [--coverage-max 3]
+
+每个用例在独立的子进程中运行，分阶段计时（枚举 k 组与 j 组、覆盖索引构建、贪心选择、校验、ILP 约简与求解），
+并记录子进程的峰值内存。结果以 JSON 输出，便于在不同提交之间比较。
+超过 --case-timeout 秒或异常退出（例如内存不足被终止）的用例记录为错误，其余用例照常运行。
+--bnb 用进程内的分支定界（见 branch_bound.py）代替 pulp/CBC 求解同一个约简模型。
+覆盖索引与求解器一样按大小选择（见 optimal_selection._use_streaming）：完整索引超过 STREAMING_INDEX_BYTES 时
+使用不存储覆盖关系的流式索引（见 coverage.StreamingCoverageIndex），此时不运行 ILP；
+--streaming 对所有用例都使用流式覆盖索引，用于比较两种方式的峰值内存。
+crosscheck 在小规模参数（含 coverage > 1）上把分支定界的最优解与不做任何约简或剪枝推理的穷举比较。
+"""
+import argparse
+import bisect
+import itertools
+import math
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from multiprocessing.connection import wait
+
+import optimal_selection
+from backends import get_backend
+from bounds import lower_bound
+from combinatorics import combination_masks, lex_unrank, mask_of
+from coverage import StreamingCoverageIndex, build_coverage_index, index_size_bytes, resolve_coverage
+from ilp_model import reduce_model
+from solver_worker import _kill_process_tree
+from verify import uncovered_j_groups
+
+# project.txt 中的八个示例及其给出的最小组数
+PROJECT_EXAMPLES = [
+    {'name': 'E.g. 1', 'n': 7, 'k': 6, 'j': 5, 's': 5, 'coverage': 1, 'minimum': 6},
+    {'name': 'E.g. 2', 'n': 8, 'k': 6, 'j': 4, 's': 4, 'coverage': 1, 'minimum': 7},
+    {'name': 'E.g. 3', 'n': 9, 'k': 6, 'j': 4, 's': 4, 'coverage': 1, 'minimum': 12},
+    {'name': 'E.g. 4', 'n': 8, 'k': 6, 'j': 6, 's': 5, 'coverage': 1, 'minimum': 4},
+    # E.g. 5 要求单个 k 组包含 j 组的至少 4 个 s 子组，即 |k ∩ j| = 6，只能选全部 28 个 k 组；
+    # project.txt 给出的 10 组对 ABCDFG、ACDFGH 两个 j 组不满足该要求，因此不作为已知最小值
+    {'name': 'E.g. 5', 'n': 8, 'k': 6, 'j': 6, 's': 5, 'coverage': 4, 'coverage_mode': 'subsets', 'minimum': None},
+    {'name': 'E.g. 6', 'n': 9, 'k': 6, 'j': 5, 's': 4, 'coverage': 1, 'minimum': 3},
+    {'name': 'E.g. 7', 'n': 10, 'k': 6, 'j': 6, 's': 4, 'coverage': 1, 'minimum': 3},
+    {'name': 'E.g. 8', 'n': 12, 'k': 6, 'j': 6, 's': 4, 'coverage': 1, 'minimum': 6},
+]
+
+# 随 examples 一起运行的边界用例：对称性破除固定的组已覆盖全部 j 组，约简后的模型没有约束
+EDGE_CASES = [
+    {'name': '7-6-6-4-1', 'n': 7, 'k': 6, 'j': 6, 's': 4, 'coverage': 1, 'minimum': 1},
+    {'name': '8-6-6-4-1', 'n': 8, 'k': 6, 'j': 6, 's': 4, 'coverage': 1, 'minimum': 1},
+]
+
+# 随 examples 一起运行的 coverage > 1 用例，最小组数由 brute_force_minimum 穷举得到
+MULTI_COVERAGE_CASES = [
+    {'name': '6-4-3-2-3', 'n': 6, 'k': 4, 'j': 3, 's': 2, 'coverage': 3, 'minimum': 5},
+    {'name': '7-5-3-2-3', 'n': 7, 'k': 5, 'j': 3, 's': 2, 'coverage': 3, 'minimum': 5},
+    {'name': '7-5-4-3-2', 'n': 7, 'k': 5, 'j': 4, 's': 3, 'coverage': 2, 'minimum': 4},
+    {'name': '8-6-4-4-2', 'n': 8, 'k': 6, 'j': 4, 's': 4, 'coverage': 2, 'minimum': 12},
+    {'name': '8-6-5-4-2', 'n': 8, 'k': 6, 'j': 5, 's': 4, 'coverage': 2, 'minimum': 4},
+    {'name': '8-6-6-5-2', 'n': 8, 'k': 6, 'j': 6, 's': 5, 'coverage': 2, 'minimum': 6},
+]
+
+# 每个用例的默认时间限制（秒）
+CASE_TIMEOUT = 600.0
+
+def valid_parameter_sets(n_min=7, n_max=25, k_values=None, coverage=1):
+    """按 project.txt 的取值范围枚举 (n, k, j, s)：4<=k<=7, 3<=s<=j<=k<=n。"""
+    for n in range(n_min, n_max + 1):
+        for k in (k_values or range(4, 8)):
+            if k > n:
+                continue
+            for j in range(3, k + 1):
+                for s in range(3, j + 1):
+                    yield {'name': f"{n}-{k}-{j}-{s}-{coverage}", 'n': n, 'k': k, 'j': j, 's': s,
+                           'coverage': coverage, 'minimum': None}
+
+def _check(size, minimum):
+    """把结果规模与已知最小值比较。"""
+    if minimum is None or size is None:
+        return None
+    if size < minimum:
+        return 'BELOW_MINIMUM'
+    return 'match' if size == minimum else 'above'
+
+def run_case(case, ilp=False, time_limit=None, streaming=None):
+    """运行单个用例并返回记录（在子进程中调用）。ilp 为 False、"pulp" 或 "bnb"。
+
+    streaming 为 None 时按完整索引的大小选择覆盖索引（与求解器相同），为 True 时总是使用流式索引。
+    """
+    n, k, j, s, coverage = case['n'], case['k'], case['j'], case['s'], case['coverage']
+    record = dict(case)
+    if case.get('skip'):
+        return record
+    s, coverage = resolve_coverage(k, j, s, coverage, case.get('coverage_mode', 'groups'))
+    timings = {}
+
+    streaming = optimal_selection._use_streaming(n, k, j, s, streaming)
+    record.update(streaming=streaming, index_bytes=index_size_bytes(n, k, j, s))
+    if streaming:
+        # 流式索引按编号现场生成组，不做整体枚举
+        start = time.perf_counter()
+        index = StreamingCoverageIndex(n, k, j, s)
+        timings['coverage_build'] = time.perf_counter() - start
+    else:
+        # 枚举出的位掩码直接交给 build_coverage_index 使用，两个阶段的耗时不重叠
+        start = time.perf_counter()
+        masks = (combination_masks(n, k), combination_masks(n, j))
+        timings['enumeration'] = time.perf_counter() - start
+        start = time.perf_counter()
+        index = build_coverage_index(n, k, j, s, masks=masks)
+        timings['coverage_build'] = time.perf_counter() - start
+        del masks
+    record.update(num_k_groups=index.num_k_groups, num_j_groups=index.num_j_groups, nnz=index.nnz)
+
+    start = time.perf_counter()
+    selected, complete = optimal_selection._lazy_greedy(index, coverage)
+    timings['selection'] = time.perf_counter() - start
+    record.update(greedy_size=len(selected), greedy_complete=complete,
+                  greedy_check=_check(len(selected), case['minimum']),
+                  lower_bound=lower_bound(n, k, j, s, coverage))
+
+    start = time.perf_counter()
+    masks = [mask_of(lex_unrank(i, n, k)) for i in selected]
+    record['greedy_uncovered'] = len(uncovered_j_groups(n, k, j, s, coverage, masks))
+    timings['verify'] = time.perf_counter() - start
+
+    if ilp and streaming:
+        record['ilp_error'] = "完整覆盖索引过大，使用流式索引，跳过 ILP"
+    elif ilp:
+        start = time.perf_counter()
+        model = reduce_model(index, coverage)
+        initial = model.warm_start([lex_unrank(i, n, k) for i in sorted(selected)])
+        timings['ilp_reduction'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            chosen, ilp_bound, finished = get_backend(ilp)(model, initial, time_limit, None, None,
+                                                           record['lower_bound'] - len(model.fixed))
+        except Exception as e:
+            record['ilp_error'] = str(e)
+        else:
+            if chosen is None or len(chosen) > len(initial):
+                chosen = initial
+            size = len(chosen) + len(model.fixed)
+            record.update(ilp_size=size, ilp_finished=finished,
+                          ilp_lower_bound=None if ilp_bound is None else ilp_bound + len(model.fixed),
+                          ilp_check=_check(size, case['minimum']))
+        timings['ilp_solve'] = time.perf_counter() - start
+
+    record['timings'] = {phase: round(seconds, 6) for phase, seconds in timings.items()}
+    record['peak_rss_kb'] = optimal_selection.peak_rss_kb()
+    return record
+
+def _case_main(conn, case, ilp, time_limit, streaming):
+    """子进程入口：运行用例并通过管道送回记录。"""
+    if hasattr(os, 'setpgrp'):
+        # 成为新进程组的组长，超时时可以连同 CBC 一起终止
+        os.setpgrp()
+    try:
+        conn.send(run_case(case, ilp, time_limit, streaming))
+    except Exception as e:
+        conn.send(dict(case, error=str(e)))
+    finally:
+        conn.close()
+
+def run_cases(cases, ilp=False, time_limit=None, jobs=1, streaming=None, case_timeout=CASE_TIMEOUT):
+    """每个用例使用全新的子进程，以便独立统计峰值内存；按用例顺序产出记录。
+
+    同时运行至多 jobs 个子进程。超过 case_timeout 秒（None 表示不限制）的子进程被终止，
+    未送回记录就退出的子进程（例如内存不足被终止）也不会使其余用例停滞，二者都记为带 'error' 的记录。
+    """
+    ctx = multiprocessing.get_context()
+    queue = list(enumerate(cases))
+    queue.reverse()
+    running = {}  # 连接 -> (用例编号, 进程, 截止时间)
+    finished = {}
+    next_index = 0
+    try:
+        while next_index < len(cases):
+            while queue and len(running) < max(1, jobs):
+                i, case = queue.pop()
+                parent_conn, child_conn = ctx.Pipe(duplex=False)
+                process = ctx.Process(target=_case_main, args=(child_conn, case, ilp, time_limit, streaming))
+                process.start()
+                child_conn.close()
+                deadline = None if case_timeout is None else time.monotonic() + case_timeout
+                running[parent_conn] = (i, process, deadline)
+            deadlines = [deadline for _, _, deadline in running.values() if deadline is not None]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            for conn in wait(list(running), timeout):
+                i, process, _ = running.pop(conn)
+                try:
+                    finished[i] = conn.recv()
+                except (EOFError, OSError):
+                    process.join(1.0)
+                    finished[i] = dict(cases[i], error=f"子进程意外退出（退出码 {process.exitcode}）")
+                conn.close()
+                process.join(1.0)
+            now = time.monotonic()
+            for conn, (i, process, deadline) in list(running.items()):
+                if deadline is not None and now >= deadline:
+                    _kill_process_tree(process)
+                    process.join(3.0)
+                    if process.is_alive():
+                        process.kill()
+                    del running[conn]
+                    conn.close()
+                    finished[i] = dict(cases[i], error=f"超过时间限制 {case_timeout:g} 秒")
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
+    finally:
+        for conn, (_, process, _) in running.items():
+            if process.is_alive():
+                _kill_process_tree(process)
+            process.join(3.0)
+            if process.is_alive():
+                process.kill()
+            conn.close()
+
+def brute_force_minimum(n, k, j, s, coverage):
+    """穷举求最小覆盖的组数，与 ILP 的约简和分支定界无关，用于交叉校验。
+
+    规模 m 从组合下界开始递增，按字典序枚举 m 个 k 组的组合；
+    唯一的剪枝是某个 j 组的缺额已超过剩余名额或编号不小于当前位置的覆盖 k 组数。
+    """
+    index = build_coverage_index(n, k, j, s)
+    num_k, num_j = index.num_k_groups, index.num_j_groups
+    covering = [list(index.covering(t)) for t in range(num_j)]
+    need = [coverage] * num_j
+
+    def feasible(pos, slots):
+        for t in range(num_j):
+            if need[t] > 0 and (need[t] > slots or len(covering[t]) - bisect.bisect_left(covering[t], pos) < need[t]):
+                return False
+        return True
+
+    def search(pos, slots):
+        if not any(d > 0 for d in need):
+            return True
+        if slots == 0 or not feasible(pos, slots):
+            return False
+        for c in range(pos, num_k - slots + 1):
+            covered = index.covered_by(c)
+            for t in covered:
+                need[t] -= 1
+            found = search(c + 1, slots - 1)
+            for t in covered:
+                need[t] += 1
+            if found:
+                return True
+        return False
+
+    for m in range(lower_bound(n, k, j, s, coverage), num_k + 1):
+        if search(0, m):
+            return m
+    return None
+
+def crosscheck(n_min=4, n_max=7, coverage_max=3, time_limit=None):
+    """在全部 n_min <= n <= n_max、2 <= s <= j <= k < n、coverage <= coverage_max（且可行）的参数上，
+    比较分支定界（ilp_optimal_selection 的 "bnb" 后端）与 brute_force_minimum，返回不一致的用例名称列表。"""
+    mismatches = []
+    for n in range(n_min, n_max + 1):
+        for k, j, s in itertools.product(range(2, n), repeat=3):
+            if not (s <= j <= k):
+                continue
+            per_j = math.comb(n, k) - sum(math.comb(j, t) * math.comb(n - j, k - t) for t in range(0, s))
+            for coverage in range(1, min(coverage_max, per_j) + 1):
+                name = f"{n}-{k}-{j}-{s}-{coverage}"
+                expected = brute_force_minimum(n, k, j, s, coverage)
+                groups, info = optimal_selection.ilp_optimal_selection(
+                    list(range(n)), k, j, s, coverage, use_cache=False, backend="bnb", time_limit=time_limit,
+                    return_info=True)
+                ok = len(groups) == expected if info['optimal'] else len(groups) >= expected
+                ok = ok and info['verified'] and info['lower_bound'] <= expected
+                if not ok:
+                    mismatches.append(name)
+                print(f"{name:>16}  brute={expected} bnb={len(groups)} lb={info['lower_bound']} "
+                      f"{'optimal' if info['optimal'] else 'stopped'}{'' if ok else '  MISMATCH'}", flush=True)
+    return mismatches
+
+def _print_record(record):
+    if record.get('skip'):
+        print(f"{record['name']:>16}  跳过: {record['skip']}")
+        return
+    if record.get('error'):
+        print(f"{record['name']:>16}  错误: {record['error']}", flush=True)
+        return
+    timings = ' '.join(f"{phase}={seconds:.3f}s" for phase, seconds in record['timings'].items())
+    line = f"{record['name']:>16}  greedy={record['greedy_size']} lb={record['lower_bound']}"
+    if record.get('minimum') is not None:
+        line += f" min={record['minimum']} [{record['greedy_check']}]"
+    if record.get('greedy_uncovered'):
+        line += f" UNCOVERED={record['greedy_uncovered']}"
+    if 'ilp_size' in record:
+        line += f" ilp={record['ilp_size']}"
+    line += f"  {timings}  peak_rss={record['peak_rss_kb']}KB"
+    print(line, flush=True)
+
+def compare(old_path, new_path):
+    """比较两次基准输出：组数变化与各阶段耗时的比值。"""
+    with open(old_path) as f:
+        old = {r['name']: r for r in json.load(f)['cases']}
+    with open(new_path) as f:
+        new = {r['name']: r for r in json.load(f)['cases']}
+    for name, record in new.items():
+        before = old.get(name)
+        if before is None or any(r.get('skip') or r.get('error') for r in (record, before)):
+            continue
+        parts = []
+        for key in ('greedy_size', 'ilp_size'):
+            if key in record and key in before and record[key] != before[key]:
+                parts.append(f"{key} {before[key]} -> {record[key]}")
+        for phase, seconds in record['timings'].items():
+            old_seconds = before['timings'].get(phase)
+            if old_seconds:
+                parts.append(f"{phase} x{seconds / old_seconds:.2f}")
+        print(f"{name:>16}  " + '  '.join(parts))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimal Samples Selection 基准测试")
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('examples', 'sweep'):
+        p = sub.add_parser(name)
+        mode = p.add_mutually_exclusive_group()
+        mode.add_argument('--ilp', action='store_const', const='pulp', help="同时运行 ILP（需要 pulp/CBC）")
+        mode.add_argument('--bnb', dest='ilp', action='store_const', const='bnb', help="同时用分支定界求解 ILP")
+        mode.add_argument('--streaming', action='store_true', help="贪心总是使用流式覆盖索引")
+        p.add_argument('--time-limit', type=float, default=None, help="每个 ILP 的时间限制（秒）")
+        p.add_argument('--case-timeout', type=float, default=CASE_TIMEOUT,
+                       help="每个用例（子进程）的时间限制（秒），0 表示不限制")
+        p.add_argument('--jobs', type=int, default=1, help="并行运行的用例数（会影响计时）")
+        p.add_argument('--output', help="把结果写入 JSON 文件")
+    sweep = sub.choices['sweep']
+    sweep.add_argument('--n-min', type=int, default=7)
+    sweep.add_argument('--n-max', type=int, default=25)
+    sweep.add_argument('--k', type=int, action='append', help="只运行指定的 k（可重复）")
+    sweep.add_argument('--coverage', type=int, default=1)
+    cmp_parser = sub.add_parser('compare')
+    cmp_parser.add_argument('old')
+    cmp_parser.add_argument('new')
+    check = sub.add_parser('crosscheck', help="与穷举比较分支定界的最优解")
+    check.add_argument('--n-min', type=int, default=4)
+    check.add_argument('--n-max', type=int, default=7)
+    check.add_argument('--coverage-max', type=int, default=3)
+    check.add_argument('--time-limit', type=float, default=None, help="每个分支定界的时间限制（秒）")
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare':
+        compare(args.old, args.new)
+        return 0
+    if args.command == 'crosscheck':
+        mismatches = crosscheck(args.n_min, args.n_max, args.coverage_max, args.time_limit)
+        if mismatches:
+            print(f"错误：以下用例的分支定界结果与穷举不符: {', '.join(mismatches)}")
+            return 1
+        return 0
+
+    if args.command == 'examples':
+        cases = PROJECT_EXAMPLES + EDGE_CASES + MULTI_COVERAGE_CASES
+    else:
+        cases = list(valid_parameter_sets(args.n_min, args.n_max, args.k, args.coverage))
+    records = []
+    streaming = True if args.streaming else None
+    for record in run_cases(cases, args.ilp, args.time_limit, args.jobs, streaming, args.case_timeout or None):
+        _print_record(record)
+        records.append(record)
+
+    if args.output:
+        meta = {'python': platform.python_version(), 'platform': platform.platform(), 'streaming': args.streaming,
+                'ilp_backend': args.ilp or None}
+        with open(args.output, 'w') as f:
+            json.dump({'meta': meta, 'cases': records}, f, indent=2, sort_keys=True)
+        print(f"结果已保存到: {args.output}")
+    failures = [r['name'] for r in records
+                if 'BELOW_MINIMUM' in (r.get('greedy_check'), r.get('ilp_check'))
+                or (r.get('ilp_check') == 'above' and r.get('ilp_finished'))]
+    unfinished = [r['name'] for r in records if r.get('error')]
+    if unfinished:
+        print(f"警告：以下用例未能完成: {', '.join(unfinished)}")
+    if failures:
+        print(f"错误：以下用例的结果与已知最小值不符: {', '.join(failures)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+"""最少组数的组合下界。
+
+问题 (n, k, j, s, coverage) 要求每个 j 组至少被 coverage 个满足 |K ∩ J| >= s 的 k 组覆盖。
+这里的下界只取决于参数，计算代价可以忽略，可用来判断贪心解是否已经最优。
+"""
+import math
+
+def counting_bound(n, k, j, s, coverage=1):
+    """计数下界：每个 k 组最多满足 D 个 j 组，共需 coverage * C(n, j) 次满足。
+
+    D = sum_{t>=s} C(k, t) * C(n-k, j-t)。
+    """
+    per_k = sum(math.comb(k, t) * math.comb(n - k, j - t) for t in range(s, min(j, k) + 1))
+    return -(-coverage * math.comb(n, j) // per_k)
+
+def schonheim_bound(n, k, t, coverage=1):
+    """覆盖设计 C_λ(n, k, t) 的 Schönheim 下界（λ = coverage）。
+
+    L(n, k, t) = ceil(n/k * L(n-1, k-1, t-1))，L(n, k, 1) = ceil(λn/k)。
+    """
+    bound = -(-coverage * (n - t + 1) // (k - t + 1))
+    for i in range(t - 2, -1, -1):
+        bound = -(-(n - i) * bound // (k - i))
+    return bound
+
+def lower_bound(n, k, j, s, coverage=1):
+    """(n, k, j, s, coverage) 的最好组合下界。
+
+    j == s 时问题恰为 λ 重覆盖设计，取 Schönheim 下界与计数下界中的较大者；
+    j > s 时只使用计数下界。
+    """
+    if not (s <= j <= k <= n):
+        raise ValueError("参数必须满足 s <= j <= k <= n")
+    bound = counting_bound(n, k, j, s, coverage)
+    if j == s:
+        bound = max(bound, schonheim_bound(n, k, s, coverage))
+    return bound
@@ -0,0 +1,222 @@
+"""约简后 ILP 模型（集合多重覆盖）的进程内精确求解：位集分支定界。
+
+不创建 pulp 对象、不写临时文件、也不启动 CBC 可执行文件，适合中小规模的模型。
+约束与列都用整数位集表示：row_cols[r] 为能满足约束 r 的列，col_rows[c] 为列 c 满足的约束。
+
+每个结点的下界取以下几项的最大值：
+  计数界：选入的每一列至多使总缺额减少它的剩余度（它满足的未满足约束数），
+      因此至少要选度数最大的若干列，使它们的度数之和不小于总缺额；
+  装箱界：两两没有公共可用列的约束互不影响，它们的缺额之和是下界
+      （即 LP 对偶问题的一个可行解）；
+  单个约束的最大缺额。
+分支时选择最受约束的未满足约束（可用列数与缺额之差最小），按“它的所选列中序号最小的是哪一列”
+分支：第 i 个分支选入第 i 列并排除前 i-1 列，各分支互不相交。
+"""
+import math
+import time
+
+from combinatorics import iter_bits, popcount
+
+# 每搜索多少个结点检查一次时间限制
+_CLOCK_INTERVAL = 256
+
+class _Stop(Exception):
+    """到达时间限制或找到达到已知下界的解时结束搜索。"""
+
+def _greedy_cover(need, unsat, avail, row_cols, col_rows):
+    """按剩余度贪心地选列，返回满足全部约束的列列表；无法满足时返回 None。"""
+    need = list(need)
+    chosen = []
+    while unsat:
+        best, best_gain = None, 0
+        for c in iter_bits(avail):
+            gain = popcount(col_rows[c] & unsat)
+            if gain > best_gain:
+                best, best_gain = c, gain
+        if best is None:
+            return None
+        chosen.append(best)
+        avail &= ~(1 << best)
+        for r in iter_bits(col_rows[best] & unsat):
+            need[r] -= 1
+            if not need[r]:
+                unsat &= ~(1 << r)
+    return chosen
+
+def _bound(need, unsat, avail, row_cols, col_rows):
+    """结点的下界与分支约束：返回 (下界, 约束编号)；不可行时下界为 None，没有未满足的约束时为 (0, None)。"""
+    by_degree = {}
+    for c in iter_bits(avail):
+        d = popcount(col_rows[c] & unsat)
+        by_degree[d] = by_degree.get(d, 0) | 1 << c
+    # levels：(d, 度数不小于 d 的可用列)，d 从大到小
+    levels = []
+    mask = 0
+    for d in sorted(by_degree, reverse=True):
+        mask |= by_degree[d]
+        levels.append((d, mask))
+    total = 0
+    dual = 0.0
+    rows = []
+    for r in iter_bits(unsat):
+        cols = row_cols[r] & avail
+        slack = popcount(cols) - need[r]
+        if slack < 0:
+            return None, None
+        rows.append((slack, r, cols))
+        total += need[r]
+        # 对偶可行解 y_r = 1 / (约束 r 的可用列的最大度数)：每列上的 y_r 之和不超过 1
+        for d, mask in levels:
+            if cols & mask:
+                dual += need[r] / d
+                break
+    if not rows:
+        return 0, None
+    rows.sort()
+    # 计数界
+    counting = 0
+    remaining = total
+    for d, mask in levels:
+        for _ in range(popcount(by_degree[d])):
+            if remaining <= 0:
+                break
+            remaining -= d
+            counting += 1
+    # 装箱界：按松弛量从小到大挑选互不相交的约束
+    packing = 0
+    used = 0
+    for _, r, cols in rows:
+        if not cols & used:
+            packing += need[r]
+            used |= cols
+    largest = max(need[r] for _, r, _ in rows)
+    return max(counting, packing, largest, math.ceil(dual - 1e-9)), rows[0][1]
+
+def solve_branch_and_bound(model, initial=(), time_limit=None, progress=None, lower_bound=0, cutoff=None):
+    """用分支定界求解 ReducedModel（见 ilp_model.py），接口与 ilp_model.solve_lp_with_cbc 相同。
+
+    initial 为可行的初始解（列索引），为空时先用贪心求一个；
+    time_limit（秒）到达时返回当前最好的解与已知的下界。
+    lower_bound 为已知的下界（不含 model.fixed，例如组合下界），找到这一规模的解即停止搜索。
+    progress 不为 None 时，每找到更小的解或得到下界就调用 progress({'incumbent': ...} 或 {'lower_bound': ...})。
+    cutoff 为可选的无参函数，返回其他求解器已找到的最好解的规模（不含 model.fixed，竞速模式见 race.py）；
+    只搜索比它更小的解，每次检查时间时重新读取。搜索完毕时返回的下界可能小于所返回解的规模，
+    表示规模为 cutoff 的外部解是最优的。
+
+    Returns:
+        tuple: (选中的列或 None, 下界, 是否求解到最优)。
+    """
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    columns = model.columns
+    position = {c: i for i, c in enumerate(columns)}
+    constraints = list(model.rows) + [(cols, rhs) for cols, rhs in model.extra]
+    row_cols = []
+    need = []
+    for cols, rhs in constraints:
+        mask = 0
+        for c in cols:
+            if c in position:
+                mask |= 1 << position[c]
+        row_cols.append(mask)
+        need.append(rhs)
+    col_rows = [0] * len(columns)
+    for r, mask in enumerate(row_cols):
+        for c in iter_bits(mask):
+            col_rows[c] |= 1 << r
+    unsat = 0
+    for r, rhs in enumerate(need):
+        if rhs > 0:
+            unsat |= 1 << r
+    avail = (1 << len(columns)) - 1
+    if not unsat:
+        # 对称性破除固定的组已满足全部约束（或模型没有约束）：空解即最优
+        if progress is not None:
+            progress({'incumbent': 0})
+            progress({'lower_bound': 0})
+        return [], 0, True
+
+    if initial:
+        best = [position[c] for c in initial]
+    else:
+        best = _greedy_cover(need, unsat, avail, row_cols, col_rows)
+    root_bound, _ = _bound(need, unsat, avail, row_cols, col_rows)
+    if root_bound is None:
+        return None, None, True
+    root_bound = max(root_bound, lower_bound)
+    if progress is not None:
+        if best is not None:
+            progress({'incumbent': len(best)})
+        progress({'lower_bound': root_bound})
+    best_size = len(best) if best is not None else len(columns) + 1
+    # 只搜索规模小于 limit 的解：自己的最好解与外部解中较小者
+    limit = best_size if cutoff is None else min(best_size, cutoff())
+    chosen = []
+    # 当前结点之前已排除的列（祖先结点与本结点中之前的分支选入过、且已搜索完毕的列），不含当前路径上选入的列
+    excluded = []
+    nodes = 0
+
+    def search(avail, unsat):
+        nonlocal best, best_size, limit, nodes
+        if not unsat:
+            if len(chosen) < best_size:
+                best, best_size = list(chosen), len(chosen)
+                limit = min(limit, best_size)
+                if progress is not None:
+                    progress({'incumbent': best_size})
+                if best_size <= root_bound:
+                    raise _Stop(True)
+            return
+        nodes += 1
+        if nodes % _CLOCK_INTERVAL == 0:
+            if deadline is not None and time.monotonic() > deadline:
+                raise _Stop(False)
+            if cutoff is not None:
+                limit = min(limit, cutoff())
+                if limit <= root_bound:
+                    raise _Stop(True)
+        bound, row = _bound(need, unsat, avail, row_cols, col_rows)
+        if bound is None or len(chosen) + bound >= limit:
+            return
+        # 先尝试剩余度大的列，以便尽早找到好的解
+        candidates = sorted(iter_bits(row_cols[row] & avail), key=lambda c: -popcount(col_rows[c] & unsat))
+        depth = len(excluded)
+        for i, c in enumerate(candidates):
+            if len(candidates) - i < need[row]:
+                break
+            avail &= ~(1 << c)
+            hit = col_rows[c] & unsat
+            # 若 c 满足的未满足约束都能被某个已排除的列 b 满足，本分支的解把 c 换成 b 仍可行且规模不变，
+            # 而含 b 的解已在排除 b 之前的分支中搜索过。b 不能是当前路径上已选入的列：
+            # coverage > 1 时同一列不能计两次，把 c 换成它不再是可行解
+            if any(not hit & ~col_rows[b] for b in excluded):
+                excluded.append(c)
+                continue
+            next_unsat = unsat
+            for r in iter_bits(hit):
+                need[r] -= 1
+                if not need[r]:
+                    next_unsat &= ~(1 << r)
+            chosen.append(c)
+            try:
+                search(avail, next_unsat)
+            finally:
+                chosen.pop()
+                for r in iter_bits(hit):
+                    need[r] += 1
+            # c 的分支搜索完毕后才成为已排除的列，供之后的兄弟分支及其后代判断支配关系
+            excluded.append(c)
+        del excluded[depth:]
+
+    try:
+        if limit > root_bound:
+            search(avail, unsat)
+        finished = True
+    except _Stop as stop:
+        finished, = stop.args
+    if finished and (best is not None or cutoff is not None):
+        # 搜索完毕：不存在规模小于 limit 的解
+        root_bound = max(limit, root_bound)
+    if best is None:
+        return None, root_bound, finished
+    result = sorted(columns[c] for c in best)
+    return result, root_bound, finished
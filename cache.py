@@ -0,0 +1,196 @@
+"""覆盖索引与已知解的磁盘缓存。
+
+覆盖关系只取决于 (n, k, j, s)，具体的样本标签只是对位置 0..n-1 的重新命名，
+因此可以按参数缓存下标空间中的覆盖索引，重复运行时直接内存映射加载；
+同理，(n, k, j, s, coverage) 的最优解在重新命名样本后依然成立，可按参数保存已知最好的解。
+"""
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+from array import array
+
+from coverage import STREAMING_INDEX_BYTES, CoverageIndex, build_coverage_index, _covering_count
+
+CACHE_DIR = 'cache'
+# 已知解单独存放，不参与 LRU 淘汰
+SOLUTIONS_DIR = os.path.join(CACHE_DIR, 'solutions')
+# 缓存目录的默认容量上限（字节），超出后按最近最少使用顺序淘汰。
+# 不小于任何会被完整构建的覆盖索引（见 STREAMING_INDEX_BYTES），并为其他条目留出同样的空间
+CACHE_MAX_BYTES = 2 * STREAMING_INDEX_BYTES
+
+_COVERAGE_MAGIC = b'OSSCOV01'
+# 文件头：魔数 + n, k, j, s, nnz，补齐到 64 字节以保证后续数组对齐
+_COVERAGE_HEADER = struct.Struct('<8s4IQ')
+_HEADER_SIZE = 64
+
+def _cache_path(kind, key, cache_dir):
+    """内容寻址的缓存文件路径：文件名为键的 SHA-1 摘要。"""
+    digest = hashlib.sha1(f"{kind}:{key}".encode('ascii')).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.{kind}")
+
+def _touch(path):
+    """更新访问时间戳，供 LRU 淘汰使用。"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def _discard(path):
+    """删除损坏的缓存文件（例如写入中断留下的截断文件），之后按未命中处理并重新构建。"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def coverage_file_bytes(n, k, j, s):
+    """(n, k, j, s) 的覆盖索引缓存文件的大小（字节）。"""
+    nnz = math.comb(n, j) * _covering_count(n, k, j, s)
+    return _HEADER_SIZE + 8 * (math.comb(n, k) + 1) + 8 * nnz
+
+def evict_cache(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, keep=None):
+    """按修改时间从旧到新删除缓存文件，直到目录总大小不超过 max_bytes；不删除路径 keep（刚写入的文件）。"""
+    try:
+        entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)]
+    except FileNotFoundError:
+        return
+    files = []
+    for path in entries:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if not os.path.isfile(path):
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if keep is not None and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            # 文件可能仍被映射（Windows 上无法删除），跳过
+            continue
+
+def store_coverage_index(index, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+    """把覆盖索引写入缓存目录，返回文件路径；索引本身超过 max_bytes 时不写入，返回 None。"""
+    if coverage_file_bytes(index.n, index.k, index.j, index.s) > max_bytes:
+        return None
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path('cov', (index.n, index.k, index.j, index.s), cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    header = _COVERAGE_HEADER.pack(_COVERAGE_MAGIC, index.n, index.k, index.j, index.s, index.nnz)
+    with open(tmp_path, 'wb') as f:
+        f.write(header.ljust(_HEADER_SIZE, b'\0'))
+        # 8 字节的 k_indptr 放在最前面，保证映射后的各数组自然对齐
+        f.write(array('Q', index.k_indptr).tobytes())
+        f.write(array('I', index.j_indices).tobytes())
+        f.write(array('I', index.k_indices).tobytes())
+    os.replace(tmp_path, path)
+    evict_cache(cache_dir, max_bytes, keep=path)
+    return path
+
+def load_coverage_index(n, k, j, s, cache_dir=CACHE_DIR):
+    """从缓存内存映射加载覆盖索引；不存在时返回 None，文件损坏（截断、格式不符）时删除它并返回 None。"""
+    path = _cache_path('cov', (n, k, j, s), cache_dir)
+    try:
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        # 空文件无法映射
+        _discard(path)
+        return None
+    if len(mm) < _HEADER_SIZE:
+        mm.close()
+        _discard(path)
+        return None
+    magic, *params, nnz = _COVERAGE_HEADER.unpack_from(mm, 0)
+    num_k_groups = math.comb(n, k)
+    num_j_groups = math.comb(n, j)
+    expected_size = _HEADER_SIZE + 8 * (num_k_groups + 1) + 8 * nnz
+    if magic != _COVERAGE_MAGIC or params != [n, k, j, s] or len(mm) != expected_size:
+        mm.close()
+        _discard(path)
+        return None
+    _touch(path)
+
+    view = memoryview(mm)
+    offset = _HEADER_SIZE
+    k_indptr = view[offset:offset + 8 * (num_k_groups + 1)].cast('Q')
+    offset += 8 * (num_k_groups + 1)
+    j_indices = view[offset:offset + 4 * nnz].cast('I')
+    offset += 4 * nnz
+    k_indices = view[offset:offset + 4 * nnz].cast('I')
+    per_j = nnz // num_j_groups
+    j_indptr = array('Q', range(0, nnz + 1, per_j))
+    return CoverageIndex(n, k, j, s, j_indptr, j_indices, k_indptr, k_indices)
+
+def has_coverage_index(n, k, j, s, cache_dir=CACHE_DIR):
+    """缓存中是否已有 (n, k, j, s) 的覆盖索引文件（不检查内容）。"""
+    return os.path.isfile(_cache_path('cov', (n, k, j, s), cache_dir))
+
+def cached_coverage_index(n, k, j, s, workers=1, cache_dir=CACHE_DIR, progress=None):
+    """先查缓存，未命中时构建覆盖索引并写入缓存。progress 同 build_coverage_index。"""
+    index = load_coverage_index(n, k, j, s, cache_dir)
+    if index is not None and progress is not None:
+        progress({'phase': 'coverage', 'percent': 100.0, 'cached': True})
+    if index is None:
+        index = build_coverage_index(n, k, j, s, workers=workers, progress=progress)
+        try:
+            store_coverage_index(index, cache_dir)
+        except OSError as e:
+            print(f"警告：写入覆盖索引缓存失败: {e}")
+    return index
+
+def load_solution(n, k, j, s, coverage, solutions_dir=SOLUTIONS_DIR):
+    """读取 (n, k, j, s, coverage) 的已知最好解，不存在时返回 None。
+
+    Returns:
+        dict: {'k_groups': 下标空间中的 k 组（位置元组列表）, 'algorithm': 求得该解的算法,
+        'optimal': 是否已被 ILP 证明最优}。
+    """
+    path = _cache_path('sol', (n, k, j, s, coverage), solutions_dir)
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if data.get('parameters') != {'n': n, 'k': k, 'j': j, 's': s, 'coverage': coverage}:
+        return None
+    return {
+        'k_groups': [tuple(group) for group in data['k_groups']],
+        'algorithm': data['algorithm'],
+        'optimal': data['optimal'],
+    }
+
+def store_solution(n, k, j, s, coverage, k_groups, algorithm, optimal=False, solutions_dir=SOLUTIONS_DIR):
+    """记录一个下标空间中的解；只有比已知解更好（更少组，或首次证明最优）时才覆盖。
+
+    Returns:
+        bool: 是否写入了新的解。
+    """
+    known = load_solution(n, k, j, s, coverage, solutions_dir)
+    if known is not None:
+        if known['optimal'] or (len(known['k_groups']) <= len(k_groups) and not optimal):
+            return False
+    os.makedirs(solutions_dir, exist_ok=True)
+    path = _cache_path('sol', (n, k, j, s, coverage), solutions_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    data = {
+        'parameters': {'n': n, 'k': k, 'j': j, 's': s, 'coverage': coverage},
+        'algorithm': algorithm,
+        'optimal': optimal,
+        'k_groups': sorted(list(group) for group in k_groups),
+    }
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+    return True
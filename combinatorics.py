@@ -0,0 +1,102 @@
+"""组合的枚举、编号（rank / unrank）与位掩码转换。
+
+样本用位置 0..n-1 表示，一个 r 元组合是升序的位置元组，也可以写成整数位掩码
+（第 i 个样本对应第 i 位）。各模块都按 itertools.combinations(range(n), r) 的字典序给组编号，
+因此可以只保存整数编号，在需要时再换算回组合本身。
+
+余字典序（colex）编号与 n 无关：rank = sum(C(c_i, i+1))，按位掩码的数值从小到大排列；
+字典序编号由它经过镜像 c -> n-1-c 得到。
+"""
+import math
+from array import array
+
+try:
+    popcount = int.bit_count  # Python 3.10+
+except AttributeError:
+    def popcount(x):
+        return bin(x).count("1")
+
+def mask_of(indices):
+    """把样本位置索引转换为位掩码：第 i 个样本对应第 i 位。"""
+    mask = 0
+    for i in indices:
+        mask |= 1 << i
+    return mask
+
+def iter_bits(x):
+    """按从低到高的顺序产出整数 x 中为 1 的位的位置。"""
+    bits = bin(x)[:1:-1]
+    i = bits.find('1')
+    while i != -1:
+        yield i
+        i = bits.find('1', i + 1)
+
+def combo_of(mask):
+    """mask_of 的逆操作：位掩码中为 1 的位置（升序元组）。"""
+    return tuple(iter_bits(mask))
+
+def colex_rank(combo):
+    """升序组合 combo 的余字典序编号：sum(C(c_i, i+1))。"""
+    return sum(math.comb(c, i + 1) for i, c in enumerate(combo))
+
+def colex_unrank(rank, r):
+    """余字典序中第 rank 个 r 元组合（升序元组）。"""
+    combo = []
+    for i in range(r, 0, -1):
+        # 最大的 c 满足 C(c, i) <= rank
+        c = i - 1
+        while math.comb(c + 1, i) <= rank:
+            c += 1
+        rank -= math.comb(c, i)
+        combo.append(c)
+    return tuple(reversed(combo))
+
+def lex_rank(combo, n):
+    """升序组合 combo 在 itertools.combinations(range(n), r) 中的字典序编号。"""
+    r = len(combo)
+    rank = math.comb(n, r) - 1
+    for i, c in enumerate(combo):
+        rank -= math.comb(n - 1 - c, r - i)
+    return rank
+
+def lex_unrank(rank, n, r):
+    """itertools.combinations(range(n), r) 中第 rank 个组合（升序元组）。"""
+    combo = []
+    c = 0
+    for i in range(r, 0, -1):
+        # 以 c 开头的组合共有 C(n-1-c, i-1) 个，逐个跳过直到 rank 落在其中
+        while True:
+            block = math.comb(n - 1 - c, i - 1)
+            if rank < block:
+                break
+            rank -= block
+            c += 1
+        combo.append(c)
+        c += 1
+    return tuple(combo)
+
+def lex_rank_table(n, r):
+    """字典序排名表：组合 c 的编号为 C(n, r) - 1 - sum(table[i][c[i]])。
+
+    与 map(list.__getitem__, table, c) 一起使用时，整个求和在 C 层完成，
+    适合需要给大量组合编号的内层循环。
+    """
+    return [[math.comb(n - 1 - e, r - i) for e in range(n)] for i in range(r)]
+
+def combination_masks(n, r):
+    """range(n) 的全部 r 元组合的位掩码，按字典序排列（第 i 项的编号即为 i）。
+
+    以 lo 为下界的 r 元组合依次是 {f} ∪（以 f+1 为下界的 r-1 元组合），f = lo..n-r；
+    较短的后缀表只构建一次，每个组合只需一次按位或，不必逐个生成元组。
+    """
+    if not 0 <= r <= n:
+        return array('Q')
+    # suffix[lo]：以 lo 为下界、当前长度的全部组合的位掩码（字典序）
+    suffix = [[0] for _ in range(n + 1)]
+    for length in range(1, r + 1):
+        longer = [[] for _ in range(n + 1)]
+        for lo in range(n - length, -1, -1):
+            bit = 1 << lo
+            longer[lo] = [bit | mask for mask in suffix[lo + 1]] + longer[lo + 1]
+        suffix = longer
+    return array('Q', suffix[0])
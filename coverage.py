@@ -0,0 +1,253 @@
+"""k 组与 j 组之间覆盖关系的稀疏（CSR）索引。
+
+样本用位置 0..n-1 表示，每个组是一个整数位掩码（第 i 个样本对应第 i 位）。
+k 组包含 j 组的某个 s 子组，当且仅当 |k ∩ j| >= s。
+"""
+import itertools
+import math
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+from combinatorics import combination_masks, lex_rank_table, lex_unrank, mask_of
+
+# streaming=None 时，完整覆盖索引超过该大小（字节）就改用不存储覆盖关系的流式索引（见 optimal_selection）
+STREAMING_INDEX_BYTES = 1 << 31
+
+def bitset_from_indices(indices, size):
+    """用一组位置构造 size 位的整数位集（避免逐位 OR 产生的大整数反复拷贝）。"""
+    buf = bytearray((size + 7) // 8)
+    for i in indices:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, 'little')
+
+def _transpose(indptr, indices, num_cols):
+    """把 CSR (行 -> 列) 转置为 (列 -> 行)，行号在每一列内保持升序。"""
+    counts = [0] * (num_cols + 1)
+    for col in indices:
+        counts[col + 1] += 1
+    for c in range(num_cols):
+        counts[c + 1] += counts[c]
+    t_indptr = array('Q', counts)
+    t_indices = array('I', bytes(4 * len(indices)))
+    cursor = counts[:-1]
+    for row in range(len(indptr) - 1):
+        for pos in range(indptr[row], indptr[row + 1]):
+            col = indices[pos]
+            t_indices[cursor[col]] = row
+            cursor[col] += 1
+    return t_indptr, t_indices
+
+class CoverageIndex:
+    """覆盖关系的双向 CSR 表示。
+
+    k 组与 j 组都按 itertools.combinations(range(n), r) 的字典序编号。
+    k_indptr / k_indices: 第 i 个 k 组满足的 j 组为 k_indices[k_indptr[i]:k_indptr[i+1]]。
+    j_indptr / j_indices: 第 t 个 j 组可由 j_indices[j_indptr[t]:j_indptr[t+1]] 中的 k 组满足。
+    """
+
+    def __init__(self, n, k, j, s, j_indptr, j_indices, k_indptr=None, k_indices=None):
+        self.n, self.k, self.j, self.s = n, k, j, s
+        self.num_k_groups = math.comb(n, k)
+        self.num_j_groups = len(j_indptr) - 1
+        self.j_indptr, self.j_indices = j_indptr, j_indices
+        if k_indptr is None:
+            k_indptr, k_indices = _transpose(j_indptr, j_indices, self.num_k_groups)
+        self.k_indptr, self.k_indices = k_indptr, k_indices
+
+    @property
+    def nnz(self):
+        return len(self.j_indices)
+
+    def covered_by(self, k_idx):
+        """第 k_idx 个 k 组满足的 j 组索引（升序）。"""
+        return self.k_indices[self.k_indptr[k_idx]:self.k_indptr[k_idx + 1]]
+
+    def covering(self, j_idx):
+        """能满足第 j_idx 个 j 组的 k 组索引（升序）。"""
+        return self.j_indices[self.j_indptr[j_idx]:self.j_indptr[j_idx + 1]]
+
+    def k_bitsets(self):
+        """每个 k 组满足的 j 组，以整数位集形式给出。"""
+        return [bitset_from_indices(self.covered_by(i), self.num_j_groups)
+                for i in range(self.num_k_groups)]
+
+class StreamingCoverageIndex:
+    """不存储覆盖关系的覆盖索引，接口与 CoverageIndex 相同（不提供 k_bitsets）。
+
+    每次调用 covered_by / covering 时才从组的编号反推出组本身，
+    再用与 _fill_rows 相同的“组内取 t 个、组外取其余”的方式枚举这一行，
+    因此常驻内存只有两张 O(n * r) 的排名表；代价是每一行在每次访问时都要重新生成。
+    适合覆盖索引（约 8 * nnz 字节）放不进内存的参数。
+    """
+
+    def __init__(self, n, k, j, s):
+        if not (s <= j <= k <= n):
+            raise ValueError("参数必须满足 s <= j <= k <= n")
+        self.n, self.k, self.j, self.s = n, k, j, s
+        self.num_k_groups = math.comb(n, k)
+        self.num_j_groups = math.comb(n, j)
+        self._per_j = _covering_count(n, k, j, s)
+        self._k_table = lex_rank_table(n, k)
+        self._j_table = lex_rank_table(n, j)
+
+    @property
+    def nnz(self):
+        return self.num_j_groups * self._per_j
+
+    def _row(self, group, size, table, total):
+        """与 group 相交至少 s 个样本的所有 size 元组的编号（升序）。"""
+        outside = [e for e in range(self.n) if e not in group]
+        last = total - 1
+        ranks = []
+        for t in range(self.s, min(len(group), size) + 1):
+            outside_combos = list(itertools.combinations(outside, size - t))
+            for inside in itertools.combinations(group, t):
+                ranks.extend(last - sum(map(list.__getitem__, table, sorted(inside + rest)))
+                             for rest in outside_combos)
+        ranks.sort()
+        return array('I', ranks)
+
+    def covered_by(self, k_idx):
+        """第 k_idx 个 k 组满足的 j 组索引（升序）。"""
+        return self._row(lex_unrank(k_idx, self.n, self.k), self.j, self._j_table, self.num_j_groups)
+
+    def covering(self, j_idx):
+        """能满足第 j_idx 个 j 组的 k 组索引（升序）。"""
+        return self._row(lex_unrank(j_idx, self.n, self.j), self.k, self._k_table, self.num_k_groups)
+
+def index_size_bytes(n, k, j, s):
+    """完整覆盖索引（双向 CSR）占用的字节数。"""
+    nnz = math.comb(n, j) * _covering_count(n, k, j, s)
+    return 8 * nnz + 8 * (math.comb(n, k) + 1) + 8 * (math.comb(n, j) + 1)
+
+# 覆盖语义：'groups' 为至少 coverage 个 k 组各含 j 组的某个 s 子组；
+# 'subsets' 为至少一个 k 组包含 j 组的 coverage 个不同 s 子组（project.txt E.g. 5）
+COVERAGE_MODES = ('groups', 'subsets')
+
+def resolve_coverage(k, j, s, coverage, coverage_mode='groups'):
+    """把两种覆盖语义统一为 (s', c')：每个 j 组需被 c' 个满足 |k ∩ j| >= s' 的 k 组满足。
+
+    一个 k 组包含 j 组的 C(|k ∩ j|, s) 个 s 子组，因此 'subsets' 语义等价于
+    |k ∩ j| >= t（t 为满足 C(t, s) >= coverage 的最小值）且只需一个这样的 k 组，
+    可以直接使用同一个覆盖索引，无需枚举 s 子组。
+    """
+    if coverage_mode == 'groups':
+        return s, coverage
+    if coverage_mode != 'subsets':
+        raise ValueError(f"未知的覆盖语义: {coverage_mode}")
+    for t in range(s, min(j, k) + 1):
+        if math.comb(t, s) >= coverage:
+            return t, 1
+    raise ValueError(f"单个 k 组最多包含 j 组的 {math.comb(min(j, k), s)} 个 s 子组，无法达到 {coverage} 个。")
+
+def _covering_count(n, k, j, s):
+    """每个 j 组恰好可由多少个 k 组满足（与具体是哪个 j 组无关）。"""
+    return sum(math.comb(j, t) * math.comb(n - j, k - t) for t in range(s, min(j, k) + 1))
+
+def _fill_rows(n, size, other, s, start, stop, out, on_rows=None, other_masks=None):
+    """把第 start..stop-1 个 size 元组的行依次写入 out 的对应位置：
+    每一行为与它相交至少 s 个样本的全部 other 元组的编号（升序）。
+
+    size = j、other = k 时得到 j 组的覆盖 k 组（j_indices），反过来得到 k 组满足的 j 组（k_indices）。
+    不再对每个组扫描全部 C(n, other) 个组，而是直接枚举满足条件的组：
+    对 t = s..min(size, other)，从组内取 t 个样本、从组外取 other-t 个样本，
+    恰好枚举出所有交集大小为 t 的组，且不重复。
+    组的编号通过“位掩码 -> 字典序排名”表查得。
+    on_rows 不为 None 时，大约每完成 1% 的行调用一次 on_rows(新完成的行数)。
+    other_masks 为预先枚举的 combination_masks(n, other)，None 时在此枚举。
+    """
+    if other_masks is None:
+        other_masks = combination_masks(n, other)
+    other_rank = dict(zip(other_masks, range(len(other_masks))))
+    per_row = _covering_count(n, other, size, s)
+    pos = start * per_row
+    step = max(1, (stop - start) // 100)
+    for row, group in enumerate(itertools.islice(itertools.combinations(range(n), size), start, stop), 1):
+        outside = [e for e in range(n) if e not in group]
+        ranks = []
+        for t in range(s, min(size, other) + 1):
+            inside_masks = [mask_of(c) for c in itertools.combinations(group, t)]
+            outside_masks = [mask_of(c) for c in itertools.combinations(outside, other - t)]
+            for inside in inside_masks:
+                ranks.extend(other_rank[inside | outside] for outside in outside_masks)
+        ranks.sort()
+        out[pos:pos + per_row] = array('I', ranks)
+        pos += per_row
+        if on_rows is not None and (row % step == 0 or row == stop - start):
+            on_rows(step if row % step == 0 else row % step)
+
+def _fill_rows_shared(shm_name, offset, length, n, size, other, s, start, stop):
+    """子进程入口：直接写入父进程分配的共享内存（从第 offset 个元素起的 length 个），避免把结果 pickle 回传。"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        view = shm.buf.cast('I')
+        out = view[offset:offset + length]
+        _fill_rows(n, size, other, s, start, stop, out)
+        out.release()
+        view.release()
+    finally:
+        shm.close()
+
+def build_coverage_index(n, k, j, s, workers=1, progress=None, masks=None):
+    """构建 (n, k, j, s) 的覆盖索引，代价与非零元个数成正比。
+
+    每个 j 组的覆盖 k 组数量相同，每个 k 组满足的 j 组数量也相同，
+    因此 j_indptr 与 k_indptr 都可直接算出，两个方向的行都直接枚举，不需要转置。
+    workers > 1 时把 j 组与 k 组的编号区间切分给 ProcessPoolExecutor 并行构建，
+    各子进程把自己的分片写入同一块共享内存（前半为 j_indices，后半为 k_indices），父进程最后只做一次拷贝。
+
+    Args:
+        workers (int): 并行进程数，1 表示在当前进程内构建。
+        progress (callable): 可选的进度回调，参数为 {'phase': 'coverage', 'percent': 已完成百分比}。
+        masks (tuple): 可选的 (combination_masks(n, k), combination_masks(n, j))，单进程构建时直接使用，
+            不再重新枚举（子进程仍各自枚举）。
+    """
+    if not (s <= j <= k <= n):
+        raise ValueError("参数必须满足 s <= j <= k <= n")
+    num_j_groups = math.comb(n, j)
+    num_k_groups = math.comb(n, k)
+    per_j = _covering_count(n, k, j, s)
+    per_k = _covering_count(n, j, k, s)
+    nnz = num_j_groups * per_j
+    j_indptr = array('Q', range(0, nnz + 1, per_j))
+    k_indptr = array('Q', range(0, nnz + 1, per_k))
+    total_rows = num_j_groups + num_k_groups
+
+    done_rows = [0]
+    def on_rows(count):
+        done_rows[0] += count
+        progress({'phase': 'coverage', 'percent': 100.0 * done_rows[0] / total_rows})
+
+    workers = max(1, min(workers or 1, total_rows))
+    if workers == 1:
+        k_masks, j_masks = masks if masks is not None else (None, None)
+        j_indices = array('I', bytes(4 * nnz))
+        k_indices = array('I', bytes(4 * nnz))
+        _fill_rows(n, j, k, s, 0, num_j_groups, j_indices, on_rows if progress is not None else None, k_masks)
+        _fill_rows(n, k, j, s, 0, num_k_groups, k_indices, on_rows if progress is not None else None, j_masks)
+    else:
+        # 需要报告进度时把区间切得更细，按分片完成情况计算百分比；两个方向按行数分配分片
+        chunks = workers * 4 if progress is not None else workers
+        tasks = []
+        for offset, size, other, rows in ((0, j, k, num_j_groups), (nnz, k, j, num_k_groups)):
+            parts = max(1, min(rows, round(chunks * rows / total_rows)))
+            bounds = [rows * c // parts for c in range(parts + 1)]
+            tasks.extend((offset, size, other, bounds[c], bounds[c + 1]) for c in range(parts))
+        shm = shared_memory.SharedMemory(create=True, size=max(8 * nnz, 1))
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(_fill_rows_shared, shm.name, offset, nnz, n, size, other, s, start, stop):
+                           stop - start for offset, size, other, start, stop in tasks}
+                for future in as_completed(futures):
+                    future.result()
+                    if progress is not None:
+                        on_rows(futures[future])
+            j_indices = array('I')
+            j_indices.frombytes(shm.buf[:4 * nnz])
+            k_indices = array('I')
+            k_indices.frombytes(shm.buf[4 * nnz:8 * nnz])
+        finally:
+            shm.close()
+            shm.unlink()
+    return CoverageIndex(n, k, j, s, j_indptr, j_indices, k_indptr, k_indices)
@@ -1,13 +1,15 @@
+import time
+# Process start, for reporting the time until the main window is first shown
+STARTUP_TIME = time.perf_counter()
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, font
-import json
+import math
 import os
 import random
 import string
 from datetime import datetime
 from collections import defaultdict
-import threading
-import queue
+import multiprocessing
 # from ttkthemes import ThemedTk  <-- Removed this line
 
 # 尝试导入sv_ttk主题，如果不可用则使用标准ttk主题
@@ -20,12 +22,22 @@ except ImportError:
 
 # Try importing the core logic, handle potential import errors
 try:
-    from optimal_selection import greedy_optimal_selection, combinations, save_results, ilp_optimal_selection
+    # The solvers (and pulp) are imported only when used: in the solver process and when saving
+    from coverage import resolve_coverage
+    from results_db import ResultsDB
+    from result_file import RESULT_FILE_EXT, ResultFile
+    from verify import verify_cover, verify_masks
+    from solver_worker import SolverProcess
 except ImportError:
-    messagebox.showerror("Import Error", "Could not import functions from optimal_selection.py. Make sure the file exists and is in the same directory.")
+    messagebox.showerror("Import Error", "Could not import the core modules (coverage.py, results_db.py, ...). Make sure the files exist and are in the same directory.")
     exit()
 
 RESULTS_DIR = 'results'
+SAVED_PAGE_SIZE = 200 # Number of saved runs shown per page
+OUTPUT_PAGE_SIZE = 500 # Number of k-groups written to the output area at a time
+VERIFY_EXAMPLES = 5 # Number of uncovered j-groups listed when verification fails
+# Display names of the coverage meanings (see coverage.resolve_coverage)
+COVERAGE_MODE_LABELS = {'groups': "k-groups (each sharing ≥1 s-subset)", 'subsets': "s-subsets in one k-group"}
 
 class OptimalSelectionApp:
     def __init__(self, master):
@@ -109,6 +121,11 @@ class OptimalSelectionApp:
         self.coverage_entry = ttk.Entry(input_frame, width=entry_width)
         self.coverage_entry.grid(row=5, column=1, **pad_options, sticky="ew")
         self.coverage_entry.insert(0, "1") # Default value
+        # What "coverage" counts: distinct k-groups sharing an s-subset with the j-group,
+        # or distinct s-subsets of the j-group contained in a single k-group (project.txt E.g. 5)
+        self.coverage_mode_var = tk.StringVar(value=COVERAGE_MODE_LABELS['groups'])
+        ttk.Combobox(input_frame, textvariable=self.coverage_mode_var, state="readonly", width=22,
+                     values=list(COVERAGE_MODE_LABELS.values())).grid(row=5, column=2, **pad_options, sticky="ew")
 
         # Add vertical space
         input_frame.grid_rowconfigure(6, minsize=15)
@@ -136,7 +153,23 @@ class OptimalSelectionApp:
         
         self.algorithm_var = tk.StringVar(value="greedy") # Default to greedy algorithm
         ttk.Radiobutton(algo_frame, text="Greedy Algorithm", variable=self.algorithm_var, value="greedy").pack(side=tk.LEFT, padx=8, pady=3)
+        ttk.Radiobutton(algo_frame, text="Greedy + Local Search", variable=self.algorithm_var, value="local_search").pack(side=tk.LEFT, padx=8, pady=3)
         ttk.Radiobutton(algo_frame, text="Integer Linear Programming", variable=self.algorithm_var, value="ilp").pack(side=tk.LEFT, padx=8, pady=3)
+        # Race: greedy, local search and ILP run concurrently until one proves optimality or the time limit passes
+        ttk.Radiobutton(algo_frame, text="Race (all engines)", variable=self.algorithm_var, value="race").pack(side=tk.LEFT, padx=8, pady=3)
+        ttk.Label(algo_frame, text="Time Limit (s):").pack(side=tk.LEFT, padx=(16, 4), pady=3)
+        self.time_limit_entry = ttk.Entry(algo_frame, width=6)
+        self.time_limit_entry.pack(side=tk.LEFT, padx=4, pady=3)
+        self.time_limit_entry.insert(0, "60") # Default value, empty means no limit
+        # Low memory: enumerate the coverage relation on demand instead of building the index
+        # (chosen automatically when the index would not fit in memory; not used by ILP)
+        self.low_memory_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(algo_frame, text="Low Memory", variable=self.low_memory_var).pack(side=tk.LEFT, padx=8, pady=3)
+        # Processes used to build the coverage index
+        ttk.Label(algo_frame, text="Workers:").pack(side=tk.LEFT, padx=(16, 4), pady=3)
+        self.workers_entry = ttk.Entry(algo_frame, width=4)
+        self.workers_entry.pack(side=tk.LEFT, padx=4, pady=3)
+        self.workers_entry.insert(0, str(os.cpu_count() or 1)) # Default value
 
         # Configure input_frame columns to expand input controls
         input_frame.grid_columnconfigure(1, weight=1)
@@ -147,12 +180,20 @@ class OptimalSelectionApp:
         button_container = ttk.Frame(run_frame)
         button_container.grid(row=0, column=0, sticky="ew")
         button_container.grid_columnconfigure(0, weight=1)
-        button_container.grid_columnconfigure(1, weight=1)
+        button_container.grid_columnconfigure(2, weight=1)
 
-        self.run_button = ttk.Button(button_container, text="Run Optimal Selection", command=self.start_selection_thread, style='Accent.TButton')
+        self.run_button = ttk.Button(button_container, text="Run Optimal Selection", command=self.start_selection, style='Accent.TButton')
         self.run_button.grid(row=0, column=0, padx=12, pady=6, sticky="e")
+        self.cancel_button = ttk.Button(button_container, text="Cancel", command=self.cancel_selection, state=tk.DISABLED)
+        self.cancel_button.grid(row=0, column=1, padx=12, pady=6)
         self.save_button = ttk.Button(button_container, text="Save Results", command=self.save_current_results, state=tk.DISABLED)
-        self.save_button.grid(row=0, column=1, padx=12, pady=6, sticky="w")
+        self.save_button.grid(row=0, column=2, padx=12, pady=6, sticky="w")
+
+        # Progress of the running solver (phase, coverage build percentage, cover size, ILP bound)
+        self.progress_bar = ttk.Progressbar(button_container, orient=tk.HORIZONTAL, mode="determinate", maximum=100)
+        self.progress_bar.grid(row=1, column=0, columnspan=3, padx=12, pady=(2, 0), sticky="ew")
+        self.progress_label = ttk.Label(button_container, text="")
+        self.progress_label.grid(row=2, column=0, columnspan=3, padx=12, pady=(2, 0), sticky="w")
 
         # --- Output Frame Controls --- Using modern scrollbars and styles
         output_frame_inner = ttk.Frame(output_frame)
@@ -166,6 +207,14 @@ class OptimalSelectionApp:
         output_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.output_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 4))
 
+        # Large covers are shown one page at a time
+        output_controls = ttk.Frame(output_frame)
+        output_controls.pack(fill=tk.X, padx=2, pady=(2, 0))
+        self.more_groups_button = ttk.Button(output_controls, text="Show More Groups", command=self.show_more_groups, state=tk.DISABLED)
+        self.more_groups_button.pack(side=tk.LEFT, padx=6)
+        self.open_file_button = ttk.Button(output_controls, text="Open Result File...", command=self.open_result_file)
+        self.open_file_button.pack(side=tk.LEFT, padx=6)
+
         # --- Saved Files Frame Controls --- Using modern scrollbars and styles
         listbox_frame = ttk.Frame(saved_files_frame)
         listbox_frame.pack(pady=4, fill=tk.BOTH, expand=True)
@@ -190,14 +239,61 @@ class OptimalSelectionApp:
         self.delete_button = ttk.Button(button_frame_saved, text="Delete Selected", command=self.delete_selected_result, state=tk.DISABLED)
         self.delete_button.pack(side=tk.LEFT, padx=6)
 
+        self.export_button = ttk.Button(button_frame_saved, text="Export...", command=self.export_selected_result, state=tk.DISABLED)
+        self.export_button.pack(side=tk.LEFT, padx=6)
+
+        # Pagination controls for the saved runs list
+        page_frame_saved = ttk.Frame(saved_files_frame)
+        page_frame_saved.pack(fill=tk.X, pady=(0, 6))
+
+        self.prev_page_button = ttk.Button(page_frame_saved, text="< Prev", command=lambda: self.change_saved_page(-1), state=tk.DISABLED)
+        self.prev_page_button.pack(side=tk.LEFT, padx=6)
+
+        self.page_label = ttk.Label(page_frame_saved, text="")
+        self.page_label.pack(side=tk.LEFT, padx=6)
+
+        self.next_page_button = ttk.Button(page_frame_saved, text="Next >", command=lambda: self.change_saved_page(1), state=tk.DISABLED)
+        self.next_page_button.pack(side=tk.LEFT, padx=6)
+
         # --- Initial State ---
         self.current_results = None
         self.current_params = None
         self.current_n_samples = None
-        self.run_index_counter = self.get_next_run_index() # Initialize run index
-        self.result_queue = queue.Queue() # Queue for thread results
+        self.current_lower_bound = None
+        self.current_stats = None # Per-phase solver statistics of the displayed run, saved with it
+        self.solver = None # Running SolverProcess, if any
+        self.group_source = None # Callable (offset, limit) -> groups for the paginated output
+        self.groups_total = 0
+        self.groups_shown = 0
+        self.result_file = None # Memory-mapped ResultFile being displayed, if any
+        self.run_start_time = None
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.results_db = ResultsDB()
+        self.saved_page = 0
+        self.saved_run_ids = [] # Database ids of the runs shown in the listbox
+        try:
+            # One-time bulk import of legacy per-run JSON files; already imported files are skipped
+            self.results_db.import_json_results(RESULTS_DIR)
+        except Exception as e:
+            messagebox.showerror("Import Error", f"Failed to import saved JSON results: {e}")
         self.refresh_saved_files()
         self.toggle_sample_input() # Set initial state for sample input
+        master.after_idle(self.report_startup_time)
+
+    def report_startup_time(self):
+        """Shows how long it took from process start until the main window was first drawn."""
+        self.master.update_idletasks()
+        elapsed = time.perf_counter() - STARTUP_TIME
+        self.progress_label.config(text=f"Ready (started in {elapsed:.2f} s)")
+        print(f"Main window shown {elapsed:.2f} s after start")
+
+    def on_close(self):
+        """Stops a running solver process before closing the window."""
+        if self.solver is not None:
+            self.solver.cancel()
+            self.solver = None
+        self.close_result_file()
+        self.master.destroy()
 
     def toggle_sample_input(self):
         """Enable/disable manual sample input and auto-populate if manual."""
@@ -230,23 +326,6 @@ class OptimalSelectionApp:
             # Optionally clear the field when switching to random
             # self.n_samples_entry.delete(0, tk.END)
 
-    def get_next_run_index(self):
-        """Find the next available run index based on existing files."""
-        max_index = 0
-        try:
-            for filename in os.listdir(RESULTS_DIR):
-                if filename.endswith(".json"):
-                    parts = filename.split('-')
-                    if len(parts) >= 6:
-                        try:
-                            run_idx = int(parts[5])
-                            max_index = max(max_index, run_idx)
-                        except ValueError:
-                            continue # Ignore files not matching the pattern
-        except FileNotFoundError:
-            return 1 # No directory yet
-        return max_index + 1
-
     def validate_inputs(self):
         """Validate user inputs for parameters."""
         try:
@@ -256,6 +335,7 @@ class OptimalSelectionApp:
             j = int(self.j_entry.get())
             s = int(self.s_entry.get())
             coverage = int(self.coverage_entry.get())
+            workers = int(self.workers_entry.get())
 
             if not (45 <= m <= 54):
                 messagebox.showerror("Input Error", "m must be between 45 and 54.")
@@ -277,10 +357,28 @@ class OptimalSelectionApp:
             if not (coverage >= 1):
                  messagebox.showerror("Input Error", "Coverage must be at least 1.")
                  return None
+            if not (workers >= 1):
+                 messagebox.showerror("Input Error", "Workers must be at least 1.")
+                 return None
+            time_limit_str = self.time_limit_entry.get().strip()
+            time_limit = float(time_limit_str) if time_limit_str else None
+            if time_limit is not None and time_limit <= 0:
+                 messagebox.showerror("Input Error", "Time limit must be positive (leave empty for no ILP limit / the default local search budget).")
+                 return None
+
+            coverage_mode = next(mode for mode, label in COVERAGE_MODE_LABELS.items()
+                                 if label == self.coverage_mode_var.get())
+            try:
+                resolve_coverage(k, j, s, coverage, coverage_mode)
+            except ValueError as e:
+                messagebox.showerror("Input Error", f"Coverage cannot be reached: {e}")
+                return None
 
-            return {'m': m, 'n': n, 'k': k, 'j': j, 's': s, 'coverage': coverage}
+            return {'m': m, 'n': n, 'k': k, 'j': j, 's': s, 'coverage': coverage, 'coverage_mode': coverage_mode,
+                    'time_limit': time_limit, 'streaming': True if self.low_memory_var.get() else None,
+                    'workers': workers}
         except ValueError:
-            messagebox.showerror("Input Error", "All parameters (m, n, k, j, s) must be integers.")
+            messagebox.showerror("Input Error", "All parameters (m, n, k, j, s) and workers must be integers and the time limit a number.")
             return None
 
     def get_n_samples(self, params):
@@ -316,8 +414,8 @@ class OptimalSelectionApp:
             self.n_samples_entry.config(state=tk.DISABLED) # Disable editing after random generation
             return selected_samples
 
-    def start_selection_thread(self):
-        """Starts the selection process in a separate thread."""
+    def start_selection(self):
+        """Starts the selection process in a separate solver process."""
         params = self.validate_inputs()
         if not params:
             return
@@ -326,71 +424,137 @@ class OptimalSelectionApp:
         if not n_samples:
             return
 
-        self.output_text.delete(1.0, tk.END)
-        self.output_text.insert(tk.END, f"Running with parameters: m={params['m']}, n={params['n']}, k={params['k']}, j={params['j']}, s={params['s']}, coverage={params['coverage']}\n")
+        self.clear_output()
+        self.output_text.insert(tk.END, f"Running with parameters: m={params['m']}, n={params['n']}, k={params['k']}, j={params['j']}, s={params['s']}, coverage={params['coverage']} ({COVERAGE_MODE_LABELS[params['coverage_mode']]})\n")
         self.output_text.insert(tk.END, f"Selected n samples: {', '.join(n_samples)}\n\n")
         self.master.update_idletasks() # Update UI to show messages
 
         selected_algorithm = self.algorithm_var.get()
-        self.output_text.insert(tk.END, f"Starting {selected_algorithm.upper()} algorithm in background...\n")
+        params['algorithm'] = selected_algorithm
+        self.output_text.insert(tk.END, f"Starting {selected_algorithm.upper()} algorithm in a background process...\n")
         if selected_algorithm == "ilp":
             self.output_text.insert(tk.END, "Note: ILP algorithm may take significant time for larger inputs.\n")
+        elif selected_algorithm == "race":
+            self.output_text.insert(tk.END, "Note: the race uses all CPU cores until an engine proves optimality or the time limit passes.\n")
         self.master.update_idletasks()
 
-        # Disable button during calculation
+        # Disable run button during calculation, allow cancelling
         self.run_button.config(state=tk.DISABLED)
         self.save_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress_bar.config(value=0)
+        self.progress_label.config(text="Starting solver process...")
         # Clear previous results display potentially
         self.current_results = None
         self.current_params = None
         self.current_n_samples = None
 
-        # Create and start the worker thread
-        self.calculation_thread = threading.Thread(
-            target=self.run_selection_worker,
-            args=(n_samples, params, selected_algorithm, self.result_queue),
-            daemon=True # Allows main program to exit even if thread is running
-        )
-        self.calculation_thread.start()
-
-        # Start checking the queue for results
-        self.master.after(100, self.check_result_queue)
-
-    def run_selection_worker(self, n_samples, params, selected_algorithm, result_queue):
-        """Worker function to run the selection algorithm in a separate thread."""
         try:
-            start_time = datetime.now()
-            if selected_algorithm == "greedy":
-                optimal_groups = greedy_optimal_selection(n_samples, params['k'], params['j'], params['s'], params['coverage'])
-                algo_name = "Greedy Algorithm"
-            elif selected_algorithm == "ilp":
-                optimal_groups = ilp_optimal_selection(n_samples, params['k'], params['j'], params['s'], params['coverage'])
-                algo_name = "ILP Algorithm"
-            else:
-                 # Should not happen if UI validation is correct, but good practice
-                 raise ValueError("Invalid algorithm selected in worker thread.")
-
-            end_time = datetime.now()
-            duration = end_time - start_time
-            result_queue.put(("success", optimal_groups, algo_name, duration, params, n_samples))
+            self.run_start_time = datetime.now()
+            self.solver = SolverProcess(selected_algorithm, n_samples, params)
         except Exception as e:
-            result_queue.put(("error", e))
+            self.solver = None
+            self.finish_selection()
+            messagebox.showerror("Algorithm Error", f"Failed to start solver process: {e}")
+            return
+        self.running_params = params
+        self.running_n_samples = n_samples
+        self.running_algorithm = selected_algorithm
+        self.ilp_progress = {} # Latest ILP incumbent / lower bound of this run
 
-    def check_result_queue(self):
-        """Periodically check the queue for results from the worker thread."""
+        # Start polling the solver process for progress and results
+        self.master.after(100, self.poll_solver)
+
+    def cancel_selection(self):
+        """Terminates the running solver process."""
+        if self.solver is None:
+            return
+        self.solver.cancel()
+        self.solver = None
+        self.output_text.insert(tk.END, "\nCalculation cancelled.\n")
+        self.output_text.see(tk.END)
+        self.finish_selection()
+        self.progress_label.config(text="Cancelled")
+
+    def finish_selection(self):
+        """Restores the run controls after a solver run ends."""
+        self.run_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+
+    def poll_solver(self):
+        """Periodically drain progress events and the final result from the solver process."""
+        if self.solver is None:
+            return # Cancelled
         try:
-            result = self.result_queue.get_nowait()
-            # Process result in the main thread
-            self.handle_calculation_result(result)
-            # Re-enable button after processing
-            self.run_button.config(state=tk.NORMAL)
-        except queue.Empty:
-            # If queue is empty, check again later
-            self.master.after(100, self.check_result_queue)
+            for message in self.solver.poll():
+                if message[0] == "progress":
+                    self.show_progress(message[1])
+                elif message[0] == "result":
+                    _, optimal_groups, info = message
+                    duration = datetime.now() - self.run_start_time
+                    if self.running_algorithm == "ilp":
+                        algo_name = "ILP Algorithm"
+                        if info.get('solver') == "bnb":
+                            algo_name = "ILP Algorithm (in-process branch and bound)"
+                        if not info['optimal']:
+                            algo_name = f"ILP Algorithm, time limit reached - best found, proven lower bound {info['lower_bound']}"
+                    elif self.running_algorithm == "local_search":
+                        algo_name = "Greedy + Local Search"
+                    elif self.running_algorithm == "race":
+                        algo_name = f"Race, won by {info['engine']}"
+                    else:
+                        algo_name = "Greedy Algorithm"
+                    params = self.running_params
+                    if info.get('cached'):
+                        # A stored best-known cover, possibly found by another algorithm: label and save it as such
+                        algo_name += f", cached result found by {info['algorithm']}"
+                        params = dict(params, algorithm=info['algorithm'])
+                    self.progress_bar.config(value=100)
+                    self.progress_label.config(text="Done")
+                    self.handle_calculation_result(("success", optimal_groups, algo_name, duration, params, self.running_n_samples, info))
+                else:
+                    self.progress_label.config(text="Failed")
+                    self.handle_calculation_result(("error", message[1]))
         except Exception as e:
-             # Handle unexpected error during queue check/handling
-             messagebox.showerror("GUI Error", f"Error processing results: {e}")
-             self.run_button.config(state=tk.NORMAL) # Ensure button is re-enabled
+            # Handle unexpected error during polling/handling
+            messagebox.showerror("GUI Error", f"Error processing results: {e}")
+            self.solver.cancel()
+        if self.solver.finished:
+            self.solver = None
+            self.finish_selection()
+        else:
+            self.master.after(100, self.poll_solver)
+
+    def show_progress(self, event):
+        """Updates the progress bar and status line from a solver progress event."""
+        phase = event.get('phase')
+        if phase == 'coverage':
+            self.progress_bar.config(value=event['percent'])
+            text = "Building coverage index (cached)" if event.get('cached') else f"Building coverage index: {event['percent']:.0f}%"
+        elif phase == 'greedy':
+            text = f"Greedy selection: {event['cover_size']} groups chosen, {event['unsatisfied']} j-groups left"
+        elif phase == 'local_search':
+            text = f"Local search: best cover {event['cover_size']} groups after {event['steps']} swaps"
+        elif phase == 'ilp_reduce':
+            text = "Reducing ILP model"
+            if 'rows' in event:
+                text += f": {event['rows']} constraints, {event['columns']} variables"
+        elif phase == 'race':
+            text = "Race"
+            if event['incumbent'] is not None:
+                text += f": best {event['incumbent']} groups ({event['engine']})"
+            text += f", lower bound {event['lower_bound']}, {event['running']} engines running"
+        elif phase == 'ilp_solve':
+            self.ilp_progress.update({key: value for key, value in event.items() if value is not None})
+            text = "Solving ILP"
+            if 'incumbent' in self.ilp_progress:
+                text += f": best {self.ilp_progress['incumbent']:g} groups"
+            if 'lower_bound' in self.ilp_progress:
+                text += f", lower bound {self.ilp_progress['lower_bound']:g}"
+        else:
+            text = str(phase)
+        elapsed = (datetime.now() - self.run_start_time).total_seconds()
+        self.progress_label.config(text=f"{text}  ({elapsed:.0f}s)")
 
     def handle_calculation_result(self, result):
         """Handles the result received from the worker thread and updates the UI."""
@@ -398,20 +562,40 @@ class OptimalSelectionApp:
         self.output_text.insert(tk.END, "Calculation finished. Processing results...\n")
 
         if status == "success":
-            _, optimal_groups, algo_name, duration, params, n_samples = result
+            _, optimal_groups, algo_name, duration, params, n_samples, info = result
+            lower_bound = info['lower_bound']
             self.output_text.insert(tk.END, f"\nOptimal k-sample groups ({algo_name}):\n")
             if optimal_groups is not None:
                 sorted_optimal_groups = sorted([tuple(sorted(group)) for group in optimal_groups])
-                for i, group in enumerate(sorted_optimal_groups):
-                    self.output_text.insert(tk.END, f"  {i+1}. {','.join(group)}\n")
+                self.show_groups(lambda offset, limit: sorted_optimal_groups[offset:offset + limit], len(sorted_optimal_groups))
                 self.output_text.insert(tk.END, f"\nTotal groups found: {len(optimal_groups)}\n")
+                if len(optimal_groups) <= lower_bound:
+                    self.output_text.insert(tk.END, f"Lower bound: {lower_bound} (result is optimal)\n")
+                else:
+                    self.output_text.insert(tk.END, f"Lower bound: {lower_bound} (at most {len(optimal_groups) - lower_bound} groups above optimal)\n")
                 self.output_text.insert(tk.END, f"Calculation time: {duration}\n")
+                if info.get('peak_rss_kb') is not None:
+                    self.output_text.insert(tk.END, f"Peak memory (solver process): {info['peak_rss_kb'] / 1024:.1f} MB\n")
+                if info.get('uncovered'):
+                    # The solver only reports the count; list a few offending j-groups here
+                    count, examples = verify_cover(n_samples, optimal_groups, params['k'], params['j'], params['s'],
+                                                   params['coverage'], params.get('coverage_mode', 'groups'),
+                                                   limit=VERIFY_EXAMPLES)
+                    self.show_verification(count, examples, params['n'], params['j'])
+                elif 'uncovered' in info:
+                    self.show_verification(0, [], params['n'], params['j'])
+                if info.get('engines'):
+                    self.show_race(info['engines'])
+                if info.get('stats') is not None:
+                    self.show_stats(info['stats'])
                 self.current_results = sorted_optimal_groups
+                self.current_lower_bound = lower_bound
+                self.current_stats = info.get('stats')
                 self.current_params = params
                 self.current_n_samples = n_samples
                 self.save_button.config(state=tk.NORMAL)
             else:
-                if algo_name == "ILP Algorithm":
+                if algo_name.startswith("ILP Algorithm"):
                     self.output_text.insert(tk.END, "ILP solver did not find an optimal solution or failed.\n")
                 else:
                     # Greedy should ideally always return a list, even if empty
@@ -437,117 +621,289 @@ class OptimalSelectionApp:
     # def run_selection(self):
     #    ... (old synchronous code) ...
 
+    def clear_output(self):
+        """Clears the output area and forgets any paginated group listing."""
+        self.output_text.delete(1.0, tk.END)
+        self.group_source = None
+        self.groups_total = self.groups_shown = 0
+        self.more_groups_button.config(state=tk.DISABLED, text="Show More Groups")
+        self.close_result_file()
+
+    def show_groups(self, source, total):
+        """Starts a paginated k-group listing at the end of the output area.
+
+        source(offset, limit) returns the groups to display; later pages are inserted
+        at the "groups_end" mark, so text written after the listing stays below it.
+        """
+        self.group_source = source
+        self.groups_total = total
+        self.groups_shown = 0
+        self.output_text.mark_set("groups_end", "end-1c")
+        self.output_text.mark_gravity("groups_end", tk.LEFT)
+        self.show_more_groups()
+
+    def show_more_groups(self):
+        """Appends the next page of the current k-group listing."""
+        if self.group_source is None:
+            return
+        groups = self.group_source(self.groups_shown, OUTPUT_PAGE_SIZE)
+        lines = "".join(f"  {self.groups_shown + i + 1}. {','.join(map(str, group))}\n" for i, group in enumerate(groups))
+        position = self.output_text.index("groups_end")
+        self.output_text.insert(position, lines)
+        self.output_text.mark_set("groups_end", f"{position} + {len(lines)} chars")
+        self.groups_shown += len(groups)
+        remaining = self.groups_total - self.groups_shown
+        if remaining > 0 and groups:
+            self.more_groups_button.config(state=tk.NORMAL, text=f"Show More Groups ({remaining} left)")
+        else:
+            self.more_groups_button.config(state=tk.DISABLED, text="Show More Groups")
+
+    def show_verification(self, count, examples, n, j):
+        """Writes the outcome of the independent cover check (see verify.py) to the output area."""
+        total = math.comb(n, j)
+        if count == 0:
+            self.output_text.insert(tk.END, f"Verified: all {total} j-groups are covered as required\n")
+            return
+        self.output_text.insert(tk.END, f"WARNING: verification failed - {count} of {total} j-groups are not covered as required, e.g.:\n")
+        for group in examples:
+            self.output_text.insert(tk.END, f"  {', '.join(map(str, group))}\n")
+
+    def show_race(self, engines):
+        """Writes the outcome of each engine of a race run (see race.race_selection)."""
+        self.output_text.insert(tk.END, "\nRace engines:\n")
+        for engine in engines:
+            if engine['error']:
+                outcome = f"failed: {engine['error']}"
+            elif engine['size'] is None:
+                outcome = "stopped before finishing"
+            else:
+                outcome = f"{engine['size']} groups after {engine['seconds']:.1f}s"
+                if engine['optimal']:
+                    outcome += " (proven optimal)"
+            self.output_text.insert(tk.END, f"  {engine['engine']:<16} {outcome}\n")
+
+    def show_stats(self, stats):
+        """Writes the per-phase timing, memory and counters of a run (see optimal_selection.RunStats)."""
+        if hasattr(stats, 'as_dict'):
+            stats = stats.as_dict()
+        self.output_text.insert(tk.END, "\nSolver profile (phase: wall / CPU time, peak memory):\n")
+        for record in stats['phases']:
+            memory = f", {record['peak_rss_kb'] / 1024:.1f} MB" if record.get('peak_rss_kb') is not None else ""
+            self.output_text.insert(tk.END, f"  {record['phase']:<15} {record['wall']:8.3f}s / {record['cpu']:8.3f}s{memory}\n")
+        self.output_text.insert(tk.END, f"  {'total':<15} {stats['wall']:8.3f}s / {stats['cpu']:8.3f}s\n")
+        if stats['counters']:
+            counters = ", ".join(f"{key}={value}" for key, value in stats['counters'].items())
+            self.output_text.insert(tk.END, f"  Counters: {counters}\n")
+
+    def verify_saved(self, record, samples, masks):
+        """Verifies a saved run or result file (record holds its parameters) and shows the outcome."""
+        n = record.get('n')
+        if n is not None and len(samples) != n:
+            self.output_text.insert(tk.END, f"WARNING: cannot verify - {len(samples)} samples are saved but n is {n}\n")
+            return
+        try:
+            count, examples = verify_masks(samples, masks, record['k'], record['j'], record['s'], record['coverage'],
+                                           record.get('coverage_mode', 'groups'), limit=VERIFY_EXAMPLES)
+        except ValueError as e:
+            self.output_text.insert(tk.END, f"WARNING: verification failed - {e}\n")
+            return
+        self.show_verification(count, examples, n if n is not None else len(samples), record['j'])
+
+    def close_result_file(self):
+        """Releases the memory-mapped result file being displayed, if any."""
+        if self.result_file is not None:
+            self.group_source = None
+            self.result_file.close()
+            self.result_file = None
+
+    def open_result_file(self):
+        """Displays a compact binary result file without importing it; groups are decoded page by page."""
+        path = filedialog.askopenfilename(title="Open Result File", initialdir=RESULTS_DIR,
+                                          filetypes=[("Compact result files", f"*{RESULT_FILE_EXT}"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            result_file = ResultFile(path)
+        except Exception as e:
+            messagebox.showerror("Open Error", f"Failed to open result file: {e}")
+            return
+        self.clear_output()
+        self.result_file = result_file
+        meta = result_file.meta
+        self.output_text.insert(tk.END, f"--- Result File: {os.path.basename(path)} ---\n\n")
+        self.output_text.insert(tk.END, f"Parameters:\n")
+        for key in ('m', 'n', 'k', 'j', 's', 'coverage'):
+            self.output_text.insert(tk.END, f"  {key}: {meta.get(key)}\n")
+        mode = meta.get('coverage_mode', 'groups')
+        self.output_text.insert(tk.END, f"  coverage meaning: {COVERAGE_MODE_LABELS.get(mode, mode)}\n")
+        self.output_text.insert(tk.END, f"Algorithm: {meta.get('algorithm') or 'N/A'}\n")
+        self.output_text.insert(tk.END, f"Lower Bound: {meta['lower_bound'] if meta.get('lower_bound') is not None else 'N/A'}\n")
+        self.output_text.insert(tk.END, f"Saved: {meta.get('created_at') or 'N/A'}\n\n")
+        self.output_text.insert(tk.END, "Selected k-groups:\n")
+        self.show_groups(lambda offset, limit: [tuple(sorted(group)) for group in result_file.groups(offset, limit)],
+                         result_file.num_groups)
+        self.output_text.insert(tk.END, f"\nTotal groups: {result_file.num_groups}\n")
+        self.verify_saved(meta, result_file.samples, result_file.masks())
+        if meta.get('stats') is not None:
+            self.show_stats(meta['stats'])
+        self.save_button.config(state=tk.DISABLED)
+        self.current_results = None
+        self.current_params = None
+        self.current_n_samples = None
+
+    def export_selected_result(self):
+        """Exports the selected run as a compact binary file or as JSON for other tools."""
+        selected_indices = self.saved_files_listbox.curselection()
+        if not selected_indices:
+            messagebox.showwarning("Export Error", "No run selected to export.")
+            return
+        run_id = self.saved_run_ids[selected_indices[0]]
+        run = self.results_db.get_run(run_id, unpack=False)
+        if run is None:
+            messagebox.showerror("Export Error", "Saved run not found (already deleted?).")
+            self.refresh_saved_files()
+            return
+        path = filedialog.asksaveasfilename(title="Export Result", initialfile=run['name'],
+                                            defaultextension=RESULT_FILE_EXT,
+                                            filetypes=[("Compact result files", f"*{RESULT_FILE_EXT}"), ("JSON", "*.json")])
+        if not path:
+            return
+        try:
+            self.results_db.export_run(run_id, path)
+            messagebox.showinfo("Export Successful", f"Run exported to:\n{path}")
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Failed to export run: {e}")
+
     def save_current_results(self):
-        """Saves the currently displayed results to a JSON file."""
+        """Saves the currently displayed results to the results database."""
         if not self.current_results or not self.current_params:
             messagebox.showwarning("Save Error", "No results to save. Please run the selection first.")
             return
 
         try:
-            # Use the centralized save_results function
-            filepath = save_results(
+            from optimal_selection import save_results
+            # Use the centralized save_results function; the run index is allocated by the database
+            name = save_results(
                 self.current_params['m'],
                 self.current_params['n'],
                 self.current_params['k'],
                 self.current_params['j'],
                 self.current_params['s'],
                 self.current_results,
-                self.run_index_counter,
-                self.current_params['coverage']
+                coverage=self.current_params['coverage'],
+                algorithm=self.current_params.get('algorithm'),
+                samples=self.current_n_samples,
+                lower_bound=self.current_lower_bound,
+                stats=self.current_stats,
+                coverage_mode=self.current_params.get('coverage_mode', 'groups'),
+                db_path=self.results_db.db_path
             )
-            messagebox.showinfo("Save Successful", f"Results saved to:\n{filepath}")
-            self.run_index_counter += 1 # Increment run index for the next potential save
+            messagebox.showinfo("Save Successful", f"Results saved as:\n{name}")
+            self.saved_page = 0 # Newest runs are listed first
             self.refresh_saved_files() # Update the listbox
             self.save_button.config(state=tk.DISABLED) # Disable after saving
         except Exception as e:
             messagebox.showerror("Save Error", f"Failed to save results: {e}")
 
+    def change_saved_page(self, delta):
+        """Moves the saved runs list to the previous/next page."""
+        self.saved_page = max(0, self.saved_page + delta)
+        self.refresh_saved_files()
+
     def refresh_saved_files(self):
-        """Clears and repopulates the listbox with files from the results directory."""
+        """Clears and repopulates the listbox with one page of runs from the results database."""
         self.saved_files_listbox.delete(0, tk.END)
+        self.saved_run_ids = []
         self.delete_button.config(state=tk.DISABLED)
+        self.export_button.config(state=tk.DISABLED)
         try:
-            files = [f for f in os.listdir(RESULTS_DIR) if f.endswith('.json')]
-            # Sort files, perhaps by timestamp embedded in name or creation time
-            files.sort(key=lambda x: os.path.getmtime(os.path.join(RESULTS_DIR, x)), reverse=True)
-            for filename in files:
-                self.saved_files_listbox.insert(tk.END, filename)
-        except FileNotFoundError:
-            # results directory might not exist initially or after deletion
-            pass
+            total = self.results_db.count_runs()
+            last_page = max(0, (total - 1) // SAVED_PAGE_SIZE)
+            self.saved_page = min(self.saved_page, last_page)
+            runs = self.results_db.list_runs(offset=self.saved_page * SAVED_PAGE_SIZE, limit=SAVED_PAGE_SIZE)
+            for run in runs:
+                self.saved_files_listbox.insert(tk.END, f"{run['name']}  ({run['created_at']})")
+                self.saved_run_ids.append(run['id'])
+            self.page_label.config(text=f"Page {self.saved_page + 1} / {last_page + 1} ({total} runs)")
+            self.prev_page_button.config(state=tk.NORMAL if self.saved_page > 0 else tk.DISABLED)
+            self.next_page_button.config(state=tk.NORMAL if self.saved_page < last_page else tk.DISABLED)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to list saved files: {e}")
+            messagebox.showerror("Error", f"Failed to list saved runs: {e}")
 
     def load_selected_result(self, event=None):
-        """Loads the content of the selected file into the output text area."""
+        """Loads the selected run from the results database into the output text area."""
         selected_indices = self.saved_files_listbox.curselection()
         if not selected_indices:
             self.delete_button.config(state=tk.DISABLED)
+            self.export_button.config(state=tk.DISABLED)
             return
 
-        selected_filename = self.saved_files_listbox.get(selected_indices[0])
-        filepath = os.path.join(RESULTS_DIR, selected_filename)
+        run_id = self.saved_run_ids[selected_indices[0]]
 
         try:
-            with open(filepath, 'r') as f:
-                data = json.load(f)
+            run = self.results_db.get_run(run_id, unpack=False) # Groups are read page by page below
+            if run is None:
+                messagebox.showerror("Error", "Saved run not found (already deleted?).")
+                self.refresh_saved_files()
+                return
 
-            self.output_text.delete(1.0, tk.END)
-            self.output_text.insert(tk.END, f"--- Loaded Result File: {selected_filename} ---\n\n")
+            self.clear_output()
+            self.output_text.insert(tk.END, f"--- Loaded Result: {run['name']} ---\n\n")
             self.output_text.insert(tk.END, f"Parameters:\n")
-            params = data.get('parameters', {})
-            for key, value in params.items():
-                self.output_text.insert(tk.END, f"  {key}: {value}\n")
-            self.output_text.insert(tk.END, f"Run Index: {data.get('run_index', 'N/A')}\n\n")
+            for key in ('m', 'n', 'k', 'j', 's', 'coverage'):
+                self.output_text.insert(tk.END, f"  {key}: {run[key]}\n")
+            self.output_text.insert(tk.END, f"  coverage meaning: {COVERAGE_MODE_LABELS.get(run['coverage_mode'], run['coverage_mode'])}\n")
+            self.output_text.insert(tk.END, f"Run Index: {run['run_index']}\n")
+            self.output_text.insert(tk.END, f"Algorithm: {run['algorithm'] or 'N/A'}\n")
+            self.output_text.insert(tk.END, f"Lower Bound: {run['lower_bound'] if run['lower_bound'] is not None else 'N/A'}\n")
+            self.output_text.insert(tk.END, f"Saved: {run['created_at']}\n\n")
             self.output_text.insert(tk.END, "Selected k-groups:\n")
-            groups = data.get('selected_k_groups', [])
-            if groups:
-                 # Ensure inner lists are tuples for sorting if needed, though loading from JSON usually keeps lists
-                 # Sort for consistent display if desired
-                 sorted_groups = sorted([tuple(sorted(group)) for group in groups])
-                 for i, group in enumerate(sorted_groups):
-                     self.output_text.insert(tk.END, f"  {i+1}. {','.join(map(str, group))}\n") # Ensure items are strings for join
-                 self.output_text.insert(tk.END, f"\nTotal groups: {len(groups)}\n")
+            if run['num_groups']:
+                 # Runs are stored in display order, so each page is read straight from the database
+                 samples = run['samples']
+                 self.show_groups(lambda offset, limit: [tuple(sorted(group)) for group in self.results_db.get_groups(run_id, offset, limit, samples)],
+                                  run['num_groups'])
+                 self.output_text.insert(tk.END, f"\nTotal groups: {run['num_groups']}\n")
+                 self.verify_saved(run, samples, self.results_db.get_masks(run_id))
+                 if run['stats'] is not None:
+                     self.show_stats(run['stats'])
             else:
-                self.output_text.insert(tk.END, "No groups found in this file.\n")
+                self.output_text.insert(tk.END, "No groups found in this run.\n")
 
             self.delete_button.config(state=tk.NORMAL)
+            self.export_button.config(state=tk.NORMAL)
             self.save_button.config(state=tk.DISABLED) # Disable saving when viewing old results
             self.current_results = None # Clear current run results when loading
             self.current_params = None
             self.current_n_samples = None
 
-        except FileNotFoundError:
-            messagebox.showerror("Error", f"File not found: {selected_filename}")
-            self.refresh_saved_files()
-        except json.JSONDecodeError:
-            messagebox.showerror("Error", f"Invalid JSON format in file: {selected_filename}")
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load file: {e}")
+            messagebox.showerror("Error", f"Failed to load saved run: {e}")
 
     def delete_selected_result(self):
-        """Deletes the selected result file from the results directory."""
+        """Deletes the selected run from the results database."""
         selected_indices = self.saved_files_listbox.curselection()
         if not selected_indices:
-            messagebox.showwarning("Delete Error", "No file selected to delete.")
+            messagebox.showwarning("Delete Error", "No run selected to delete.")
             return
 
-        selected_filename = self.saved_files_listbox.get(selected_indices[0])
-        filepath = os.path.join(RESULTS_DIR, selected_filename)
+        run_id = self.saved_run_ids[selected_indices[0]]
+        selected_name = self.saved_files_listbox.get(selected_indices[0])
 
-        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete\n{selected_filename}?"):
+        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete\n{selected_name}?"):
             try:
-                os.remove(filepath)
-                messagebox.showinfo("Delete Successful", f"File deleted: {selected_filename}")
+                if self.results_db.delete_run(run_id):
+                    messagebox.showinfo("Delete Successful", f"Run deleted: {selected_name}")
+                else:
+                    messagebox.showerror("Delete Error", f"Run not found (already deleted?): {selected_name}")
                 self.refresh_saved_files()
-                self.output_text.delete(1.0, tk.END) # Clear output area after delete
-            except FileNotFoundError:
-                 messagebox.showerror("Delete Error", f"File not found (already deleted?): {selected_filename}")
-                 self.refresh_saved_files()
+                self.clear_output() # Clear output area after delete
             except Exception as e:
-                messagebox.showerror("Delete Error", f"Failed to delete file: {e}")
+                messagebox.showerror("Delete Error", f"Failed to delete run: {e}")
 
 if __name__ == "__main__":
+    # 打包后的程序在子进程中并行构建覆盖索引时需要
+    multiprocessing.freeze_support()
 
     root = tk.Tk()
     # 创建应用实例并应用Sun Valley主题
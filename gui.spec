@@ -7,6 +7,7 @@ a = Analysis(
     binaries=[],
     datas=[],
     hiddenimports=[],
+    # hook-pulp.py 只收集构建平台的 CBC；求解器模块与 pulp 在运行时才按需导入
     hookspath=['.'],
     hooksconfig={},
     runtime_hooks=[],
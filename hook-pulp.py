@@ -1,28 +1,26 @@
 # hook-pulp.py
-from PyInstaller.utils.hooks import collect_data_files, collect_submodules
-
-# 收集pulp模块的所有数据文件
-datas = collect_data_files('pulp')
-
-# 特别关注solverdir目录，确保CBC求解器被包含
+# 只打包构建平台对应的 CBC 求解器（pulp 自带各平台共约 43 MB，单个平台 4-7 MB），
+# 目录结构与 pulp 安装目录相同，pulp 与 backends.cbc_executable 都能找到它。
+# pulp 的子模块由 backends.py / pulp_backend.py 中的 import 语句静态分析得到，不再收集全部子模块。
 import os
-import pulp
 
-# 获取pulp库的安装路径
-pulp_path = os.path.dirname(pulp.__file__)
-solverdir_path = os.path.join(pulp_path, 'solverdir')
+import pulp
+from pulp.apis.coin_api import pulp_cbc_path
 
-# 添加CBC求解器目录
-if os.path.exists(solverdir_path):
-    cbc_path = os.path.join(solverdir_path, 'cbc')
-    if os.path.exists(cbc_path):
-        # 添加所有CBC求解器文件
-        for root, dirs, files in os.walk(cbc_path):
-            for file in files:
-                if file.endswith('.exe'):
-                    source = os.path.join(root, file)
-                    target = os.path.relpath(source, pulp_path)
-                    datas.append((source, os.path.dirname(target)))
+# 相对于 site-packages 的目标目录，例如 pulp/solverdir/cbc/win/i64
+site_packages = os.path.dirname(os.path.dirname(os.path.realpath(pulp.__file__)))
+cbc_dir = os.path.dirname(os.path.realpath(pulp_cbc_path))
+target = os.path.relpath(cbc_dir, site_packages)
 
-# 收集所有子模块
-hiddenimports = collect_submodules('pulp')
\ No newline at end of file
+# 可执行文件作为二进制文件收集，解压后保留执行权限；许可证等其他文件作为数据文件
+binaries = []
+datas = []
+if os.path.exists(pulp_cbc_path):
+    for file in os.listdir(cbc_dir):
+        source = os.path.join(cbc_dir, file)
+        if not os.path.isfile(source) or file.endswith(('.py', '.pyc')):
+            continue
+        if os.path.samefile(source, pulp_cbc_path):
+            binaries.append((source, target))
+        else:
+            datas.append((source, target))
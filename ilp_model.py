@@ -0,0 +1,408 @@
+"""ILP 模型的预处理：对称性破除与支配约简。
+
+原始模型是一个集合多重覆盖问题：每个 k 组一个 0/1 变量，每个 j 组一条
+“覆盖它的 k 组之和 >= coverage” 的约束。在交给 CBC 之前先缩小模型规模。
+"""
+import itertools
+import math
+import os
+import re
+import subprocess
+import tempfile
+from array import array
+
+from combinatorics import iter_bits, lex_rank
+from coverage import bitset_from_indices
+
+class ModelRows:
+    """约束的紧凑（CSR）存储：第 r 条约束的列为 indices[indptr[r]:indptr[r+1]]（升序），右端项为 rhs[r]。
+
+    rhs 为整数时所有约束的右端项相同。不做约简时直接引用覆盖索引的 j_indptr / j_indices，不复制任何数据；
+    约简后的约束也只占每个非零元 4 字节。按下标或迭代访问得到 (列, 右端项)。
+    """
+
+    def __init__(self, indptr, indices, rhs):
+        self.indptr, self.indices, self.rhs = indptr, indices, rhs
+
+    @classmethod
+    def from_rows(cls, rows):
+        """由 (升序的列, 右端项) 序列构建。"""
+        indptr = array('Q', [0])
+        indices = array('I')
+        rhs = array('I')
+        for cols, r in rows:
+            indices.extend(cols)
+            indptr.append(len(indices))
+            rhs.append(r)
+        return cls(indptr, indices, rhs)
+
+    @property
+    def nnz(self):
+        return self.indptr[-1]
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, r):
+        rhs = self.rhs if isinstance(self.rhs, int) else self.rhs[r]
+        return self.indices[self.indptr[r]:self.indptr[r + 1]], rhs
+
+    def __iter__(self):
+        for r in range(len(self)):
+            yield self[r]
+
+class ReducedModel:
+    """约简后的模型。
+
+    fixed: 已固定为 1 的 k 组索引。
+    columns: 仍需求解的 k 组索引（升序的 array）。
+    rows: ModelRows，已去掉被支配或已满足的约束。
+    extra: 对称性破除约束 [(列列表, 右端项)]，含义为所选列之和 >= 右端项。
+    replaced: 被支配而删除的列 -> 支配它的列（不覆盖任何约束的列映射为 None）。
+    """
+
+    def __init__(self, n, k, fixed, columns, rows, extra, replaced):
+        self.n, self.k = n, k
+        self.fixed = fixed
+        self.columns = columns
+        self.rows = rows
+        self.extra = extra
+        self.replaced = replaced
+
+    def warm_start(self, cover):
+        """把一个可行解（位置元组列表）转换为本模型中可行的初始解，返回列索引集合。
+
+        若做了对称性破除，先重新命名样本，使解中第一组变为 K0、第二组变为某个代表组；
+        再把被删除的列沿 replaced 替换为支配它的列。
+        """
+        n, k = self.n, self.k
+        cover = [tuple(sorted(group)) for group in cover]
+        if self.fixed and len(cover) >= 1:
+            g0 = set(cover[0])
+            g1 = set(cover[1]) if len(cover) >= 2 else set()
+            order = (sorted(g0 & g1) + sorted(g0 - g1) + sorted(g1 - g0)
+                     + sorted(set(range(n)) - g0 - g1))
+            relabel = {old: new for new, old in enumerate(order)}
+            cover = [tuple(sorted(relabel[p] for p in group)) for group in cover]
+        chosen = set()
+        for group in cover:
+            col = lex_rank(group, n)
+            while col in self.replaced:
+                col = self.replaced[col]
+            if col is not None and col not in self.fixed:
+                chosen.add(col)
+        return chosen
+
+class _Bitsets:
+    """支配约简中的集合表示：整数位集，求交是一次大整数运算。适合较稠密的模型。"""
+
+    make = staticmethod(bitset_from_indices)
+    members = staticmethod(iter_bits)
+
+class _Frozensets:
+    """支配约简中的集合表示：frozenset。非常稀疏的模型中比逐行 C(n, k) 位的位集更省内存。"""
+
+    @staticmethod
+    def make(members, size):
+        return frozenset(members)
+
+    members = staticmethod(sorted)
+
+def _set_kind(num_rows, num_cols, nnz):
+    """选择约简时内存较小的集合表示：位集约为 行数 * 列数 / 8 字节，frozenset 约为每个元素 80 字节。"""
+    return _Bitsets if num_rows * num_cols <= 640 * nnz else _Frozensets
+
+def _members_by_col(rows, num_cols):
+    """每一列出现在哪些约束中（升序的约束编号数组，每个元素 4 字节）。"""
+    by_col = [array('I') for _ in range(num_cols)]
+    appends = [members.append for members in by_col]
+    for r, (cols, _) in enumerate(rows):
+        for c in cols:
+            appends[c](r)
+    return by_col
+
+def _intersect(sets, stop):
+    """依次求交，结果等于 stop 时提前结束（此后只会更小）。"""
+    acc = None
+    for x in sets:
+        acc = x if acc is None else acc & x
+        if acc == stop:
+            break
+    return acc
+
+def _drop_dominated_rows(rows, kind, num_cols):
+    """去掉重复与被支配的约束：若 cols(B) ⊆ cols(A) 且 rhs(B) >= rhs(A)，A 由 B 蕴含。
+
+    rows 为 [(升序的列数组, 右端项)]。包含 B 的全部列的约束恰为这些列各自所在约束集合的交，
+    集合用 kind（_Bitsets 或 _Frozensets）表示。
+    """
+    by_col = _members_by_col(rows, num_cols)
+    col_sets = [kind.make(members, len(rows)) for members in by_col]
+    del by_col
+    removed = set()
+    for b, (cols_b, rhs_b) in enumerate(rows):
+        if b in removed or not len(cols_b):
+            continue
+        alone = kind.make([b], len(rows))
+        for a in kind.members(_intersect((col_sets[c] for c in cols_b), alone)):
+            if a == b or a in removed:
+                continue
+            cols_a, rhs_a = rows[a]
+            if rhs_b >= rhs_a and (len(cols_b) != len(cols_a) or rhs_b != rhs_a or b < a):
+                removed.add(a)
+    return [row for r, row in enumerate(rows) if r not in removed]
+
+def _drop_dominated_columns(rows, columns, protected, replaced, kind, num_cols):
+    """去掉被支配的列：若 rows(A) ⊆ rows(B)，任何含 A 的解都可用 B 替换 A。
+
+    仅在所有右端项为 1 时成立（多重覆盖下 A、B 可能都需要）；
+    protected 中的列出现在对称性破除约束里，不能删除，但可以支配其它列。
+    删除的列及其替代列记录在 replaced 中。
+    """
+    by_col = _members_by_col(rows, num_cols)
+    row_sets = [kind.make(cols, num_cols) for cols, _ in rows]
+    removed = set()
+    for a in columns:
+        if a in protected:
+            continue
+        rows_a = by_col[a]
+        if not rows_a:
+            removed.add(a)
+            replaced[a] = None
+            continue
+        alone = kind.make([a], num_cols)
+        # 出现在 A 的每一条约束中的列，即 rows(B) ⊇ rows(A) 的列 B
+        for b in kind.members(_intersect((row_sets[r] for r in rows_a), alone)):
+            if b == a or b in removed:
+                continue
+            if len(by_col[b]) != len(rows_a) or b in protected or b < a:
+                removed.add(a)
+                replaced[a] = b
+                break
+    if not removed:
+        return rows, columns
+    rows = [(array('I', (c for c in cols if c not in removed)), rhs) for cols, rhs in rows]
+    return rows, array('I', (c for c in columns if c not in removed))
+
+def reduce_model(index, coverage, symmetry=True, dominance=True, max_passes=10):
+    """对覆盖索引对应的 ILP 做预处理，返回 ReducedModel。
+
+    对称性破除：模型在 n 个样本的对称群下不变，任一可行解都可重新命名使其包含
+    字典序第一个 k 组 K0 = {0..k-1}，因此固定 x_K0 = 1。若此后仍有未满足的约束，
+    解中必有另一组 K1，设 |K1 ∩ K0| = t，用保持 K0 不变的置换可把 K1 变为
+    {0..t-1} ∪ {k..2k-t-1}，于是这些代表组中至少选一个。
+    支配约简：反复删除被支配的约束与列，直到不再变化。约束始终以升序的列数组保存，
+    包含关系用按 _set_kind 选择的位集或 frozenset 求交得到，结束后再存回紧凑的 ModelRows。
+    两者都不做时约束直接引用覆盖索引，不复制。
+    """
+    n, k = index.n, index.k
+    num_cols = index.num_k_groups
+    rows = ModelRows(index.j_indptr, index.j_indices, coverage)
+    columns = array('I', range(num_cols))
+    fixed = []
+    extra = []
+    protected = set()
+    replaced = {}
+
+    if symmetry:
+        fixed.append(0)
+        first_rows = set(index.covered_by(0))
+        # 第 0 列是每条约束中最小的列，去掉它只需跳过首项
+        rows = ModelRows.from_rows(
+            (cols[1:] if cols[0] == 0 else cols, coverage - 1 if t in first_rows else coverage)
+            for t, (cols, _) in enumerate(rows)
+            if coverage > 1 or t not in first_rows)
+        columns = columns[1:]
+        if len(rows):
+            representatives = [
+                lex_rank(tuple(range(t)) + tuple(range(k, 2 * k - t)), n)
+                for t in range(k - 1, max(0, 2 * k - n) - 1, -1)
+            ]
+            extra.append((representatives, 1))
+            protected.update(representatives)
+
+    if dominance and len(rows):
+        kind = _set_kind(len(rows), num_cols, rows.nnz)
+        # 约简过程中逐条替换约束，先拆成独立的数组，并释放对称性破除生成的 ModelRows
+        working = list(rows)
+        del rows
+        for _ in range(max_passes):
+            before = (len(working), len(columns))
+            working = _drop_dominated_rows(working, kind, num_cols)
+            if working and max(rhs for _, rhs in working) == 1:
+                working, columns = _drop_dominated_columns(working, columns, protected, replaced, kind, num_cols)
+            if (len(working), len(columns)) == before:
+                break
+        rows = ModelRows.from_rows(working)
+
+    return ReducedModel(n, k, fixed, columns, rows, extra, replaced)
+
+def _write_terms(f, names, columns, separator=" + ", per_line=16):
+    """按每行若干项写出 x_a + x_b + ...（或以空白分隔的变量名），避免单行过长。"""
+    terms = [names[c] for c in columns]
+    for start in range(0, len(terms), per_line):
+        prefix = separator if start else " "
+        f.write(prefix + separator.join(terms[start:start + per_line]) + "\n")
+
+def write_lp_file(model, path, relax=False):
+    """直接从约简后的稀疏模型写出 CPLEX LP 格式文件，不经过任何建模库对象。
+
+    约束逐条从 model.rows（紧凑数组，或不约简时的覆盖索引本身）读出并写入，不生成中间对象。
+
+    relax 为 True 时写出线性松弛：变量取 [0, 1] 内的连续值。
+    """
+    names = {c: f"x_{c}" for c in model.columns}
+    with open(path, 'w') as f:
+        f.write("\\ OptimalSampleSelection\nMinimize\nobj:\n")
+        _write_terms(f, names, model.columns)
+        f.write("Subject To\n")
+        for row_idx, (cols, rhs) in enumerate(model.rows):
+            f.write(f"cover_j_{row_idx}:\n")
+            _write_terms(f, names, cols)
+            f.write(f" >= {rhs}\n")
+        for extra_idx, (cols, rhs) in enumerate(model.extra):
+            f.write(f"symmetry_{extra_idx}:\n")
+            _write_terms(f, names, cols)
+            f.write(f" >= {rhs}\n")
+        if relax:
+            f.write("Bounds\n")
+            for c in model.columns:
+                f.write(f" {names[c]} <= 1\n")
+        else:
+            f.write("Binaries\n")
+            _write_terms(f, names, model.columns, separator=" ")
+        f.write("End\n")
+
+def _write_mip_start(model, initial, path):
+    """以 CBC 解文件的格式写出初始解，供 -mips 读取。"""
+    with open(path, 'w') as f:
+        f.write(f"Stopped on iterations - objective value {len(initial)}.00000000\n")
+        for pos, col in enumerate(model.columns):
+            f.write(f"{pos:7d} x_{col} {1 if col in initial else 0} 0\n")
+
+def read_cbc_lower_bound(log):
+    """从 CBC 输出中读取已证明的目标下界；没有该信息时返回 None。"""
+    matches = re.findall(r"(?:Lower bound|Best possible):\s*(-?[\d.]+(?:e[-+]?\d+)?)", log, re.IGNORECASE)
+    return float(matches[-1]) if matches else None
+
+_NUMBER = r"(-?[\d.]+(?:e[-+]?\d+)?)"
+_CBC_PROGRESS_PATTERNS = (
+    # Cbc0010I After 100 nodes, 23 on tree, 12 best solution, best possible 10.33 (1.23 seconds)
+    (re.compile(_NUMBER + r" best solution, best possible " + _NUMBER, re.IGNORECASE), ('incumbent', 'lower_bound')),
+    # Cbc0012I Integer solution of 12 found by ...
+    (re.compile(r"Integer solution of\s+" + _NUMBER, re.IGNORECASE), ('incumbent',)),
+    # Cbc0013I At root node, 0 cuts changed objective from 2.5 to 3 in ...
+    (re.compile(r"objective from\s+" + _NUMBER + r"\s+to\s+" + _NUMBER, re.IGNORECASE), (None, 'lower_bound')),
+)
+
+def parse_cbc_progress(line):
+    """从一行 CBC 输出中提取当前解的目标值与下界，返回 {'incumbent': ..., 'lower_bound': ...} 的子集或 None。"""
+    for pattern, keys in _CBC_PROGRESS_PATTERNS:
+        match = pattern.search(line)
+        if match:
+            event = {}
+            for key, value in zip(keys, match.groups()):
+                value = float(value)
+                # CBC 用 1e+50 表示尚无可行解
+                if key is not None and abs(value) < 1e49:
+                    event[key] = value
+            return event or None
+    return None
+
+def _read_cbc_solution(path):
+    """解析 CBC 的解文件，返回 (状态行, {变量名: 取值})。"""
+    values = {}
+    with open(path, 'r') as f:
+        status = f.readline().strip()
+        for line in f:
+            parts = line.replace("**", " ").split()
+            if len(parts) >= 3:
+                values[parts[1]] = float(parts[2])
+    return status, values
+
+def lp_relaxation_bound(model, cbc_path):
+    """用 CBC 求解模型的线性松弛，返回组数下界（已计入固定的组）；求解失败时返回 None。"""
+    if not model.rows:
+        return len(model.fixed)
+    tmp_dir = tempfile.mkdtemp(prefix="cbc_")
+    lp_path = os.path.join(tmp_dir, "relaxation.lp")
+    sol_path = os.path.join(tmp_dir, "relaxation.sol")
+    try:
+        write_lp_file(model, lp_path, relax=True)
+        subprocess.run([cbc_path, lp_path, "-dualSimplex", "-solution", sol_path],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not os.path.exists(sol_path):
+            return None
+        with open(sol_path, 'r') as f:
+            status = f.readline()
+        match = re.search(r"objective value\s+" + _NUMBER, status)
+        if not status.startswith("Optimal") or not match:
+            return None
+        return len(model.fixed) + max(0, math.ceil(float(match.group(1)) - 1e-6))
+    finally:
+        for path in (lp_path, sol_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        try:
+            os.rmdir(tmp_dir)
+        except OSError:
+            pass
+
+def solve_lp_with_cbc(model, initial, cbc_path, time_limit=None, gap=None, progress=None):
+    """写出 LP 文件并直接调用 CBC 可执行文件求解。
+
+    progress 不为 None 时逐行读取 CBC 输出，每出现新的解或下界就调用
+    progress({'incumbent': ..., 'lower_bound': ...})（只含该行给出的项）。
+
+    Returns:
+        tuple: (选中的列或 None, CBC 报告的下界, 是否求解到最优)。
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="cbc_")
+    lp_path = os.path.join(tmp_dir, "model.lp")
+    sol_path = os.path.join(tmp_dir, "model.sol")
+    mst_path = os.path.join(tmp_dir, "model.mst")
+    try:
+        write_lp_file(model, lp_path)
+        cmd = [cbc_path, lp_path]
+        if initial:
+            _write_mip_start(model, initial, mst_path)
+            cmd += ["-mips", mst_path]
+        if time_limit is not None:
+            cmd += ["-sec", str(time_limit)]
+        if gap is not None:
+            cmd += ["-ratio", str(gap)]
+        cmd += ["-timeMode", "elapsed", "-branch", "-printingOptions", "all", "-solution", sol_path]
+        log = []
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              universal_newlines=True, errors='replace') as proc:
+            for line in proc.stdout:
+                log.append(line)
+                if progress is not None:
+                    event = parse_cbc_progress(line)
+                    if event:
+                        progress(event)
+        lower_bound = read_cbc_lower_bound(''.join(log))
+        if not os.path.exists(sol_path):
+            return None, lower_bound, False
+        status, values = _read_cbc_solution(sol_path)
+        if not values or status.startswith(("Infeasible", "Integer infeasible", "Unbounded")):
+            return None, lower_bound, False
+        chosen = [c for c in model.columns if round(values.get(f"x_{c}", 0.0)) == 1]
+        # 因时间限制停止且没有可行解时，CBC 仍会输出一组取值，需自行检查可行性
+        chosen_set = set(chosen)
+        constraints = itertools.chain(model.rows, model.extra)
+        if any(sum(c in chosen_set for c in cols) < rhs for cols, rhs in constraints):
+            return None, lower_bound, False
+        return chosen, lower_bound, status.startswith("Optimal")
+    finally:
+        for path in (lp_path, sol_path, mst_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        try:
+            os.rmdir(tmp_dir)
+        except OSError:
+            pass
@@ -0,0 +1,143 @@
+"""在限定时间内缩小已有覆盖的局部搜索。
+
+从一个可行覆盖（通常是贪心解）出发：每当当前解可行就记录它，并删除损失最小的组，
+使目标规模减一；解不可行时做交换：删除一个已选组，再从某个未满足的 j 组的覆盖组中加入
+增益最大的组。未满足的 j 组的权重在每步加一，使搜索逐渐偏向难以覆盖的 j 组
+（加权局部搜索，思路同集合覆盖问题的 RWLS 算法）。
+
+增益与损失按阈值增量维护：只有当某个 j 组的覆盖次数越过 coverage 时，
+才需要更新覆盖它的 k 组的分数，因此每步的代价只与改动涉及的 j 组有关。
+"""
+import random
+import time
+
+from cache import cached_coverage_index
+from coverage import StreamingCoverageIndex, build_coverage_index
+
+def improve_cover(index, coverage, initial, time_limit=10.0, seed=None, max_steps=None, lower_bound=None,
+                  progress=None):
+    """从可行覆盖 initial（k 组索引）出发做局部搜索，返回找到的最小可行覆盖（k 组索引集合）。
+
+    Args:
+        time_limit (float): 墙钟时间预算（秒）。
+        seed: 随机数种子。
+        max_steps (int): 可选的交换步数上限。
+        lower_bound (int): 已知的组数下界，达到后立即停止。
+        progress (callable): 每找到更小的覆盖时调用
+            progress({'phase': 'local_search', 'cover_size': 组数, 'steps': 已执行的交换步数})。
+    """
+    rng = random.Random(seed)
+    covered_by, covering = index.covered_by, index.covering
+    num_k_groups, num_j_groups = index.num_k_groups, index.num_j_groups
+
+    selected = bytearray(num_k_groups)
+    count = [0] * num_j_groups
+    for u in initial:
+        selected[u] = 1
+        for t in covered_by(u):
+            count[t] += 1
+    if any(c < coverage for c in count):
+        raise ValueError("初始解不是可行覆盖。")
+
+    weight = [1] * num_j_groups
+    # add_gain[v]：加入 v 后减少的加权缺额；remove_loss[u]：删除已选组 u 后增加的加权缺额
+    add_gain = [0] * num_k_groups
+    remove_loss = {u: sum(1 for t in covered_by(u) if count[t] <= coverage) for u in set(initial)}
+    # 未满足的 j 组，用“列表 + 位置”支持 O(1) 的随机选取与删除
+    deficient = []
+    deficient_pos = [-1] * num_j_groups
+    stamp = [0] * num_k_groups
+
+    def add(v):
+        selected[v] = 1
+        loss = 0
+        for t in covered_by(v):
+            c = count[t] = count[t] + 1
+            w = weight[t]
+            if c == coverage:
+                # t 变为满足：不再为任何组提供增益
+                for x in covering(t):
+                    add_gain[x] -= w
+                last = deficient.pop()
+                if last != t:
+                    deficient[deficient_pos[t]] = last
+                    deficient_pos[last] = deficient_pos[t]
+                deficient_pos[t] = -1
+            elif c == coverage + 1:
+                # t 有了富余：删除原来覆盖它的任何一组都不再造成缺额
+                for x in covering(t):
+                    if selected[x] and x != v:
+                        remove_loss[x] -= w
+            if c <= coverage:
+                loss += w
+        remove_loss[v] = loss
+
+    def remove(u):
+        selected[u] = 0
+        del remove_loss[u]
+        for t in covered_by(u):
+            c = count[t] = count[t] - 1
+            w = weight[t]
+            if c == coverage - 1:
+                for x in covering(t):
+                    add_gain[x] += w
+                deficient_pos[t] = len(deficient)
+                deficient.append(t)
+            elif c == coverage:
+                for x in covering(t):
+                    if selected[x]:
+                        remove_loss[x] += w
+
+    best = set(remove_loss)
+    deadline = time.monotonic() + time_limit
+    steps = 0
+    last_added = -1
+    while True:
+        if not deficient:
+            if len(remove_loss) < len(best):
+                best = set(remove_loss)
+                if progress is not None:
+                    progress({'phase': 'local_search', 'cover_size': len(best), 'steps': steps})
+            if len(best) <= max(lower_bound or 0, 1):
+                break
+            # 可行：删除损失最小的组，尝试规模更小的覆盖
+            u = min(remove_loss, key=lambda x: (remove_loss[x], stamp[x]))
+            remove(u)
+            stamp[u] = steps
+            continue
+        if max_steps is not None and steps >= max_steps:
+            break
+        if steps % 64 == 0 and time.monotonic() >= deadline:
+            break
+        steps += 1
+
+        # 交换：删除损失最小的组（不删刚加入的组），再为随机一个未满足的 j 组加入增益最大的组
+        u = min((x for x in remove_loss if x != last_added), key=lambda x: (remove_loss[x], stamp[x]),
+                default=last_added)
+        remove(u)
+        stamp[u] = steps
+        t = deficient[rng.randrange(len(deficient))]
+        v = max((x for x in covering(t) if not selected[x] and x != u), key=lambda x: (add_gain[x], -stamp[x]),
+                default=u)
+        add(v)
+        stamp[v] = steps
+        last_added = v
+
+        # 提高仍未满足的 j 组的权重
+        for t in deficient:
+            weight[t] += 1
+            for x in covering(t):
+                add_gain[x] += 1
+                if selected[x]:
+                    remove_loss[x] += 1
+    return best
+
+def _improve_worker(n, k, j, s, coverage, initial, time_limit, seed, lower_bound, use_cache, streaming=False):
+    """并行重启的子进程入口：加载（或构建）覆盖索引后运行一次局部搜索。"""
+    if streaming:
+        index = StreamingCoverageIndex(n, k, j, s)
+    elif use_cache:
+        index = cached_coverage_index(n, k, j, s)
+    else:
+        index = build_coverage_index(n, k, j, s)
+    return sorted(improve_cover(index, coverage, initial, time_limit, seed, lower_bound=lower_bound))
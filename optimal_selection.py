@@ -1,146 +1,424 @@
-import itertools
-import json
-import os
-from datetime import datetime
-from collections import defaultdict
+import heapq
+import math
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from backends import BACKENDS, cbc_executable, get_backend, is_available
+from bounds import lower_bound as combinatorial_lower_bound
+from cache import cached_coverage_index, load_solution, store_solution
+from combinatorics import iter_bits, lex_rank, lex_unrank, mask_of, popcount
+from coverage import (STREAMING_INDEX_BYTES, StreamingCoverageIndex, bitset_from_indices, build_coverage_index,
+                      index_size_bytes, resolve_coverage)
+from ilp_model import lp_relaxation_bound, reduce_model
+from local_search import _improve_worker, improve_cover
+from results_db import RESULTS_DB, ResultsDB
+from verify import uncovered_j_groups
 
 try:
-    import pulp
-except ImportError:
-    pulp = None
-    print("警告：未安装 pulp 库，ILP 算法不可用。请使用 pip install pulp 安装。")
-
-def combinations(iterable, r):
-    """Helper function for combinations."""
-    pool = tuple(iterable)
-    n = len(pool)
-    if r > n:
-        return
-    indices = list(range(r))
-    yield tuple(pool[i] for i in indices)
-    while True:
-        for i in reversed(range(r)):
-            if indices[i] != i + n - r:
-                break
-        else:
-            return
-        indices[i] += 1
-        for j in range(i + 1, r):
-            indices[j] = indices[j - 1] + 1
-        yield tuple(pool[i] for i in indices)
-
-def greedy_optimal_selection(n_samples, k, j, s, coverage=1):
-    """使用贪心算法选择最优的 k 样本组。
-
-    目标：找到最小数量的 k 样本组，使得对于 *每一个* 从 n 个样本中选出的 j 样本组，
-    都至少有一个选定的 k 样本组包含了该 j 样本组的至少 coverage 个 s 子组。
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# backend="auto" 时先用进程内分支定界求解的秒数；未在此时间内证明最优再交给 CBC（如果可用）
+BNB_TIME_BUDGET = 2.0
+
+def peak_rss_kb():
+    """当前进程的峰值常驻内存（KB）；平台不支持时返回 None。"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def _cpu_seconds():
+    """本进程与已结束的子进程（覆盖索引、局部搜索的进程池与 CBC）累计的 CPU 时间（秒）。"""
+    cpu = time.process_time()
+    if resource is not None:
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu += children.ru_utime + children.ru_stime
+    return cpu
+
+class RunStats:
+    """一次求解的分阶段统计，由各求解函数填写，并作为信息字典的 'stats' 返回。
+
+    phases: 按完成顺序排列的 {'phase': 阶段名, 'wall': 墙钟秒数, 'cpu': CPU 秒数, 'peak_rss_kb': 阶段结束时的峰值内存}。
+        阶段名为 'coverage_index'、'greedy'、'lower_bound'、'local_search'、'ilp_reduce'、'ilp_solve' 与 'verify'；
+        ILP 与局部搜索内部求贪心初始解的各阶段也会记录在内。
+    counters: 计数器：'num_k_groups'、'num_j_groups'、'nnz'（覆盖关系数）、'greedy_iterations'（贪心选入的组数）、
+        'ilp_variables'、'ilp_constraints' 与 'ilp_fixed'（约简后模型的规模）等。
+    callback: 可选，每个阶段结束时以该阶段的记录调用；不随对象一起序列化（求解子进程只送回统计结果）。
+    """
 
-    Args:
-        n_samples (list): 随机选择的 n 个样本列表。
-        k (int): 要选择的样本组的大小。
-        j (int): 从 n 个样本中选择的子集大小。
-        s (int): 从 j 个样本子集中需要覆盖的样本数量。
-        coverage (int): 每个 k 样本组需要覆盖的 j 样本子集的最小数量，默认为1（至少ONE）。
+    def __init__(self, callback=None):
+        self.phases = []
+        self.counters = {}
+        self.callback = callback
+
+    @contextmanager
+    def phase(self, name):
+        """计时一个阶段：with stats.phase('greedy'): ..."""
+        wall, cpu = time.perf_counter(), _cpu_seconds()
+        try:
+            yield
+        finally:
+            record = {'phase': name, 'wall': time.perf_counter() - wall, 'cpu': _cpu_seconds() - cpu,
+                      'peak_rss_kb': peak_rss_kb()}
+            self.phases.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    def count(self, **counters):
+        self.counters.update(counters)
+
+    def as_dict(self):
+        """可写入 JSON 的形式（保存到结果数据库），另含各阶段的总计。"""
+        peaks = [record['peak_rss_kb'] for record in self.phases if record['peak_rss_kb'] is not None]
+        return {
+            'phases': [dict(record) for record in self.phases],
+            'counters': dict(self.counters),
+            'wall': sum(record['wall'] for record in self.phases),
+            'cpu': sum(record['cpu'] for record in self.phases),
+            'peak_rss_kb': max(peaks) if peaks else None,
+        }
+
+    def __getstate__(self):
+        return {'phases': self.phases, 'counters': self.counters, 'callback': None}
+
+def _rescan_greedy(index, coverage, progress=None):
+    """逐轮重扫全部候选 k 组的贪心选择。
+
+    progress 不为 None 时，每选中一个 k 组调用一次
+    progress({'phase': 'greedy', 'cover_size': 已选组数, 'unsatisfied': 未满足的 j 组数})。
 
     Returns:
-        list: 选定的 k 样本组列表。
+        tuple: (选中的 k 组索引集合, 是否满足了全部 j 组)。
     """
-    n = len(n_samples)
-    if not (s <= j <= k <= n):
-        raise ValueError("参数必须满足 s <= j <= k <= n")
-
-    #生成所有可能的 k 样本组
-    possible_k_groups = list(combinations(n_samples, k))
-    k_groups_sets = [set(group) for group in possible_k_groups]
-    num_k_groups = len(possible_k_groups)
-
-    #生成所有 j 样本组
-    j_groups_tuples = list(combinations(n_samples, j))
-    j_groups = [frozenset(group) for group in j_groups_tuples]
+    num_k_groups = index.num_k_groups
+    num_j_groups = index.num_j_groups
+    k_covers = index.k_bitsets()
 
-    #为每个 j 样本组生成其所有 s 子组
-    j_group_to_s_subgroups = defaultdict(set)
-    for j_group_tuple in j_groups_tuples:
-        j_group_fset = frozenset(j_group_tuple)
-        for s_subgroup_tuple in combinations(j_group_tuple, s):
-            j_group_to_s_subgroups[j_group_fset].add(frozenset(s_subgroup_tuple))
-
-    # 选择
     selected_k_group_indices = set()
     # 跟踪每个j组被覆盖的次数
-    j_group_coverage_count = {j_fset: 0 for j_fset in j_groups}
+    j_group_coverage_count = [0] * num_j_groups
     # 初始时所有j组都未满足覆盖度要求
-    unsatisfied_j_groups = set(j_groups)
-
-    # 预计算每个 k 组能满足哪些 j 组
-    k_group_satisfies_j_groups = defaultdict(set)
-    for idx, k_set in enumerate(k_groups_sets):
-        for j_fset, s_sub_fsets in j_group_to_s_subgroups.items():
-            for s_fset in s_sub_fsets:
-                if s_fset.issubset(k_set):
-                    k_group_satisfies_j_groups[idx].add(j_fset)
-                    break
+    unsatisfied_j_groups = (1 << num_j_groups) - 1
 
     while unsatisfied_j_groups:
         best_k_group_index = -1
         max_newly_satisfied_count = -1
-        newly_satisfied_by_best = set()
 
         # 寻找能满足最多 *未满足* j 组的 k 组
-        # 迭代所有 *尚未选择* 的 k 组索引
-        candidate_indices = set(range(num_k_groups)) - selected_k_group_indices
-        if not candidate_indices:
+        # 按索引顺序迭代所有 *尚未选择* 的 k 组，计数相同时保留索引最小者
+        if len(selected_k_group_indices) == num_k_groups:
              print("警告：没有更多候选 k 组，但仍有未满足的 j 组。可能无解或贪心策略失败。")
              break
 
-        for k_idx in candidate_indices:
-            currently_satisfies = k_group_satisfies_j_groups[k_idx]
-            newly_satisfied = currently_satisfies.intersection(unsatisfied_j_groups)
-            count = len(newly_satisfied)
+        for k_idx in range(num_k_groups):
+            if k_idx in selected_k_group_indices:
+                continue
+            count = popcount(k_covers[k_idx] & unsatisfied_j_groups)
 
             if count > max_newly_satisfied_count:
                 max_newly_satisfied_count = count
                 best_k_group_index = k_idx
-                newly_satisfied_by_best = newly_satisfied
 
         if best_k_group_index == -1 or max_newly_satisfied_count == 0:
             print("警告：无法找到能满足更多未满足 j 组的 k 组。流程终止。")
             break
 
         selected_k_group_indices.add(best_k_group_index)
-        
+        newly_satisfied_by_best = k_covers[best_k_group_index] & unsatisfied_j_groups
+
         # 更新每个j组的覆盖计数
-        for j_group in newly_satisfied_by_best:
-            j_group_coverage_count[j_group] += 1
-            # 如果达到了覆盖度要求，从未满足集合中移除
-            if j_group_coverage_count[j_group] >= coverage:
-                unsatisfied_j_groups.remove(j_group)
+        if coverage <= 1:
+            unsatisfied_j_groups ^= newly_satisfied_by_best
+        else:
+            done = []
+            for j_idx in iter_bits(newly_satisfied_by_best):
+                j_group_coverage_count[j_idx] += 1
+                # 如果达到了覆盖度要求，从未满足集合中移除
+                if j_group_coverage_count[j_idx] >= coverage:
+                    done.append(j_idx)
+            if done:
+                unsatisfied_j_groups &= ~bitset_from_indices(done, num_j_groups)
+        if progress is not None:
+            progress({'phase': 'greedy', 'cover_size': len(selected_k_group_indices),
+                      'unsatisfied': popcount(unsatisfied_j_groups)})
+
+    return selected_k_group_indices, not unsatisfied_j_groups
+
+def _lazy_greedy(index, coverage, progress=None):
+    """惰性贪心（CELF），返回值与进度回调均与 _rescan_greedy 相同。
+
+    demand[t] 为第 t 个 j 组的剩余需求（还需被多少个已选 k 组覆盖），
+    gain[i] = sum(min(demand[t], 1))，t 取第 i 个 k 组满足的 j 组，即它还能满足的未满足 j 组数。
+    选中一个 k 组时只在原数组上更新：它满足的 j 组需求减一，需求降为 0 的 j 组
+    再使能满足它的 k 组增益减一。coverage > 1 时部分覆盖的 j 组仍计入增益。
+    最大堆中的增益只会偏大（边际覆盖是次模的），因此弹出的元素若已是最新值即为最优；
+    堆按 (-增益, 索引) 排序，增益相同时与逐轮重扫一样选索引最小的 k 组。
+    """
+    covered_by, covering = index.covered_by, index.covering
+    # 每个 k 组满足的 j 组数相同（见 coverage._covering_count 的对称性），初始增益均为该值
+    gain = [index.nnz // index.num_k_groups] * index.num_k_groups if index.num_k_groups else []
+    demand = [coverage] * index.num_j_groups
+    heap = [(-g, k_idx) for k_idx, g in enumerate(gain)]
+    heapq.heapify(heap)
 
-    final_selected_k_groups = [possible_k_groups[i] for i in selected_k_group_indices]
+    selected_k_group_indices = set()
+    unsatisfied_count = index.num_j_groups if coverage > 0 else 0
 
+    while unsatisfied_count:
+        if not heap:
+            print("警告：没有更多候选 k 组，但仍有未满足的 j 组。可能无解或贪心策略失败。")
+            break
+        neg_gain, best_k_group_index = heapq.heappop(heap)
+        current = gain[best_k_group_index]
+        if -neg_gain != current:
+            # 过期的增益：用最新值重新入堆
+            heapq.heappush(heap, (-current, best_k_group_index))
+            continue
+        if current == 0:
+            print("警告：无法找到能满足更多未满足 j 组的 k 组。流程终止。")
+            break
+
+        selected_k_group_indices.add(best_k_group_index)
+        for j_idx in covered_by(best_k_group_index):
+            d = demand[j_idx]
+            if d:
+                demand[j_idx] = d - 1
+                if d == 1:
+                    unsatisfied_count -= 1
+                    for k_idx in covering(j_idx):
+                        gain[k_idx] -= 1
+        if progress is not None:
+            progress({'phase': 'greedy', 'cover_size': len(selected_k_group_indices),
+                      'unsatisfied': unsatisfied_count})
+
+    return selected_k_group_indices, unsatisfied_count == 0
+
+def _use_streaming(n, k, j, s, streaming=None):
+    """streaming 为 None 时按完整索引的大小（见 STREAMING_INDEX_BYTES）决定是否使用流式索引。"""
+    if streaming is None:
+        return index_size_bytes(n, k, j, s) > STREAMING_INDEX_BYTES
+    return bool(streaming)
+
+def _coverage_index(n, k, j, s, workers=1, use_cache=True, progress=None, streaming=None):
+    """贪心与局部搜索使用的覆盖索引：流式时返回 StreamingCoverageIndex，只保留与组数成正比的数组。"""
+    if _use_streaming(n, k, j, s, streaming):
+        return StreamingCoverageIndex(n, k, j, s)
+    if use_cache:
+        return cached_coverage_index(n, k, j, s, workers=workers, progress=progress)
+    return build_coverage_index(n, k, j, s, workers=workers, progress=progress)
+
+def _positions_to_labels(k_groups, n_samples):
+    """把下标空间中的 k 组（位置元组）映射为当前样本标签。"""
+    return [tuple(n_samples[p] for p in group) for group in k_groups]
+
+def _finish(positions, n_samples, k, j, s, coverage, info, return_info, stats):
+    """各求解器的统一出口：独立校验下标空间中的解（见 verify.py），再映射为样本标签。
+
+    info 中记录 'uncovered'（未满足 coverage 次的 j 组数）、'verified' 与 'stats'（RunStats）；
+    校验失败时打印警告。
+    """
+    n = len(n_samples)
+    with stats.phase('verify'):
+        uncovered = len(uncovered_j_groups(n, k, j, s, coverage, [mask_of(group) for group in positions]))
+    info['stats'] = stats
+    info['uncovered'] = uncovered
+    info['verified'] = uncovered == 0
+    if uncovered:
+        print(f"警告：校验发现 {uncovered} 个 j 组未被满足 {coverage} 次，结果不是有效的覆盖。")
+    final_selected_k_groups = _positions_to_labels(positions, n_samples)
+    if return_info:
+        return final_selected_k_groups, info
     return final_selected_k_groups
 
-def save_results(m, n, k, j, s, selected_groups, run_index, coverage=1):
-    """将结果保存到 JSON 文件。"""
-    results_dir = 'results'
-    if not os.path.exists(results_dir):
-        os.makedirs(results_dir)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    # 文件名格式调整为 project.txt 中的示例: m-n-k-j-s-coverage-run_index-num_results-timestamp.json
-    filename = f"{m}-{n}-{k}-{j}-{s}-{coverage}-{run_index}-{len(selected_groups)}-{timestamp}.json"
-    filepath = os.path.join(results_dir, filename)
-
-    data_to_save = {
-        'parameters': {'m': m, 'n': n, 'k': k, 'j': j, 's': s, 'coverage': coverage},
-        'run_index': run_index,
-        'selected_k_groups': [list(group) for group in selected_groups]
-    }
+def selection_lower_bound(n, k, j, s, coverage=1, lp_relaxation=False, index=None, workers=1, use_cache=True):
+    """组数的下界：组合下界（Schönheim / 计数，见 bounds.py），
+    lp_relaxation 为 True 时再与约简后 ILP 的线性松弛下界取较大者（需要 CBC）。
+    """
+    bound = combinatorial_lower_bound(n, k, j, s, coverage)
+    if lp_relaxation:
+        cbc_path = cbc_executable()
+        if cbc_path is None:
+            print("警告：找不到 CBC 可执行文件，跳过线性松弛下界。")
+            return bound
+        if index is None:
+            if use_cache:
+                index = cached_coverage_index(n, k, j, s, workers=workers)
+            else:
+                index = build_coverage_index(n, k, j, s, workers=workers)
+        lp_bound = lp_relaxation_bound(reduce_model(index, coverage), cbc_path)
+        if lp_bound is not None:
+            bound = max(bound, lp_bound)
+    return bound
+
+def greedy_optimal_selection(n_samples, k, j, s, coverage=1, lazy=True, workers=1, use_cache=True, progress=None,
+                             return_info=False, lp_bound=False, coverage_mode='groups', streaming=None, stats=None):
+    """使用贪心算法选择最优的 k 样本组。
 
-    with open(filepath, 'w') as f:
-        json.dump(data_to_save, f, indent=4)
-    print(f"结果已保存到: {filepath}")
-    return filepath
+    目标：找到最小数量的 k 样本组，使得对于 *每一个* 从 n 个样本中选出的 j 样本组，
+    都至少有 coverage 个选定的 k 样本组各自包含该 j 样本组的某个 s 子组（coverage_mode='groups'），
+    或至少有一个选定的 k 样本组包含了该 j 样本组的至少 coverage 个 s 子组（coverage_mode='subsets'）。
+
+    Args:
+        n_samples (list): 随机选择的 n 个样本列表。
+        k (int): 要选择的样本组的大小。
+        j (int): 从 n 个样本中选择的子集大小。
+        s (int): 从 j 个样本子集中需要覆盖的样本数量。
+        coverage (int): 每个 k 样本组需要覆盖的 j 样本子集的最小数量，默认为1（至少ONE）。
+        coverage_mode (str): coverage 的语义，'groups' 或 'subsets'（见 coverage.resolve_coverage）。
+        lazy (bool): 是否使用惰性贪心（CELF）。结果与逐轮重扫完全相同，但快得多。
+        workers (int): 构建覆盖索引时使用的进程数，默认为1（单进程）。
+        use_cache (bool): 是否使用磁盘缓存（cache/ 目录）：读取或写入覆盖索引，
+            并优先返回同参数下已知的最好解。
+        progress (callable): 可选的进度回调，接收描述当前阶段的字典
+            （'phase' 为 'coverage' 或 'greedy'，见 build_coverage_index 与 _rescan_greedy）。
+        return_info (bool): 为 True 时返回 (k 组列表, 信息字典)，信息字典包含
+            'lower_bound'（组数下界，见 selection_lower_bound）、'optimal'（解的规模已达到下界）、'status'、
+            'peak_rss_kb'（本进程的峰值常驻内存，KB）、'stats'（见 RunStats）与校验结果 'uncovered'、'verified'；
+            返回缓存中的已知解时另含 'cached'（True）与 'algorithm'（求得该解的算法，可能不是 'greedy'）。
+        lp_bound (bool): 计算下界时是否加入 ILP 线性松弛（需要 CBC）。
+        streaming (bool): 为 True 时不构建覆盖索引，而是在需要时按组的编号现场枚举覆盖关系
+            （见 coverage.StreamingCoverageIndex），内存只与组数成正比，此时总是使用惰性贪心；
+            默认 None 表示只在完整索引超过 STREAMING_INDEX_BYTES 时这样做。
+        stats (RunStats): 记录各阶段耗时与计数器的对象（可带每个阶段结束时的回调），默认新建一个；
+            信息字典的 'stats' 即为该对象。
+
+    Returns:
+        list: 选定的 k 样本组列表。
+    """
+    n = len(n_samples)
+    if not (s <= j <= k <= n):
+        raise ValueError("参数必须满足 s <= j <= k <= n")
+    # 两种覆盖语义都归结为“coverage 个满足 |k ∩ j| >= s 的 k 组”，缓存也按归结后的参数共享
+    s, coverage = resolve_coverage(k, j, s, coverage, coverage_mode)
+    if stats is None:
+        stats = RunStats()
+    positions, info, _ = _greedy_positions(n, k, j, s, coverage, lazy, workers, use_cache, progress, return_info,
+                                           lp_bound, streaming, stats)
+    return _finish(positions, n_samples, k, j, s, coverage, info, return_info, stats)
+
+def _greedy_positions(n, k, j, s, coverage, lazy, workers, use_cache, progress, return_info, lp_bound, streaming,
+                      stats):
+    """greedy_optimal_selection 的主体（coverage 已归结为 'groups' 语义）：返回 (下标空间中的解, 信息字典, 覆盖索引)。
+
+    返回缓存中的已知解时没有构建索引，索引为 None；局部搜索复用返回的索引，不再构建第二次。
+    """
+    # 同参数的已知解只需重新映射到当前样本标签
+    if use_cache:
+        known = load_solution(n, k, j, s, coverage)
+        if known is not None:
+            if progress is not None:
+                progress({'phase': 'greedy', 'cover_size': len(known['k_groups']), 'unsatisfied': 0, 'cached': True})
+            if known['optimal']:
+                bound = len(known['k_groups'])
+            elif return_info:
+                with stats.phase('lower_bound'):
+                    bound = selection_lower_bound(n, k, j, s, coverage, lp_bound, workers=workers)
+            else:
+                bound = 0
+            info = _bound_info(len(known['k_groups']), bound, True)
+            # 已知解可能由其他算法求得，调用方据此标注与保存，而不是当作新的贪心结果
+            info.update(cached=True, algorithm=known['algorithm'])
+            stats.count(cached_solution=known['algorithm'])
+            return known['k_groups'], info, None
+
+    # 每个 k 组能满足哪些 j 组（稀疏索引，或在需要时现场枚举）；k 组按字典序编号，不再逐个生成
+    with stats.phase('coverage_index'):
+        index = _coverage_index(n, k, j, s, workers, use_cache, progress, streaming)
+    stats.count(num_k_groups=index.num_k_groups, num_j_groups=index.num_j_groups, nnz=index.nnz)
+
+    with stats.phase('greedy'):
+        if lazy or isinstance(index, StreamingCoverageIndex):
+            selected_k_group_indices, complete = _lazy_greedy(index, coverage, progress)
+        else:
+            selected_k_group_indices, complete = _rescan_greedy(index, coverage, progress)
+    stats.count(greedy_iterations=len(selected_k_group_indices))
+
+    selected_positions = [lex_unrank(i, n, k) for i in sorted(selected_k_group_indices)]
+    with stats.phase('lower_bound'):
+        bound = selection_lower_bound(n, k, j, s, coverage, lp_bound, index=index, workers=workers,
+                                      use_cache=use_cache)
+    info = _bound_info(len(selected_positions), bound, complete)
+    if use_cache and complete:
+        store_solution(n, k, j, s, coverage, selected_positions, 'greedy', optimal=info['optimal'])
+    return selected_positions, info, index
+
+def _bound_info(size, bound, complete):
+    """启发式解的信息字典：规模达到下界即已证明最优。"""
+    optimal = complete and size <= bound
+    return {'optimal': optimal, 'lower_bound': bound, 'status': 'optimal' if optimal else 'heuristic',
+            'peak_rss_kb': peak_rss_kb()}
+
+def local_search_selection(n_samples, k, j, s, coverage=1, time_limit=10.0, restarts=1, seed=None, workers=1,
+                           use_cache=True, return_info=False, progress=None, coverage_mode='groups',
+                           streaming=None, stats=None):
+    """先用贪心算法求初始覆盖，再在 time_limit 秒内用局部搜索（见 local_search.py）缩小它。
+
+    Args:
+        time_limit (float): 局部搜索的墙钟时间预算（秒）。
+        restarts (int): 独立搜索的次数；大于 1 时各次搜索以不同的随机种子在独立进程中同时运行，取最好结果。
+        seed: 随机数种子，None 表示每次不同。
+        其余参数与 greedy_optimal_selection 相同；返回值也相同，return_info 时 'status' 为
+        'optimal'（达到下界）或 'heuristic'。
+    """
+    n = len(n_samples)
+    if not (s <= j <= k <= n):
+        raise ValueError("参数必须满足 s <= j <= k <= n")
+    s, coverage = resolve_coverage(k, j, s, coverage, coverage_mode)
+    streaming = _use_streaming(n, k, j, s, streaming)
+    if stats is None:
+        stats = RunStats()
+    greedy_cover, info, index = _greedy_positions(n, k, j, s, coverage, True, workers, use_cache, progress, True,
+                                                  False, streaming, stats)
+    bound = info['lower_bound']
+    if not info['optimal']:
+        initial = [lex_rank(group, n) for group in greedy_cover]
+        if seed is None:
+            seed = random.randrange(1 << 30)
+        with stats.phase('local_search'):
+            if restarts > 1:
+                with ProcessPoolExecutor(max_workers=restarts) as pool:
+                    futures = [pool.submit(_improve_worker, n, k, j, s, coverage, initial, time_limit, seed + r,
+                                           bound, use_cache, streaming) for r in range(restarts)]
+                    best = min((future.result() for future in futures), key=len)
+            else:
+                if index is None:
+                    # 贪心返回了缓存中的已知解，没有构建索引
+                    index = _coverage_index(n, k, j, s, workers, use_cache, streaming=streaming)
+                best = improve_cover(index, coverage, initial, time_limit, seed, lower_bound=bound,
+                                     progress=progress)
+        stats.count(local_search_removed=len(initial) - len(best))
+        greedy_cover = [lex_unrank(i, n, k) for i in sorted(best)]
+        info = _bound_info(len(greedy_cover), bound, True)
+        if use_cache:
+            store_solution(n, k, j, s, coverage, greedy_cover, 'local_search', optimal=info['optimal'])
+
+    return _finish(greedy_cover, n_samples, k, j, s, coverage, info, return_info, stats)
+
+def save_results(m, n, k, j, s, selected_groups, run_index=None, coverage=1, algorithm=None, samples=None,
+                 lower_bound=None, coverage_mode='groups', stats=None, db_path=RESULTS_DB):
+    """将结果保存到结果数据库。
+
+    run_index 为 None 时由数据库原子地分配下一个编号；lower_bound 为该参数下已知的组数下界；
+    stats 为求解返回的 RunStats（或其 as_dict() 形式），与结果一起保存。
+    Returns:
+        str: 记录的显示名称 m-n-k-j-s-coverage-run_index-num_results。
+    """
+    db = ResultsDB(db_path)
+    try:
+        _, run_index, name = db.add_run(m, n, k, j, s, coverage, selected_groups, samples=samples,
+                                        algorithm=algorithm, run_index=run_index, lower_bound=lower_bound,
+                                        coverage_mode=coverage_mode,
+                                        stats=stats.as_dict() if isinstance(stats, RunStats) else stats)
+    finally:
+        db.close()
+    print(f"结果已保存到: {db_path} ({name})")
+    return name
 
  # 或者可以返回空列表或其他指示失败的值
 
@@ -181,78 +459,159 @@ if __name__ == "__main__":
     # 可以在此添加 GUI 逻辑或与其他模块集成
 
 
-def ilp_optimal_selection(n_samples, k, j, s, coverage=1):
+def ilp_optimal_selection(n_samples, k, j, s, coverage=1, workers=1, use_cache=True, reduce=True,
+                          warm_start=True, time_limit=None, gap=None, return_info=False, backend="auto",
+                          progress=None, coverage_mode='groups', stats=None, cutoff=None):
     """使用整数线性规划（ILP）选择最优的 k 样本组。
-    目标与 greedy_optimal_selection 相同。
-    需要安装 pulp 库。
+    目标与 greedy_optimal_selection 相同（包括 coverage_mode 的两种覆盖语义）。
+    workers 为构建覆盖索引时使用的进程数，
+    use_cache 控制是否使用磁盘缓存；已被 ILP 证明最优的同参数解会直接返回，不再重新求解。
+    reduce 为 True 时先做对称性破除与支配约简（见 ilp_model.reduce_model）再交给 CBC。
+
+    warm_start 为 True 时用贪心解作为 CBC 的初始可行解；time_limit（秒）与 gap（相对 MIP 间隙）
+    用于限制求解。达到限制时不再报错，而是返回当前最好的解（至少与贪心解一样好）。
+    return_info 为 True 时返回 (k 组列表, 信息字典)，信息字典包含
+    'optimal'（是否已证明最优）、'lower_bound'（已证明的组数下界）、'status'、'solver'（"bnb" 或 "cbc"）
+    与 'peak_rss_kb'；返回缓存中已证明最优的解时另含 'cached' 与 'algorithm'（同 greedy_optimal_selection）。
+
+    backend 为 "bnb" 时用进程内的分支定界求解（见 branch_bound.py），不需要 pulp 与 CBC，不支持 gap；
+    为 "pulp" 时通过 pulp 建模；为 "lp" 时直接把稀疏约束矩阵写成 LP 文件交给 CBC
+    可执行文件，不创建任何 pulp 对象，适合 n 较大、建模开销占主导的情形。
+    为 "auto"（默认）时先用分支定界求解至多 BNB_TIME_BUDGET 秒，中小规模的模型通常在此之内
+    证明最优，不必启动 CBC；否则以它的最好解为初始解，在剩余时间内交给 CBC（pulp 或 LP 文件后端）。
+    找不到 CBC 时分支定界使用全部时间。
+
+    progress 为可选的进度回调：除覆盖索引与贪心初始解的事件外，还会收到
+    {'phase': 'ilp_reduce', ...} 与 {'phase': 'ilp_solve', 'incumbent': 当前解的组数, 'lower_bound': 下界}
+    （组数与下界均已计入对称性破除固定的组）。stats 与 greedy_optimal_selection 相同。
+
+    cutoff 为可选的无参函数，返回同时运行的其他求解器已找到的最好解的组数（竞速模式，见 race.py）；
+    分支定界只搜索比它更小的解，搜索完毕时返回的 'lower_bound' 可能等于该组数而大于自己的解。
     """
-    if pulp is None:
-        raise ImportError("未安装 pulp 库，无法使用 ILP 算法。请先安装 pulp。")
+    if backend != "auto" and backend not in BACKENDS:
+        raise ValueError(f"未知的 ILP 后端: {backend}")
+    if backend == "pulp" and not is_available("pulp"):
+        raise ImportError("未安装 pulp 库，无法使用 pulp 后端。请先安装 pulp，或使用 backend=\"bnb\"。")
     n = len(n_samples)
     if not (s <= j <= k <= n):
         raise ValueError("参数必须满足 s <= j <= k <= n")
+    s, coverage = resolve_coverage(k, j, s, coverage, coverage_mode)
+    if stats is None:
+        stats = RunStats()
     
-    # 检查是否在打包环境中运行
-    import sys
-    is_frozen = getattr(sys, 'frozen', False)
-    # 1. 生成所有可能的 k 样本组 (nCk)
-    possible_k_groups = list(combinations(n_samples, k))
-    k_groups_sets = [set(group) for group in possible_k_groups]
-    num_k_groups = len(possible_k_groups)
-    # 2. 生成所有 j 样本组 (nCj)
-    j_groups_tuples = list(combinations(n_samples, j))
-    j_groups = [frozenset(group) for group in j_groups_tuples]
-    # 3. 为每个 j 样本组生成其所有 s 子组 (jCs)
-    j_group_to_s_subgroups = defaultdict(set)
-    for j_group_tuple in j_groups_tuples:
-        j_group_fset = frozenset(j_group_tuple)
-        for s_subgroup_tuple in combinations(j_group_tuple, s):
-            j_group_to_s_subgroups[j_group_fset].add(frozenset(s_subgroup_tuple))
-    #建立 ILP 模型
-    prob = pulp.LpProblem("OptimalSampleSelection", pulp.LpMinimize)
-    # 决策变量
-    x_vars = [pulp.LpVariable(f"x_{i}", cat="Binary") for i in range(num_k_groups)]
-    # 目标函数
-    prob += pulp.lpSum(x_vars)
-    # 约束
-    for j_idx, j_fset in enumerate(j_groups):
-        covering_k_indices = set()
-        s_sub_fsets = j_group_to_s_subgroups[j_fset]
-        for k_idx, k_set in enumerate(k_groups_sets):
-            for s_fset in s_sub_fsets:
-                if s_fset.issubset(k_set):
-                    covering_k_indices.add(k_idx)
-                    break
-        if not covering_k_indices:
-            raise ValueError(f"无法找到覆盖 j 组 {sorted(j_fset)} 的 k 组，参数设置可能有误。")
-        # 修改约束，要求至少有coverage个k组覆盖每个j组
-        prob += pulp.lpSum([x_vars[i] for i in covering_k_indices]) >= coverage, f"cover_j_{j_idx}"
-    # 求解
-    try:
-        # 在打包环境中处理CBC求解器路径
-        if is_frozen:
-            import os
-            # 获取应用程序的基础路径
-            base_path = os.path.dirname(sys.executable) if is_frozen else os.path.dirname(os.path.abspath(__file__))
-            # 尝试使用相对路径找到CBC求解器
-            solver_path = os.path.join(base_path, "pulp", "solverdir", "cbc", "win", "i64", "cbc.exe")
-            
-            if os.path.exists(solver_path):
-                solver = pulp.PULP_CBC_CMD(path=solver_path, msg=0)
-            else:
-                # 如果找不到求解器，尝试使用默认路径
-                solver = pulp.PULP_CBC_CMD(msg=0)
+    if use_cache:
+        known = load_solution(n, k, j, s, coverage)
+        if known is not None and known['optimal']:
+            info = {'optimal': True, 'lower_bound': len(known['k_groups']), 'status': 'optimal',
+                    'peak_rss_kb': peak_rss_kb(), 'cached': True, 'algorithm': known['algorithm']}
+            stats.count(cached_solution=known['algorithm'])
+            return _finish(known['k_groups'], n_samples, k, j, s, coverage, info, return_info, stats)
+
+    # 1. 构建稀疏覆盖索引：每个 j 组可由哪些 k 组满足（k 组按字典序编号，结果再反推出组本身）
+    with stats.phase('coverage_index'):
+        if use_cache:
+            index = cached_coverage_index(n, k, j, s, workers=workers, progress=progress)
         else:
-            # 非打包环境使用默认路径
-            solver = pulp.PULP_CBC_CMD(msg=0)
-            
-        result_status = prob.solve(solver)
-        if result_status != pulp.LpStatusOptimal:
-            raise RuntimeError("ILP 求解失败，未找到最优解。")
-    except Exception as e:
-        raise RuntimeError(f"ILP 求解过程出错: {str(e)}")
-    selected_k_group_indices = [i for i, var in enumerate(x_vars) if var.value() == 1]
-    final_selected_k_groups = [possible_k_groups[i] for i in selected_k_group_indices]
-    return final_selected_k_groups
+            index = build_coverage_index(n, k, j, s, workers=workers, progress=progress)
+    stats.count(num_k_groups=index.num_k_groups, num_j_groups=index.num_j_groups, nnz=index.nnz)
+    # 2. 预处理：对称性破除与支配约简
+    if progress is not None:
+        progress({'phase': 'ilp_reduce'})
+    with stats.phase('ilp_reduce'):
+        if reduce:
+            model = reduce_model(index, coverage)
+        else:
+            model = reduce_model(index, coverage, symmetry=False, dominance=False)
+    stats.count(ilp_variables=len(model.columns), ilp_constraints=len(model.rows) + len(model.extra),
+                ilp_fixed=len(model.fixed))
+    for covering_k_indices, rhs in model.rows:
+        if len(covering_k_indices) < rhs:
+            raise ValueError(f"存在可覆盖它的 k 组不足 {coverage} 个的 j 组，参数设置可能有误。")
+    if progress is not None:
+        progress({'phase': 'ilp_reduce', 'rows': len(model.rows), 'columns': len(model.columns)})
+    # 3. 贪心解作为初始可行解（重新命名后满足对称性破除约束）
+    #    若它已达到组合下界则已是最优解，无需调用 CBC
+    bound = combinatorial_lower_bound(n, k, j, s, coverage)
+    initial = set()
+    if warm_start:
+        greedy_cover = greedy_optimal_selection(list(range(n)), k, j, s, coverage,
+                                                workers=workers, use_cache=use_cache, progress=progress,
+                                                stats=stats)
+        if len(greedy_cover) <= bound:
+            if use_cache:
+                store_solution(n, k, j, s, coverage, greedy_cover, 'greedy', optimal=True)
+            info = {'optimal': True, 'lower_bound': bound, 'status': 'optimal', 'peak_rss_kb': peak_rss_kb()}
+            return _finish(greedy_cover, n_samples, k, j, s, coverage, info, return_info, stats)
+        initial = model.warm_start(greedy_cover)
+    # 4. 求解
+    solver_progress = None
+    if progress is not None:
+        offset = len(model.fixed)
+        progress({'phase': 'ilp_solve', 'incumbent': offset + len(initial) if initial else None})
+        def solver_progress(event):
+            progress(dict({key: value + offset for key, value in event.items()}, phase='ilp_solve'))
+    known_bound = bound - len(model.fixed)
+    model_cutoff = None
+    if cutoff is not None:
+        def model_cutoff():
+            return cutoff() - len(model.fixed)
+    with stats.phase('ilp_solve'):
+        try:
+            if backend == "auto":
+                # 先用分支定界；找不到 CBC 或时间限制不超过预算时由它使用全部时间
+                fallback = next((name for name in ("pulp", "lp") if is_available(name)), None)
+                if fallback is None or (time_limit is not None and time_limit <= BNB_TIME_BUDGET):
+                    fallback, budget = None, time_limit
+                else:
+                    budget = BNB_TIME_BUDGET
+                start = time.monotonic()
+                chosen, cbc_lower_bound, finished = get_backend("bnb")(model, initial, budget, gap, solver_progress,
+                                                                       known_bound, model_cutoff)
+                solver = "bnb"
+                if fallback is not None and not finished:
+                    # 预算内未证明最优：以分支定界的最好解为初始解，剩余时间交给 CBC
+                    if chosen is not None:
+                        initial = set(chosen)
+                    if time_limit is not None:
+                        time_limit = max(1.0, time_limit - (time.monotonic() - start))
+                    chosen, cbc_lower_bound, finished = get_backend(fallback)(model, initial, time_limit, gap,
+                                                                              solver_progress, known_bound)
+                    solver = "cbc"
+            else:
+                chosen, cbc_lower_bound, finished = get_backend(backend)(model, initial, time_limit, gap,
+                                                                         solver_progress, known_bound, model_cutoff)
+                solver = "bnb" if backend == "bnb" else "cbc"
+        except Exception as e:
+            raise RuntimeError(f"ILP 求解过程出错: {str(e)}")
+
+    if chosen is None:
+        if not initial:
+            raise RuntimeError("ILP 求解失败，未找到可行解。")
+        # 限时内 CBC 没有给出解：退回到初始的贪心解
+        chosen = sorted(initial)
+    elif initial and len(initial) < len(chosen):
+        chosen = sorted(initial)
+
+    # 是否证明最优：CBC 报告的下界或组合下界已与解的规模一致，或 CBC 报告最优且未因时间或间隙提前停止
+    cbc_bound = max(0, math.ceil(cbc_lower_bound - 1e-6)) if cbc_lower_bound is not None else 0
+    if cbc_lower_bound is not None:
+        proven_optimal = cbc_bound >= len(chosen)
+    else:
+        proven_optimal = finished and not gap
+    lower_bound = max(bound, len(model.fixed) + (len(chosen) if proven_optimal else cbc_bound))
+    proven_optimal = proven_optimal or lower_bound >= len(model.fixed) + len(chosen)
+
+    selected_k_group_indices = sorted(model.fixed + list(chosen))
+    selected_positions = [lex_unrank(i, n, k) for i in selected_k_group_indices]
+    if use_cache:
+        store_solution(n, k, j, s, coverage, selected_positions, 'ilp', optimal=proven_optimal)
+    info = {
+        'optimal': proven_optimal,
+        'lower_bound': lower_bound,
+        'status': 'optimal' if proven_optimal else 'stopped',
+        'solver': solver,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+    return _finish(selected_positions, n_samples, k, j, s, coverage, info, return_info, stats)
 
 
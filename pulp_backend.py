@@ -0,0 +1,86 @@
+"""pulp 后端：用 pulp 建模并调用其自带（或打包进程序）的 CBC 求解约简后的 ILP。
+
+只由 backends.py 在第一次选用 "pulp" 后端时导入，因此导入本模块（即导入 pulp）的开销
+不会出现在 GUI 启动或只使用贪心、局部搜索的求解中。
+"""
+import os
+import sys
+import tempfile
+import threading
+
+import pulp
+
+from backends import cbc_executable
+from ilp_model import parse_cbc_progress, read_cbc_lower_bound
+
+def _follow_cbc_log(path, progress, stop):
+    """后台线程：跟踪 CBC 日志文件，把其中新出现的解与下界交给 progress，直到 stop 被设置。"""
+    position = 0
+    pending = ''
+    while True:
+        stopping = stop.wait(0.5)
+        try:
+            with open(path, 'r', errors='replace') as f:
+                f.seek(position)
+                pending += f.read()
+                position = f.tell()
+        except OSError:
+            pass
+        *lines, pending = pending.split('\n')
+        for line in lines:
+            event = parse_cbc_progress(line)
+            if event:
+                progress(event)
+        if stopping:
+            return
+
+def solve_with_pulp(model, initial, time_limit=None, gap=None, progress=None):
+    """用 pulp 建模并调用 CBC，返回 (选中的列或 None, CBC 报告的下界, 是否求解到最优)。
+
+    progress 不为 None 时在求解期间跟踪 CBC 日志，回调参数同 ilp_model.solve_lp_with_cbc。
+    """
+    prob = pulp.LpProblem("OptimalSampleSelection", pulp.LpMinimize)
+    # 决策变量：只为未被固定或删除的 k 组建立
+    x_vars = {i: pulp.LpVariable(f"x_{i}", cat="Binary") for i in model.columns}
+    for i, var in x_vars.items():
+        var.setInitialValue(1 if i in initial else 0)
+    # 目标函数
+    prob += pulp.lpSum(x_vars.values())
+    # 约束：要求每个 j 组（扣除已固定的 k 组后）至少还被 rhs 个 k 组覆盖
+    for row_idx, (covering_k_indices, rhs) in enumerate(model.rows):
+        prob += pulp.lpSum([x_vars[i] for i in sorted(covering_k_indices)]) >= rhs, f"cover_j_{row_idx}"
+    for extra_idx, (k_indices, rhs) in enumerate(model.extra):
+        prob += pulp.lpSum([x_vars[i] for i in k_indices]) >= rhs, f"symmetry_{extra_idx}"
+
+    solver_options = {'msg': 0, 'warmStart': bool(initial), 'timeLimit': time_limit, 'gapRel': gap}
+    solver_path = cbc_executable() if getattr(sys, 'frozen', False) else None
+    if solver_path is not None:
+        solver_options['path'] = solver_path
+    log_fd, log_path = tempfile.mkstemp(suffix=".log", prefix="cbc_")
+    os.close(log_fd)
+    stop_following = threading.Event()
+    follower = None
+    if progress is not None:
+        follower = threading.Thread(target=_follow_cbc_log, args=(log_path, progress, stop_following), daemon=True)
+        follower.start()
+    try:
+        try:
+            result_status = prob.solve(pulp.PULP_CBC_CMD(logPath=log_path, **solver_options))
+        finally:
+            stop_following.set()
+            if follower is not None:
+                follower.join()
+        with open(log_path, 'r', errors='replace') as f:
+            cbc_lower_bound = read_cbc_lower_bound(f.read())
+    finally:
+        try:
+            os.remove(log_path)
+        except OSError:
+            pass
+
+    if result_status != pulp.LpStatusOptimal or any(var.value() is None for var in x_vars.values()):
+        return None, cbc_lower_bound, False
+    chosen = [i for i, var in x_vars.items() if round(var.value()) == 1]
+    solution_optimal = getattr(pulp, 'LpSolutionOptimal', 1)
+    finished = getattr(prob, 'sol_status', solution_optimal) == solution_optimal
+    return chosen, cbc_lower_bound, finished
@@ -0,0 +1,336 @@
+"""竞速模式：在独立进程中同时运行多个求解引擎，在同一个截止时间内取最好的覆盖。
+
+引擎：
+    'greedy'         惰性贪心（CELF），几乎立即给出第一个解；
+    'local_search'   贪心 + 局部搜索，每个进程使用不同的随机种子（多起点）；
+    'ilp'            约简模型上的分支定界（必要时交给 CBC），能证明最优。
+各引擎通过一个共享的整数交换当前最好解的组数：分支定界只搜索比它更小的解（见
+branch_bound.solve_branch_and_bound 的 cutoff），搜索完毕即证明该组数最优。
+
+协调进程在任一引擎证明最优（最好解的组数达到已知下界）或截止时间到达时结束竞速，
+终止其余引擎（连同 CBC 子进程），返回最好的覆盖以及求得它的引擎。
+各引擎在开始求解时按截止时间计算自身的时间限制，并提前 RACE_FINISH_MARGIN 秒，以便在截止前送回结果。
+
+协调进程先把覆盖索引写入磁盘缓存，各引擎内存映射同一个文件，索引只占一份物理内存。
+无法共享（不使用缓存或写入失败）且各引擎分别构建的索引放不进可用内存时，改用流式索引；
+默认的引擎数同时受处理器核心数与可用内存限制（见 default_engines 与 engine_memory_bytes）。
+"""
+import math
+import multiprocessing
+import os
+import random
+import signal
+import time
+from multiprocessing.connection import wait
+
+from bounds import lower_bound as combinatorial_lower_bound
+from cache import cached_coverage_index, has_coverage_index
+from coverage import index_size_bytes, resolve_coverage
+from optimal_selection import (RunStats, _finish, _use_streaming, greedy_optimal_selection, ilp_optimal_selection,
+                               local_search_selection, peak_rss_kb)
+from solver_worker import _kill_process_tree
+
+ENGINES = ('greedy', 'local_search', 'ilp')
+# 引擎自身的时间限制比截止时间提前的秒数
+RACE_FINISH_MARGIN = 1.0
+# 每个引擎进程除覆盖索引之外的固定开销（解释器与模块，字节）
+ENGINE_BASE_BYTES = 64 << 20
+
+def available_memory_bytes():
+    """当前可用的物理内存（字节），无法得知时返回 None。"""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if os.name == 'nt':
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullAvailPhys
+        return None
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def engine_memory_bytes(n, k, j, s, shared=True, streaming=False):
+    """单个引擎进程的内存估计（字节）。
+
+    共享（内存映射缓存文件）或流式索引时只计每组的计数器与固定开销；否则每个引擎各自持有一份完整索引。
+    """
+    per_group = 16 * (math.comb(n, k) + math.comb(n, j))
+    if streaming or shared:
+        return ENGINE_BASE_BYTES + per_group
+    return ENGINE_BASE_BYTES + per_group + index_size_bytes(n, k, j, s)
+
+def default_engines(processes=None, max_engines=None, ilp=True):
+    """默认的引擎组合：贪心与 ILP 各一个，其余处理器核心各运行一个局部搜索（至少一个）。
+
+    max_engines 不为 None 时（例如可用内存只够这么多进程）按贪心、ILP、局部搜索的顺序截取，至少保留贪心；
+    ilp 为 False 时（流式索引）不含 ILP，由局部搜索补足。
+    """
+    processes = processes or os.cpu_count() or 1
+    engines = ['greedy', 'ilp'] + ['local_search'] * max(1, processes - 2)
+    if not ilp:
+        engines[1] = 'local_search'
+
+    if max_engines is not None:
+        engines = engines[:max(1, max_engines)]
+    return engines
+
+def _engine_labels(engines):
+    """引擎的显示名称；同名的引擎依次编号，例如 local_search-1、local_search-2。"""
+    totals = {name: engines.count(name) for name in engines}
+    seen = {}
+    labels = []
+    for name in engines:
+        seen[name] = seen.get(name, 0) + 1
+        labels.append(f"{name}-{seen[name]}" if totals[name] > 1 else name)
+    return labels
+
+def _engine_main(conn, engine, n, k, j, s, coverage, deadline, seed, use_cache, streaming, incumbent):
+    """引擎子进程入口：求解下标空间中的问题（样本为 0..n-1）。
+
+    deadline 为截止时刻（time.time()，各进程共用的时钟），进程启动的耗时也计入在内。
+
+    发送 ('progress', {'incumbent': 组数} 或 {'lower_bound': 下界})、('result', 位置元组列表, 信息字典)
+    或 ('error', message)。
+    """
+    if hasattr(os, 'setpgrp'):
+        # 自成进程组，结束竞速时可以连同 CBC 等子进程一起终止
+        os.setpgrp()
+
+    def publish(size):
+        with incumbent.get_lock():
+            if size < incumbent.value:
+                incumbent.value = size
+        conn.send(('progress', {'incumbent': size}))
+
+    def progress(event):
+        phase = event.get('phase')
+        if phase == 'greedy' and event.get('unsatisfied') == 0:
+            publish(event['cover_size'])
+        elif phase == 'local_search':
+            publish(event['cover_size'])
+        elif phase == 'ilp_solve':
+            if event.get('incumbent') is not None:
+                publish(event['incumbent'])
+            if event.get('lower_bound') is not None:
+                # CBC 报告的是线性松弛的下界，组数为整数
+                conn.send(('progress', {'lower_bound': math.ceil(event['lower_bound'] - 1e-6)}))
+
+    try:
+        samples = list(range(n))
+        time_limit = max(0.1, deadline - time.time() - RACE_FINISH_MARGIN)
+        if engine == 'greedy':
+            groups, info = greedy_optimal_selection(samples, k, j, s, coverage, use_cache=use_cache,
+                                                    progress=progress, return_info=True, streaming=streaming)
+        elif engine == 'local_search':
+            groups, info = local_search_selection(samples, k, j, s, coverage, time_limit=time_limit, seed=seed,
+                                                  use_cache=use_cache, return_info=True, progress=progress,
+                                                  streaming=streaming)
+        elif engine == 'ilp':
+            groups, info = ilp_optimal_selection(samples, k, j, s, coverage, use_cache=use_cache,
+                                                 time_limit=time_limit, return_info=True, progress=progress,
+                                                 cutoff=lambda: incumbent.value)
+        else:
+            raise ValueError(f"未知的引擎: {engine}")
+        publish(len(groups))
+        conn.send(('result', groups, info))
+    except Exception as e:
+        conn.send(('error', str(e)))
+    finally:
+        conn.close()
+
+def _terminate(signum, frame):
+    # 求解进程被取消（SIGTERM）时经由 finally 终止各引擎，它们不在求解进程的进程组中
+    raise SystemExit(128 + signum)
+
+def race_selection(n_samples, k, j, s, coverage=1, time_limit=60.0, engines=None, seed=None, use_cache=True,
+                   return_info=False, progress=None, coverage_mode='groups', streaming=None, stats=None, workers=1):
+    """同时运行多个求解引擎，返回截止时间内得到的最好覆盖。
+
+    Args:
+        time_limit (float): 截止时间（秒，从调用时算起）；到达时终止仍在运行的引擎。
+        engines (list): 引擎名称列表（见 ENGINES，可重复），默认见 default_engines，引擎数不超过可用内存所能容纳的
+            进程数（见 engine_memory_bytes）；使用流式覆盖索引（完整索引过大，或无法共享且各引擎分别构建时
+            放不进可用内存）时不运行 'ilp'。
+        seed: 局部搜索引擎的随机种子基数，第 i 个局部搜索使用 seed + i；None 表示每次不同。
+        progress (callable): 除预先构建覆盖索引的事件外，每当最好解或下界改进时收到
+            {'phase': 'race', 'incumbent': 最好解的组数, 'lower_bound': 下界, 'engine': 报告它的引擎,
+            'running': 仍在运行的引擎数}。
+        workers (int): 预先构建覆盖索引时使用的进程数（各引擎随后读取缓存）。
+        其余参数与 greedy_optimal_selection 相同。return_info 时信息字典另含 'engine'（求得所返回覆盖的引擎）
+        与 'engines'（每个引擎的 {'engine', 'size', 'lower_bound', 'optimal', 'seconds', 'error'}，
+        未在截止前结束的引擎 'size' 为 None）；'status' 为 'optimal'、'stopped'（截止时间到达）
+        或 'heuristic'（所有引擎都已结束但未证明最优）。
+    """
+    n = len(n_samples)
+    if not (s <= j <= k <= n):
+        raise ValueError("参数必须满足 s <= j <= k <= n")
+    s, coverage = resolve_coverage(k, j, s, coverage, coverage_mode)
+    streaming = _use_streaming(n, k, j, s, streaming)
+    if engines is not None:
+        engines = list(engines)
+        for name in engines:
+            if name not in ENGINES:
+                raise ValueError(f"未知的引擎: {name}")
+        if not engines:
+            raise ValueError("至少需要一个引擎。")
+    if seed is None:
+        seed = random.randrange(1 << 30)
+    if stats is None:
+        stats = RunStats()
+    deadline = time.monotonic() + time_limit
+    engine_deadline = time.time() + time_limit
+
+    # 先构建（或读取）覆盖索引并写入磁盘缓存，各引擎随后内存映射同一个缓存文件，不必各自重复构建
+    shared = False
+    if use_cache and not streaming:
+        with stats.phase('coverage_index'):
+            cached_coverage_index(n, k, j, s, workers=workers, progress=progress)
+        shared = has_coverage_index(n, k, j, s)
+    available = available_memory_bytes()
+    processes = os.cpu_count() or 1
+    if not streaming and not shared and available is not None:
+        # 各引擎分别构建完整索引：放不进可用内存时改用流式索引
+        count = len(engines) if engines is not None else len(default_engines(processes))
+        if count > 1 and count * engine_memory_bytes(n, k, j, s, shared=False) > available:
+            streaming = True
+    if engines is None:
+        max_engines = None
+        if available is not None:
+            max_engines = available // engine_memory_bytes(n, k, j, s, shared, streaming)
+        engines = default_engines(processes, max_engines, ilp=not streaming)
+    if streaming:
+        engines = [name for name in engines if name != 'ilp']
+    if not engines:
+        raise ValueError("至少需要一个引擎。")
+    stats.count(race_shared_index=shared, race_streaming=streaming)
+
+    lower = combinatorial_lower_bound(n, k, j, s, coverage)
+    labels = _engine_labels(engines)
+    ctx = multiprocessing.get_context('spawn')
+    incumbent = ctx.Value('q', math.comb(n, k) + 1)
+    running = {}  # 连接 -> (引擎编号, 进程)
+    summaries = [{'engine': label, 'size': None, 'lower_bound': None, 'optimal': False, 'seconds': None,
+                  'error': None} for label in labels]
+    best = None  # 已送回的最好覆盖：(组数, 引擎编号, 位置元组列表, 信息字典)
+    best_size, best_engine = None, None  # 各引擎报告的最好解（可能尚未送回）
+    peaks = []  # 已结束的引擎的峰值内存
+    previous_handler = None
+    start = time.monotonic()
+    with stats.phase('race'):
+        try:
+            try:
+                previous_handler = signal.signal(signal.SIGTERM, _terminate)
+            except ValueError:
+                pass  # 不在主线程中，无法设置信号处理
+            local_searches = 0
+            for i, name in enumerate(engines):
+                parent_conn, child_conn = ctx.Pipe(duplex=False)
+                engine_seed = None
+                if name == 'local_search':
+                    engine_seed = seed + local_searches
+                    local_searches += 1
+                process = ctx.Process(target=_engine_main,
+                                      args=(child_conn, name, n, k, j, s, coverage, engine_deadline, engine_seed,
+                                            use_cache, streaming, incumbent))
+                process.start()
+                child_conn.close()
+                running[parent_conn] = (i, process)
+
+            while running and (best is None or best[0] > lower):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for conn in wait(list(running), remaining):
+                    i, process = running[conn]
+                    try:
+                        message = conn.recv()
+                    except (EOFError, OSError):
+                        # 引擎在没有发送结果的情况下退出
+                        process.join(1.0)
+                        summaries[i]['error'] = f"引擎进程意外退出（退出码 {process.exitcode}）"
+                        del running[conn]
+                        conn.close()
+                        continue
+                    event = None
+                    if message[0] == 'progress':
+                        event = message[1]
+                    elif message[0] == 'result':
+                        _, groups, info = message
+                        summaries[i].update(size=len(groups), lower_bound=info['lower_bound'],
+                                            optimal=info['optimal'], seconds=time.monotonic() - start)
+                        if info.get('verified', True) and (best is None or len(groups) < best[0]):
+                            best = (len(groups), i, groups, info)
+                        if info.get('peak_rss_kb') is not None:
+                            peaks.append(info['peak_rss_kb'])
+                        event = {'incumbent': len(groups), 'lower_bound': info['lower_bound']}
+                        del running[conn]
+                        conn.close()
+                        process.join(1.0)
+                    else:
+                        summaries[i]['error'] = message[1]
+                        del running[conn]
+                        conn.close()
+                        process.join(1.0)
+                    if event is None:
+                        continue
+                    improved = False
+                    if event.get('incumbent') is not None and (best_size is None or event['incumbent'] < best_size):
+                        best_size, best_engine, improved = event['incumbent'], labels[i], True
+                    if event.get('lower_bound') is not None and event['lower_bound'] > lower:
+                        lower, improved = event['lower_bound'], True
+                    if improved and progress is not None:
+                        progress({'phase': 'race', 'incumbent': best_size, 'lower_bound': lower,
+                                  'engine': best_engine, 'running': len(running)})
+        finally:
+            for conn, (i, process) in running.items():
+                if process.is_alive():
+                    _kill_process_tree(process)
+                process.join(3.0)
+                if process.is_alive():
+                    process.kill()
+                conn.close()
+            if previous_handler is not None:
+                signal.signal(signal.SIGTERM, previous_handler)
+
+    if best is None:
+        errors = "; ".join(f"{summary['engine']}: {summary['error']}" for summary in summaries if summary['error'])
+        raise RuntimeError(f"竞速在截止时间内没有得到任何解。{errors}")
+    size, winner, groups, winner_info = best
+    optimal = size <= lower
+    if optimal:
+        status = 'optimal'
+    elif running:
+        status = 'stopped'
+    else:
+        status = 'heuristic'
+    if peak_rss_kb() is not None:
+        peaks.append(peak_rss_kb())
+    if winner_info.get('stats') is not None:
+        stats.count(**winner_info['stats'].counters)
+    stats.count(race_engines=len(engines), race_winner=labels[winner])
+    info = {
+        'optimal': optimal,
+        'lower_bound': lower,
+        'status': status,
+        'engine': labels[winner],
+        'engines': summaries,
+        'peak_rss_kb': max(peaks) if peaks else None,
+    }
+    if winner_info.get('cached'):
+        info.update(cached=True, algorithm=winner_info['algorithm'])
+    return _finish(groups, n_samples, k, j, s, coverage, info, return_info, stats)
@@ -0,0 +1,103 @@
+"""紧凑的二进制结果文件（.osr）与 JSON 导出。
+
+文件布局（小端）：
+    8 字节魔数 'OSSRES01' + 4 字节元数据长度 L
+    L 字节 UTF-8 JSON 元数据：参数、run_index、algorithm、lower_bound、created_at、stats（求解统计）、
+        samples（样本标签，只存一次）与 num_groups
+    补齐到 8 字节边界后，num_groups 个 32 位位掩码（与结果数据库中的格式相同，见 results_db.pack_groups）
+
+读取时整个文件以只读方式内存映射，组数据按需分页解码，不必一次性读入或解析整个文件。
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+
+RESULT_FILE_EXT = '.osr'
+
+_RESULT_MAGIC = b'OSSRES01'
+_RESULT_HEADER = struct.Struct('<8sI')
+
+def _masks_offset(meta_size):
+    return -(-(_RESULT_HEADER.size + meta_size) // 8) * 8
+
+def write_result_file(path, meta, samples, blob):
+    """写入一个 .osr 文件。meta 为元数据字典，blob 为 pack_groups 打包的组数据。"""
+    if sys.byteorder != 'little':
+        raise RuntimeError("当前平台不是小端序，无法直接写入位掩码。")
+    meta = dict(meta, samples=list(samples), num_groups=len(blob) // 4)
+    encoded = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    offset = _masks_offset(len(encoded))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_RESULT_HEADER.pack(_RESULT_MAGIC, len(encoded)))
+        f.write(encoded)
+        f.write(b'\0' * (offset - _RESULT_HEADER.size - len(encoded)))
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+class ResultFile:
+    """内存映射打开的 .osr 文件。
+
+    meta: 元数据字典（含 'samples' 与 'num_groups'）；groups(offset, limit) 按存储顺序解码一页组，
+    masks() 返回未解码的位掩码。
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, meta_size = _RESULT_HEADER.unpack_from(self._mm)
+            if magic != _RESULT_MAGIC:
+                raise ValueError(f"不是结果文件: {path}")
+            self.meta = json.loads(self._mm[_RESULT_HEADER.size:_RESULT_HEADER.size + meta_size].decode('utf-8'))
+            offset = _masks_offset(meta_size)
+            self.num_groups = self.meta['num_groups']
+            if len(self._mm) != offset + 4 * self.num_groups:
+                raise ValueError(f"结果文件已损坏（长度不符）: {path}")
+            self._masks = memoryview(self._mm)[offset:].cast('I')
+        except BaseException:
+            self._mm.close()
+            raise
+        self.samples = self.meta['samples']
+
+    def groups(self, offset=0, limit=None):
+        """第 offset 组起的至多 limit 个组（标签元组，组内按样本顺序排列）。"""
+        stop = self.num_groups if limit is None else min(self.num_groups, offset + limit)
+        samples = self.samples
+        return [tuple(label for i, label in enumerate(samples) if mask >> i & 1)
+                for mask in self._masks[offset:stop]]
+
+    def masks(self):
+        """全部组的 32 位位掩码（相对于 samples，按存储顺序），直接读自映射的文件。"""
+        return self._masks
+
+    def close(self):
+        self._masks.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def export_json(path, meta, samples, groups):
+    """导出为 JSON（与 results_db.ResultsDB.import_json_results 读取的格式相同），便于与其他程序交换。"""
+    params = {key: meta[key] for key in ('m', 'n', 'k', 'j', 's', 'coverage')}
+    if meta.get('coverage_mode', 'groups') != 'groups':
+        params['coverage_mode'] = meta['coverage_mode']
+    data = {
+        'parameters': params,
+        'run_index': meta.get('run_index'),
+        'algorithm': meta.get('algorithm'),
+        'lower_bound': meta.get('lower_bound'),
+        'created_at': meta.get('created_at'),
+        'stats': meta.get('stats'),
+        'samples': list(samples),
+        'num_groups': len(groups),
+        'selected_k_groups': [list(group) for group in groups],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
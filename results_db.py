@@ -0,0 +1,284 @@
+"""基于 SQLite 的结果数据库（project.txt 中的 "DB file"）。
+
+每次运行保存为一行：参数列 m, n, k, j, s, coverage 等均建有索引；
+选中的 k 组以紧凑的二进制形式保存：样本标签只存一次，每个组是一个相对于样本列表的
+32 位位掩码（n <= 25）。组按显示顺序（组内标签排序后的字典序）保存，可以直接分页读取。
+单次运行可以导出为同样紧凑的 .osr 文件或 JSON（见 result_file.py）。
+stats 列以 JSON 保存求解时的分阶段统计（见 optimal_selection.RunStats.as_dict），便于比较不同运行的性能。
+"""
+import json
+import os
+import sqlite3
+from array import array
+from datetime import datetime
+
+from result_file import ResultFile, export_json, write_result_file
+
+RESULTS_DIR = 'results'
+RESULTS_DB = os.path.join(RESULTS_DIR, 'results.db')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    m INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    k INTEGER NOT NULL,
+    j INTEGER NOT NULL,
+    s INTEGER NOT NULL,
+    coverage INTEGER NOT NULL,
+    run_index INTEGER NOT NULL,
+    num_groups INTEGER NOT NULL,
+    lower_bound INTEGER,
+    coverage_mode TEXT NOT NULL DEFAULT 'groups',
+    algorithm TEXT,
+    created_at TEXT NOT NULL,
+    samples TEXT NOT NULL,
+    groups BLOB NOT NULL,
+    source_file TEXT UNIQUE,
+    stats TEXT
+);
+-- 已导入的 JSON 文件名；删除对应的运行后也保留，避免下次启动时重新导入
+CREATE TABLE IF NOT EXISTS imported_files (
+    filename TEXT PRIMARY KEY
+);
+CREATE INDEX IF NOT EXISTS idx_runs_params ON runs (m, n, k, j, s, coverage);
+CREATE INDEX IF NOT EXISTS idx_runs_run_index ON runs (run_index);
+CREATE INDEX IF NOT EXISTS idx_runs_num_groups ON runs (num_groups);
+CREATE INDEX IF NOT EXISTS idx_runs_algorithm ON runs (algorithm);
+CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs (created_at);
+"""
+
+def pack_groups(groups, samples):
+    """把 k 组打包为相对于 samples 的 32 位位掩码序列。"""
+    if len(samples) > 32:
+        raise ValueError("样本数超过 32，无法打包为 32 位位掩码。")
+    position = {label: i for i, label in enumerate(samples)}
+    masks = array('I')
+    for group in groups:
+        mask = 0
+        for label in group:
+            mask |= 1 << position[label]
+        masks.append(mask)
+    if masks.itemsize != 4:
+        raise RuntimeError("当前平台的 array('I') 不是 32 位。")
+    return masks.tobytes()
+
+def unpack_groups(blob, samples):
+    """pack_groups 的逆操作，返回标签元组列表（组内按样本顺序排列）。"""
+    masks = array('I')
+    masks.frombytes(blob)
+    return [tuple(label for i, label in enumerate(samples) if mask >> i & 1) for mask in masks]
+
+def run_name(m, n, k, j, s, coverage, run_index, num_groups):
+    """与原 JSON 文件名一致的显示名称：m-n-k-j-s-coverage-run_index-num_results。"""
+    return f"{m}-{n}-{k}-{j}-{s}-{coverage}-{run_index}-{num_groups}"
+
+# runs 表中除组数据外的列
+_RUN_COLUMNS = ('id', 'name', 'm', 'n', 'k', 'j', 's', 'coverage', 'coverage_mode', 'run_index', 'num_groups',
+                'lower_bound', 'algorithm', 'created_at', 'samples', 'stats')
+
+class ResultsDB:
+    """结果数据库。"""
+
+    def __init__(self, db_path=RESULTS_DB):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        # isolation_level=None：事务由下面的方法显式控制
+        self.conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """为旧版本创建的数据库补上新增的列。"""
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(runs)")}
+        if 'lower_bound' not in columns:
+            self.conn.execute("ALTER TABLE runs ADD COLUMN lower_bound INTEGER")
+        if 'coverage_mode' not in columns:
+            self.conn.execute("ALTER TABLE runs ADD COLUMN coverage_mode TEXT NOT NULL DEFAULT 'groups'")
+        if 'stats' not in columns:
+            self.conn.execute("ALTER TABLE runs ADD COLUMN stats TEXT")
+
+    def close(self):
+        self.conn.close()
+
+    def add_run(self, m, n, k, j, s, coverage, groups, samples=None, algorithm=None,
+                run_index=None, created_at=None, source_file=None, lower_bound=None, coverage_mode='groups',
+                stats=None):
+        """保存一次运行，返回 (id, run_index, name)。lower_bound 为该参数下已知的组数下界，
+        coverage_mode 为 coverage 的语义（见 coverage.resolve_coverage），stats 为可写入 JSON 的求解统计。
+
+        run_index 为 None 时在同一个写事务中分配 MAX(run_index)+1，多个进程同时保存也不会冲突。
+        samples 为 None 时使用各组中出现过的标签（排序后）。
+        """
+        if samples is None:
+            samples = sorted({label for group in groups for label in group})
+        samples = [str(label) for label in samples]
+        blob = pack_groups(_display_order(groups), samples)
+        created_at = created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cur = self.conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            if run_index is None:
+                run_index = cur.execute("SELECT COALESCE(MAX(run_index), 0) + 1 FROM runs").fetchone()[0]
+            name = run_name(m, n, k, j, s, coverage, run_index, len(groups))
+            cur.execute(
+                "INSERT INTO runs (name, m, n, k, j, s, coverage, run_index, num_groups, lower_bound, coverage_mode,"
+                " algorithm, created_at, samples, groups, source_file, stats)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, m, n, k, j, s, coverage, run_index, len(groups), lower_bound, coverage_mode, algorithm,
+                 created_at, json.dumps(samples), blob, source_file, _dump_stats(stats)))
+            run_id = cur.lastrowid
+            cur.execute("COMMIT")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+        return run_id, run_index, name
+
+    def count_runs(self):
+        return self.conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def list_runs(self, offset=0, limit=100):
+        """按保存时间倒序分页列出运行（不含组数据）。"""
+        rows = self.conn.execute(
+            "SELECT id, name, m, n, k, j, s, coverage, coverage_mode, run_index, num_groups, lower_bound, algorithm,"
+            " created_at"
+            " FROM runs ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?", (limit, offset))
+        return [dict(row) for row in rows]
+
+    def get_run(self, run_id, unpack=True):
+        """读取一次运行的完整内容；不存在时返回 None。
+
+        unpack 为 False 时不读取组数据（'groups' 键不存在），组可再用 get_groups 分页读取。
+        """
+        columns = "*" if unpack else ", ".join(_RUN_COLUMNS)
+        row = self.conn.execute(f"SELECT {columns} FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record['samples'] = json.loads(record['samples'])
+        record['stats'] = _load_stats(record['stats'])
+        if unpack:
+            record['groups'] = unpack_groups(record['groups'], record['samples'])
+        return record
+
+    def get_groups(self, run_id, offset=0, limit=None, samples=None):
+        """按保存顺序读取一次运行的第 offset 组起的至多 limit 个组，只从数据库取出这一段字节。"""
+        # 每组 4 字节：第 offset 组从第 4*offset+1 个字节开始（substr 从 1 计数）
+        if limit is None:
+            row = self.conn.execute("SELECT substr(groups, ?), samples FROM runs WHERE id = ?",
+                                    (4 * offset + 1, run_id)).fetchone()
+        else:
+            row = self.conn.execute("SELECT substr(groups, ?, ?), samples FROM runs WHERE id = ?",
+                                    (4 * offset + 1, 4 * limit, run_id)).fetchone()
+        if row is None:
+            return []
+        return unpack_groups(row[0], samples if samples is not None else json.loads(row[1]))
+
+    def get_masks(self, run_id):
+        """一次运行的组数据的原始形式：相对于其样本的 32 位位掩码（array('I')），供校验等按位处理使用。"""
+        row = self.conn.execute("SELECT groups FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"运行不存在: {run_id}")
+        masks = array('I')
+        masks.frombytes(row[0])
+        return masks
+
+    def export_run(self, run_id, path):
+        """把一次运行导出为 .osr（紧凑二进制）或 .json 文件（按扩展名选择）。"""
+        row = self.conn.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"运行不存在: {run_id}")
+        meta = {key: row[key] for key in _RUN_COLUMNS if key not in ('id', 'samples')}
+        meta['stats'] = _load_stats(meta['stats'])
+        samples = json.loads(row['samples'])
+        if path.lower().endswith('.json'):
+            export_json(path, meta, samples, unpack_groups(row['groups'], samples))
+        else:
+            write_result_file(path, meta, samples, row['groups'])
+
+    def import_result_file(self, path):
+        """导入一个 .osr 文件，返回 (id, run_index, name)；run_index 重新分配。"""
+        with ResultFile(path) as result:
+            meta = result.meta
+            return self.add_run(meta['m'], meta['n'], meta['k'], meta['j'], meta['s'], meta['coverage'],
+                                result.groups(), samples=result.samples, algorithm=meta.get('algorithm'),
+                                created_at=meta.get('created_at'), lower_bound=meta.get('lower_bound'),
+                                coverage_mode=meta.get('coverage_mode', 'groups'), stats=meta.get('stats'))
+
+    def delete_run(self, run_id):
+        """删除一次运行，返回是否确实删除了记录。"""
+        cur = self.conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+        return cur.rowcount > 0
+
+    def import_json_results(self, results_dir=RESULTS_DIR):
+        """批量导入 results/*.json；已导入过的文件（按文件名）会被跳过，无法解析的文件只提示一次。返回导入的运行数。"""
+        try:
+            filenames = [f for f in os.listdir(results_dir) if f.endswith('.json')]
+        except FileNotFoundError:
+            return 0
+        known = {row[0] for row in self.conn.execute("SELECT filename FROM imported_files")}
+        rows = []
+        imported = []
+        for filename in sorted(filenames):
+            if filename in known:
+                continue
+            filepath = os.path.join(results_dir, filename)
+            imported.append((filename,))
+            try:
+                with open(filepath, 'r') as f:
+                    data = json.load(f)
+                params = data['parameters']
+                groups = _display_order([[str(label) for label in group] for group in data['selected_k_groups']])
+                # 旧文件可能没有保存样本，只能从组中的标签还原；未被任何组使用的样本无从得知
+                samples = data.get('samples') or sorted({label for group in groups for label in group})
+                if len(samples) != params['n']:
+                    raise ValueError(f"{len(samples)} samples for n={params['n']}")
+                created_at = data.get('created_at') or _timestamp_from_filename(filename) or datetime.fromtimestamp(
+                    os.path.getmtime(filepath)).strftime("%Y-%m-%d %H:%M:%S")
+                m, n, k, j, s = (params[key] for key in ('m', 'n', 'k', 'j', 's'))
+                coverage = params.get('coverage', 1)
+                run_index = data.get('run_index', 0)
+                rows.append((run_name(m, n, k, j, s, coverage, run_index, len(groups)), m, n, k, j, s,
+                             coverage, run_index, len(groups), data.get('lower_bound'),
+                             params.get('coverage_mode', 'groups'), data.get('algorithm'), created_at,
+                             json.dumps(samples), pack_groups(groups, samples), filename,
+                             _dump_stats(data.get('stats'))))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"警告：跳过无法导入的结果文件 {filename}: {e}")
+        if imported:
+            cur = self.conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                cur.executemany(
+                    "INSERT OR IGNORE INTO runs (name, m, n, k, j, s, coverage, run_index, num_groups, lower_bound,"
+                    " coverage_mode, algorithm, created_at, samples, groups, source_file, stats)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows)
+                cur.executemany("INSERT OR IGNORE INTO imported_files (filename) VALUES (?)", imported)
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+def _dump_stats(stats):
+    return None if stats is None else json.dumps(stats)
+
+def _load_stats(text):
+    return None if text is None else json.loads(text)
+
+def _display_order(groups):
+    """组的保存顺序：组内标签排序后按字典序排列（与界面的显示顺序一致）。"""
+    return sorted(tuple(sorted(str(label) for label in group)) for group in groups)
+
+def _timestamp_from_filename(filename):
+    """从 ...-YYYYMMDD_HHMMSS.json 形式的文件名中取出保存时间。"""
+    stem = os.path.splitext(filename)[0]
+    try:
+        return datetime.strptime(stem.rsplit('-', 1)[-1], "%Y%m%d_%H%M%S").strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
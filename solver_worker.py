@@ -0,0 +1,141 @@
+"""在独立进程中运行求解器，通过管道向 GUI 发送结构化的进度事件。
+
+子进程发送的消息：
+    ('progress', event)          event 为求解器进度回调收到的字典（含 'phase'）
+    ('result', groups, info)     info 为求解器返回的信息字典（'optimal', 'lower_bound', 'status', 'peak_rss_kb'）
+    ('error', message)
+"""
+import multiprocessing
+import os
+import signal
+import subprocess
+import time
+
+# 同一阶段内两次进度消息的最小间隔（秒），阶段切换时总是立即发送
+PROGRESS_INTERVAL = 0.1
+# 未指定时间限制时局部搜索的默认时间预算（秒）
+LOCAL_SEARCH_TIME_LIMIT = 10.0
+# 未指定时间限制时竞速模式的截止时间（秒）
+RACE_TIME_LIMIT = 60.0
+
+def _solver_main(conn, algorithm, n_samples, params):
+    """子进程入口。"""
+    if hasattr(os, 'setpgrp'):
+        # 成为新进程组的组长，取消时可以连同 CBC 等子进程一起终止
+        os.setpgrp()
+    from optimal_selection import greedy_optimal_selection, ilp_optimal_selection, local_search_selection
+
+    last_phase = [None]
+    last_sent = [0.0]
+    def progress(event):
+        now = time.monotonic()
+        if event.get('phase') == last_phase[0] and now - last_sent[0] < PROGRESS_INTERVAL:
+            return
+        last_phase[0] = event.get('phase')
+        last_sent[0] = now
+        conn.send(('progress', event))
+
+    try:
+        k, j, s, coverage = params['k'], params['j'], params['s'], params['coverage']
+        coverage_mode = params.get('coverage_mode', 'groups')
+        streaming = params.get('streaming')
+        workers = params.get('workers', 1)
+        if algorithm == "greedy":
+            groups, info = greedy_optimal_selection(n_samples, k, j, s, coverage, progress=progress,
+                                                    return_info=True, coverage_mode=coverage_mode,
+                                                    streaming=streaming, workers=workers)
+        elif algorithm == "local_search":
+            groups, info = local_search_selection(n_samples, k, j, s, coverage,
+                                                  time_limit=params.get('time_limit') or LOCAL_SEARCH_TIME_LIMIT,
+                                                  return_info=True, progress=progress, coverage_mode=coverage_mode,
+                                                  streaming=streaming, workers=workers)
+        elif algorithm == "ilp":
+            groups, info = ilp_optimal_selection(n_samples, k, j, s, coverage, time_limit=params.get('time_limit'),
+                                                 return_info=True, progress=progress, coverage_mode=coverage_mode,
+                                                 workers=workers)
+        elif algorithm == "race":
+            from race import race_selection
+            groups, info = race_selection(n_samples, k, j, s, coverage,
+                                          time_limit=params.get('time_limit') or RACE_TIME_LIMIT, return_info=True,
+                                          progress=progress, coverage_mode=coverage_mode, streaming=streaming,
+                                          workers=workers)
+        else:
+            raise ValueError(f"未知的算法: {algorithm}")
+        conn.send(('result', groups, info))
+    except Exception as e:
+        conn.send(('error', str(e)))
+    finally:
+        conn.close()
+
+def _kill_process_tree(process):
+    """终止求解子进程及其启动的所有进程（如 CBC）。"""
+    if os.name == 'nt':
+        subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        # 子进程尚未建立自己的进程组
+        process.terminate()
+
+class SolverProcess:
+    """一次在子进程中运行的求解。
+
+    使用 spawn 方式启动，避免在 Tk 进程中 fork；子进程不是守护进程，
+    因此仍可以用进程池并行构建覆盖索引。
+    """
+
+    def __init__(self, algorithm, n_samples, params):
+        ctx = multiprocessing.get_context('spawn')
+        self._conn, child_conn = ctx.Pipe(duplex=False)
+        self.process = ctx.Process(target=_solver_main, args=(child_conn, algorithm, list(n_samples), dict(params)))
+        self.process.start()
+        child_conn.close()
+        self.finished = False
+
+    def poll(self):
+        """不阻塞地取出所有已到达的消息。
+
+        子进程在没有发送结果的情况下退出时，补发一条 'error' 消息。
+        """
+        messages = []
+        if self.finished:
+            return messages
+        try:
+            while self._conn.poll():
+                message = self._conn.recv()
+                messages.append(message)
+                if message[0] in ('result', 'error'):
+                    self._finish()
+                    return messages
+        except (EOFError, OSError):
+            pass
+        if not self.process.is_alive():
+            # 进程退出前发送的消息可能刚刚到达
+            try:
+                while self._conn.poll():
+                    messages.append(self._conn.recv())
+            except (EOFError, OSError):
+                pass
+            if not any(message[0] in ('result', 'error') for message in messages):
+                messages.append(('error', f"求解进程意外退出（退出码 {self.process.exitcode}）"))
+            self._finish()
+        return messages
+
+    def cancel(self, timeout=3.0):
+        """终止正在运行的求解。"""
+        if self.finished:
+            return
+        if self.process.is_alive():
+            _kill_process_tree(self.process)
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.kill()
+        self._finish()
+
+    def _finish(self):
+        self.finished = True
+        self.process.join(1.0)
+        self._conn.close()
@@ -0,0 +1,120 @@
+"""覆盖解的校验：检查一组 k 组是否满足全部 C(n, j) 个 j 组。
+
+j 组 J 被 k 组 K 满足当且仅当 |K ∩ J| >= s；每个 j 组需要被 coverage 个不同的 k 组满足。
+校验不依赖求解器的内部状态，求解结束后与加载已保存的结果时都可以调用。
+
+两种做法，按估计的代价自动选择：
+  位集：每个样本 e 对应一个 C(n, j) 位的整数，第 t 位表示 e 属于第 t 个 j 组。
+      对每个 K，用 k 次按位运算逐级累计“至少含 K 的 i 个样本”的 j 组位集，
+      再用同样的方式累计“至少被 i 个 k 组满足”的位集；所有 j 组并行处理，代价与组数和 k * s 成正比。
+  逐行：对每个 K 直接枚举它满足的 j 组并计数（与 StreamingCoverageIndex 相同的枚举），
+      代价与组数和每个 k 组满足的 j 组数成正比，适合 s 接近 j、组数很多的情形。
+"""
+import math
+from array import array
+from functools import lru_cache
+
+from combinatorics import iter_bits, lex_rank, lex_unrank, mask_of, popcount
+from coverage import StreamingCoverageIndex, _covering_count, resolve_coverage
+
+# 按位运算每处理多少位，耗时约等于逐行枚举并计数一个 j 组（实测约 2 微秒）
+_BITSET_BITS_PER_ROW = 1 << 16
+
+@lru_cache(maxsize=4)
+def j_membership_bitsets(n, j):
+    """每个样本的 j 组成员位集：第 e 项的第 t 位为 1 当且仅当样本 e 属于第 t 个 j 组（字典序）。
+
+    以 lo 为下界的 r 元组合依次是“以 lo 开头的组合”和“以 lo+1 为下界的 r 元组合”，
+    前者对样本 lo 全为 1，对 e > lo 等于以 lo+1 为下界的 r-1 元组合的位集，
+    因此按 r 递推，每一层只需 O(n^2) 次大整数移位与或运算。
+    """
+    # level[lo] = (组合数, [各样本的成员位集])，当前层为以 lo 为下界的 r 元组合
+    level = [(1, [0] * n) for _ in range(n + 1)]
+    for r in range(1, j + 1):
+        upper = [(0, [0] * n) for _ in range(n + 1)]
+        for lo in range(n - r, -1, -1):
+            head_size, head = level[lo + 1]
+            tail_size, tail = upper[lo + 1]
+            bits = [0] * n
+            for e in range(lo, n):
+                block = (1 << head_size) - 1 if e == lo else head[e]
+                bits[e] = block | (tail[e] << head_size)
+            upper[lo] = (head_size + tail_size, bits)
+        level = upper
+    return level[0][1]
+
+def _uncovered_by_bitsets(n, k, j, s, coverage, k_masks):
+    member = j_membership_bitsets(n, j)
+    full = (1 << math.comb(n, j)) - 1
+    # satisfied[i - 1]：至少被 i 个已处理的 k 组满足的 j 组
+    satisfied = [0] * coverage
+    for mask in k_masks:
+        # at_least[t - 1]：至少包含 K 的 t 个样本的 j 组
+        at_least = [0] * s
+        for count, e in enumerate(iter_bits(mask), 1):
+            x = member[e]
+            for t in range(min(count, s), 1, -1):
+                at_least[t - 1] |= at_least[t - 2] & x
+            at_least[0] |= x
+        hit = at_least[s - 1]
+        for i in range(coverage - 1, 0, -1):
+            satisfied[i] |= satisfied[i - 1] & hit
+        satisfied[0] |= hit
+    return list(iter_bits(full & ~satisfied[coverage - 1]))
+
+def _uncovered_by_rows(n, k, j, s, coverage, k_masks):
+    index = StreamingCoverageIndex(n, k, j, s)
+    counts = array('I', bytes(4 * index.num_j_groups))
+    for mask in k_masks:
+        for t in index.covered_by(lex_rank(tuple(iter_bits(mask)), n)):
+            counts[t] += 1
+    return [t for t, c in enumerate(counts) if c < coverage]
+
+def uncovered_j_groups(n, k, j, s, coverage, k_masks):
+    """下标空间中的校验：返回未被满足 coverage 次的 j 组编号（字典序，升序）。
+
+    k_masks 为所选 k 组的位掩码（第 i 个样本对应第 i 位）；重复的组按多个组计数。
+    """
+    if not (s <= j <= k <= n):
+        raise ValueError("参数必须满足 s <= j <= k <= n")
+    k_masks = list(k_masks)
+    if coverage <= 0:
+        return []
+    if len(k_masks) < coverage:
+        return list(range(math.comb(n, j)))
+    # 每个 k 组的代价：逐行为它满足的 j 组数，位集为 k * s 次 C(n, j) 位的运算
+    row_cost = _covering_count(n, k, j, s) * math.comb(n, j) // math.comb(n, k)
+    bitset_cost = k * s * (1 + math.comb(n, j) // _BITSET_BITS_PER_ROW)
+    if row_cost <= bitset_cost:
+        return _uncovered_by_rows(n, k, j, s, coverage, k_masks)
+    return _uncovered_by_bitsets(n, k, j, s, coverage, k_masks)
+
+def verify_masks(samples, k_masks, k, j, s, coverage=1, coverage_mode='groups', limit=None):
+    """校验相对于 samples 的 k 组位掩码（结果数据库与 .osr 文件中保存的形式）。
+
+    Returns:
+        tuple: (未满足的 j 组总数, 至多 limit 个未满足的 j 组，以标签元组表示)。
+        位数不是 k 或超出样本范围的掩码视为无效，会引发 ValueError。
+    """
+    n = len(samples)
+    s, coverage = resolve_coverage(k, j, s, coverage, coverage_mode)
+    k_masks = list(k_masks)
+    for mask in k_masks:
+        if popcount(mask) != k or mask >> n:
+            raise ValueError(f"组的大小不是 {k} 或含有不在样本中的标签: {mask:#x}")
+    uncovered = uncovered_j_groups(n, k, j, s, coverage, k_masks)
+    shown = uncovered if limit is None else uncovered[:limit]
+    return len(uncovered), [tuple(samples[p] for p in lex_unrank(t, n, j)) for t in shown]
+
+def verify_cover(samples, groups, k, j, s, coverage=1, coverage_mode='groups', limit=None):
+    """校验 groups（标签元组列表）是否覆盖 samples 的全部 j 组，返回值同 verify_masks。"""
+    position = {label: i for i, label in enumerate(samples)}
+    k_masks = []
+    for group in groups:
+        if len(set(group)) != k:
+            raise ValueError(f"组的大小不是 {k}: {group}")
+        try:
+            k_masks.append(mask_of(position[label] for label in group))
+        except KeyError as e:
+            raise ValueError(f"组中含有不在样本中的标签 {e}: {group}")
+    return verify_masks(samples, k_masks, k, j, s, coverage, coverage_mode, limit)